@@ -0,0 +1,166 @@
+"""
+Script para medir la validación por lotes de libros frente a la validación fila a fila.
+
+Este script:
+- Genera registros de libros sintéticos (con ISBN-10, ISBN-13 y algunos erróneos).
+- Los valida con los validadores del modelo Libro, uno por uno, incluida la
+  comprobación de unicidad de ISBN y título contra la base de datos.
+- Los valida con `validar_lote`, que calcula los dígitos de control con NumPy y
+  resuelve la unicidad con una consulta por campo para todo el lote.
+- Comprueba que ambos métodos aceptan los mismos registros y muestra los tiempos.
+
+Solo lee la base de datos configurada; no guarda ningún cambio.
+
+Uso:
+    python benchmark_validacion.py --registros 10000
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import argparse
+import logging
+import random
+import time
+from main import create_app
+from src.models.models_libro import Libro
+from src.services.services_validacion import validar_lote
+
+# Configurar logging para registrar eventos importantes. La configuración de
+# la aplicación ya envía el logging raíz a app.log: los resultados se muestran
+# además por consola.
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler())
+
+LETRAS = "abcdefghijklmnopqrstuvwxyzáéíóúñ"
+# Las cifras del número de registro se escriben con letras en los títulos
+_CIFRAS = str.maketrans("0123456789", "abcdefghij")
+
+
+def _isbn13(semilla):
+    """
+    Genera un ISBN-13 válido a partir de un número.
+    """
+    base = f"978{semilla % 10**9:09d}"
+    suma = sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(base))
+    return base + str((10 - suma % 10) % 10)
+
+
+def _isbn10(semilla):
+    """
+    Genera un ISBN-10 válido a partir de un número.
+    """
+    base = f"{semilla % 10**9:09d}"
+    suma = sum((10 - i) * int(d) for i, d in enumerate(base))
+    control = (11 - suma % 11) % 11
+    return base + ("X" if control == 10 else str(control))
+
+
+def _palabras(aleatorio, cantidad):
+    """
+    Genera un texto de palabras aleatorias con solo letras y espacios.
+    """
+    return " ".join(
+        "".join(aleatorio.choice(LETRAS) for _ in range(aleatorio.randint(3, 9)))
+        for _ in range(cantidad)
+    ).capitalize()
+
+
+def generar_registros(total, semilla=2025):
+    """
+    Genera registros de libros sintéticos; aproximadamente uno de cada diez es erróneo.
+
+    Args:
+        total (int): Número de registros.
+        semilla (int): Semilla del generador aleatorio.
+
+    Returns:
+        list: Diccionarios con los campos de un libro.
+    """
+    aleatorio = random.Random(semilla)
+    registros = []
+    for indice in range(total):
+        # Números distintos para que ISBN y títulos no se repitan en el lote
+        numero = indice * 1000 + aleatorio.randrange(1000)
+        isbn = _isbn13(numero) if indice % 2 else _isbn10(numero)
+        registro = {
+            "isbn": isbn,
+            "titulo": f"{_palabras(aleatorio, 3)} {str(indice).translate(_CIFRAS)}",
+            "autor": _palabras(aleatorio, 2),
+            "editorial": _palabras(aleatorio, 1),
+            "genero": _palabras(aleatorio, 1),
+            "cantidad": str(aleatorio.randint(1, 20)),
+        }
+        fallo = aleatorio.randrange(30)
+        if fallo == 0:
+            # Dígito de control incorrecto
+            control = "0" if isbn[-1] == "X" else str((int(isbn[-1]) + 1) % 10)
+            registro["isbn"] = isbn[:-1] + control
+        elif fallo == 1:
+            registro["autor"] += " 2"
+        elif fallo == 2:
+            registro["cantidad"] = "0"
+        registros.append(registro)
+    return registros
+
+
+def validar_fila_a_fila(registros):
+    """
+    Valida los registros uno por uno con los validadores del modelo Libro.
+
+    Returns:
+        list: True o False por registro.
+    """
+    resultados = []
+    for registro in registros:
+        try:
+            Libro.validar_isbn(registro["isbn"])
+            Libro.validar_titulo(registro["titulo"])
+            Libro.validar_autor(registro["autor"])
+            Libro.validar_editorial(registro["editorial"])
+            Libro.validar_genero(registro["genero"])
+            Libro.validar_cantidad(registro["cantidad"])
+            resultados.append(True)
+        except ValueError:
+            resultados.append(False)
+    return resultados
+
+
+def _medir(funcion, *args):
+    """
+    Ejecuta una función y devuelve su resultado y los segundos empleados.
+    """
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def medir(total):
+    """
+    Compara ambos métodos de validación sobre el mismo conjunto de registros.
+    """
+    app = create_app()
+    with app.app_context():
+        registros = generar_registros(total)
+
+        por_fila, tiempo_fila = _medir(validar_fila_a_fila, registros)
+        por_lote, tiempo_lote = _medir(validar_lote, registros)
+        por_lote = [resultado["valido"] for resultado in por_lote]
+
+        if por_fila != por_lote:
+            diferencias = sum(a != b for a, b in zip(por_fila, por_lote))
+            logger.error(f"Los métodos no coinciden en {diferencias} registros.")
+        logger.info(
+            f"{total} registros, {sum(por_lote)} válidos. "
+            f"Fila a fila: {tiempo_fila:.3f} s. Por lotes: {tiempo_lote:.3f} s. "
+            f"Aceleración: x{tiempo_fila / max(tiempo_lote, 1e-9):.1f}."
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--registros", type=int, default=10000, help="Número de registros a validar."
+    )
+    medir(parser.parse_args().registros)
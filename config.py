@@ -41,6 +41,47 @@ class Config:
         SESSION_COOKIE_HTTPONLY (bool): Cookies de sesión solo accesibles por HTTP.
         SESSION_COOKIE_SAMESITE (str): Política SameSite para cookies de sesión.
         PREFERRED_URL_SCHEME (str): Esquema preferido para URLs ('http' o 'https').
+        LIBROS_POR_PAGINA (int): Número de libros por página en el catálogo.
+        CACHE_CATALOGO_TTL (int): Segundos de validez de los agregados del catálogo en caché.
+        FACETAS_POR_PAGINA (int): Número de autores, géneros o títulos por página al agrupar el catálogo.
+        BUSQUEDA_RESULTADOS_POR_PAGINA (int): Resultados por página del buscador.
+        BUSQUEDA_PESOS_CAMPOS (dict): Peso de cada campo en la relevancia de la búsqueda.
+        AUTOCOMPLETAR_MIN_CARACTERES (int): Longitud mínima del texto para autocompletar usuarios.
+        AUTOCOMPLETAR_LIMITE (int): Número máximo de usuarios devueltos por el autocompletado.
+        AUTOCOMPLETAR_TTL (int): Segundos tras los que se recarga el índice de autocompletado.
+        IMPORTACION_TAMANO_LOTE (int): Filas del CSV validadas y guardadas en cada transacción al importar.
+        IMPORTACION_MAX_ERRORES (int): Número máximo de errores detallados en el informe de importación.
+        IMPORTACION_CARPETA (str): Carpeta donde se guardan los CSV pendientes de importar.
+        IMPORTACION_HILOS (int): Hilos que procesan importaciones en cada proceso.
+        IMPORTACION_EJECUTOR_LOCAL (bool): Procesar las importaciones en hilos del propio proceso web
+            en lugar de dejarlas a `flask procesar-importaciones`.
+        IMPORTACION_ESPERA (int): Segundos entre consultas a la cola de importaciones vacía.
+        EXPORTACION_TAMANO_BLOQUE (int): Filas leídas del cursor y escritas en cada bloque al exportar.
+        PRESTAMOS_LIMITE_USUARIO (int): Préstamos sin devolver que puede tener cada usuario.
+        MOSTRADOR_MAX_CODIGOS (int): Libros que se pueden prestar o devolver en un mismo lote.
+        PRESTAMOS_DIAS (int): Días de préstamo antes de que un préstamo pase a 'vencido'.
+        VENCIMIENTOS_TAMANO_LOTE (int): Préstamos marcados como vencidos en cada UPDATE.
+        VENCIMIENTOS_INTERVALO (int): Segundos entre pasadas de `flask marcar-vencidos --continuo`.
+        RECORDATORIOS_DIAS_ANTELACION (int): Días antes del vencimiento en que se envía el recordatorio.
+        RECORDATORIOS_TAMANO_LOTE (int): Préstamos leídos y registrados en cada bloque de la campaña.
+        RECORDATORIOS_POR_SEGUNDO (float): Correos de recordatorio enviados por segundo como máximo (0 sin límite).
+        RECORDATORIOS_REINTENTOS (int): Reintentos de cada recordatorio tras un error SMTP temporal.
+        RECORDATORIOS_ESPERA_REINTENTO (float): Segundos de espera antes del primer reintento.
+        MULTAS_TARIFA_DIA (int): Importe de la multa por cada día de retraso.
+        MULTAS_POR_PAGINA (int): Filas por página del informe de multas.
+        RANKING_LIMITE (int): Libros mostrados en el ranking de los más prestados.
+        RANKING_TTL (int): Segundos tras los que se recalcula el ranking de libros más prestados.
+        HISTORIAL_POR_PAGINA (int): Préstamos por página en el historial de cada usuario.
+        PRESTAMOS_POR_PAGINA (int): Préstamos por página en la gestión de préstamos.
+        RESERVAS_POR_PAGINA (int): Reservas por página en la gestión de reservas.
+        RESERVAS_MAX_LOTE (int): Reservas que se pueden aprobar o rechazar en un mismo lote.
+        RESERVAS_DIAS_EXPIRACION (int): Días que se guarda un ejemplar apartado antes de rechazar su reserva retenida.
+        RESERVAS_TAMANO_LOTE (int): Reservas expiradas en cada bloque.
+        RESERVAS_INTERVALO (int): Segundos entre pasadas de `flask expirar-reservas --continuo`.
+        ACTIVIDAD_DIAS_POR_LOTE (int): Días recalculados en cada transacción de `flask actualizar-actividad`.
+        ACTIVIDAD_INTERVALO (int): Segundos entre pasadas de `flask actualizar-actividad --continuo`.
+        VERSION_CATALOGO_TTL (int): Segundos que cada proceso reutiliza la versión del catálogo
+            con la que genera los ETag antes de volver a leerla.
     """
 
     # Configuración de la base de datos
@@ -88,5 +129,82 @@ class Config:
     # Preferencia de esquema de URL (http o https)
     PREFERRED_URL_SCHEME = os.getenv("PREFERRED_URL_SCHEME", "http")
 
+    # Paginación y caché del catálogo
+    LIBROS_POR_PAGINA = int(os.getenv("LIBROS_POR_PAGINA", 50))
+    CACHE_CATALOGO_TTL = int(os.getenv("CACHE_CATALOGO_TTL", 300))
+    FACETAS_POR_PAGINA = int(os.getenv("FACETAS_POR_PAGINA", 25))
+
+    # Buscador del catálogo
+    BUSQUEDA_RESULTADOS_POR_PAGINA = int(os.getenv("BUSQUEDA_RESULTADOS_POR_PAGINA", 20))
+    BUSQUEDA_PESOS_CAMPOS = {
+        "titulo": 3.0,
+        "autor": 2.0,
+        "isbn": 5.0,
+        "genero": 1.0,
+        "editorial": 1.0,
+    }
+
+    # Autocompletado de usuarios en el mostrador de préstamos
+    AUTOCOMPLETAR_MIN_CARACTERES = int(os.getenv("AUTOCOMPLETAR_MIN_CARACTERES", 2))
+    AUTOCOMPLETAR_LIMITE = int(os.getenv("AUTOCOMPLETAR_LIMITE", 10))
+    AUTOCOMPLETAR_TTL = int(os.getenv("AUTOCOMPLETAR_TTL", 600))
+
+    # Importación masiva de libros
+    IMPORTACION_TAMANO_LOTE = int(os.getenv("IMPORTACION_TAMANO_LOTE", 1000))
+    IMPORTACION_MAX_ERRORES = int(os.getenv("IMPORTACION_MAX_ERRORES", 1000))
+    IMPORTACION_CARPETA = os.getenv("IMPORTACION_CARPETA", "uploads")
+    IMPORTACION_HILOS = int(os.getenv("IMPORTACION_HILOS", 2))
+    IMPORTACION_EJECUTOR_LOCAL = os.getenv(
+        "IMPORTACION_EJECUTOR_LOCAL", "True"
+    ).lower() in ["true", "1", "t"]
+    IMPORTACION_ESPERA = int(os.getenv("IMPORTACION_ESPERA", 5))
+
+    # Exportación en streaming
+    EXPORTACION_TAMANO_BLOQUE = int(os.getenv("EXPORTACION_TAMANO_BLOQUE", 1000))
+
+    # Préstamos
+    PRESTAMOS_LIMITE_USUARIO = int(os.getenv("PRESTAMOS_LIMITE_USUARIO", 3))
+    MOSTRADOR_MAX_CODIGOS = int(os.getenv("MOSTRADOR_MAX_CODIGOS", 500))
+
+    # Vencimiento de préstamos
+    PRESTAMOS_DIAS = int(os.getenv("PRESTAMOS_DIAS", 14))
+    VENCIMIENTOS_TAMANO_LOTE = int(os.getenv("VENCIMIENTOS_TAMANO_LOTE", 500))
+    VENCIMIENTOS_INTERVALO = int(os.getenv("VENCIMIENTOS_INTERVALO", 3600))
+
+    # Recordatorios de préstamos por correo
+    RECORDATORIOS_DIAS_ANTELACION = int(os.getenv("RECORDATORIOS_DIAS_ANTELACION", 2))
+    RECORDATORIOS_TAMANO_LOTE = int(os.getenv("RECORDATORIOS_TAMANO_LOTE", 500))
+    RECORDATORIOS_POR_SEGUNDO = float(os.getenv("RECORDATORIOS_POR_SEGUNDO", 20))
+    RECORDATORIOS_REINTENTOS = int(os.getenv("RECORDATORIOS_REINTENTOS", 3))
+    RECORDATORIOS_ESPERA_REINTENTO = float(
+        os.getenv("RECORDATORIOS_ESPERA_REINTENTO", 2)
+    )
+
+    # Multas por retraso
+    MULTAS_TARIFA_DIA = int(os.getenv("MULTAS_TARIFA_DIA", 1))
+    MULTAS_POR_PAGINA = int(os.getenv("MULTAS_POR_PAGINA", 50))
+
+    # Ranking de libros más prestados
+    RANKING_LIMITE = int(os.getenv("RANKING_LIMITE", 20))
+    RANKING_TTL = int(os.getenv("RANKING_TTL", 600))
+
+    # Historial de préstamos de cada usuario
+    HISTORIAL_POR_PAGINA = int(os.getenv("HISTORIAL_POR_PAGINA", 20))
+    PRESTAMOS_POR_PAGINA = int(os.getenv("PRESTAMOS_POR_PAGINA", 50))
+
+    # Gestión y expiración de reservas
+    RESERVAS_POR_PAGINA = int(os.getenv("RESERVAS_POR_PAGINA", 50))
+    RESERVAS_MAX_LOTE = int(os.getenv("RESERVAS_MAX_LOTE", 500))
+    RESERVAS_DIAS_EXPIRACION = int(os.getenv("RESERVAS_DIAS_EXPIRACION", 7))
+    RESERVAS_TAMANO_LOTE = int(os.getenv("RESERVAS_TAMANO_LOTE", 1000))
+    RESERVAS_INTERVALO = int(os.getenv("RESERVAS_INTERVALO", 3600))
+
+    # Agregados diarios de actividad de préstamos
+    ACTIVIDAD_DIAS_POR_LOTE = int(os.getenv("ACTIVIDAD_DIAS_POR_LOTE", 31))
+    ACTIVIDAD_INTERVALO = int(os.getenv("ACTIVIDAD_INTERVALO", 900))
+
+    # Peticiones condicionales (ETag) de las páginas del catálogo
+    VERSION_CATALOGO_TTL = int(os.getenv("VERSION_CATALOGO_TTL", 2))
+
     # Configuración del logging
     logging.basicConfig(filename="app.log", level=logging.INFO)
@@ -18,6 +18,48 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def sembrar_resumen():
+    """
+    Calcula los contadores del catálogo si la tabla de resumen está vacía.
+
+    En una base existente, `db.create_all()` crea la tabla `resumen_catalogo`
+    vacía y las facetas de autor, género y editorial se quedarían sin
+    valores; se rellena aquí igual que con `flask reconciliar-resumen`.
+    """
+    from sqlalchemy import select
+    from src.models.models_libro import Libro
+    from src.models.models_resumen import ResumenCatalogo
+    from src.services.services_resumen import reconstruir_resumen
+
+    if db.session.execute(select(ResumenCatalogo.dimension).limit(1)).first():
+        return
+    if not db.session.execute(select(Libro.id).limit(1)).first():
+        return
+    total = reconstruir_resumen()
+    logger.info(f"📊 Resumen del catálogo calculado: {total} libros contabilizados")
+
+
+def sembrar_indice_busqueda():
+    """
+    Construye el índice de búsqueda si su tabla está vacía.
+
+    En una base existente, `db.create_all()` crea la tabla `indice_busqueda`
+    vacía y las búsquedas del catálogo no devolverían resultados; se rellena
+    aquí igual que con `flask reindexar-busqueda`.
+    """
+    from sqlalchemy import select
+    from src.models.models_busqueda import IndiceBusqueda
+    from src.models.models_libro import Libro
+    from src.services.services_busqueda import reconstruir_indice
+
+    if db.session.execute(select(IndiceBusqueda.libro_id).limit(1)).first():
+        return
+    if not db.session.execute(select(Libro.id).limit(1)).first():
+        return
+    total = reconstruir_indice()
+    logger.info(f"🔎 Índice de búsqueda construido: {total} libros indexados")
+
+
 def init_db(testing=False):
     """
     Inicializa la base de datos de la aplicación.
@@ -29,6 +71,8 @@ def init_db(testing=False):
     - Crea la aplicación Flask con la configuración especificada.
     - Verifica la conexión a la base de datos.
     - Crea todas las tablas definidas en los modelos.
+    - Rellena los contadores del catálogo si su tabla está vacía.
+    - Construye el índice de búsqueda si su tabla está vacía.
     - Registra el resultado en el log.
 
     Raises:
@@ -46,7 +90,13 @@ def init_db(testing=False):
             # Crear todas las tablas
             db.create_all()
             logger.info("✅ Base de datos inicializada correctamente - Todas las tablas creadas")
-            
+
+            # Rellenar los contadores del catálogo si la tabla es nueva en una base con libros
+            sembrar_resumen()
+
+            # Construir el índice de búsqueda si la tabla es nueva en una base con libros
+            sembrar_indice_busqueda()
+
             # Mostrar tablas creadas
             inspector = db.inspect(db.engine)
             tables = inspector.get_table_names()
@@ -19,6 +19,7 @@ from werkzeug.middleware.proxy_fix import ProxyFix  # Importar ProxyFix
 from config import Config
 from extensions import db, mail
 from src.auth import load_user
+from src.commands import register_commands
 from src.models import models_usuario
 import logging
 from src.routes.routes_generales import generales_bp
@@ -75,6 +76,9 @@ def create_app(testing=False):
     app.register_blueprint(libros_bp, url_prefix="/libros")  # Rutas de libros
     app.register_blueprint(prestamos_bp, url_prefix="/prestamos")  # Rutas de préstamos
 
+    # Registrar comandos de mantenimiento en la CLI de Flask
+    register_commands(app)
+
     # Filtro personalizado para decodificar URLs en plantillas
     @app.template_filter("unquote_url")
     def unquote_url_filter(url):
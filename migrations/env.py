@@ -8,6 +8,11 @@ from src.models.models_prestamo import Prestamo
 from src.models.models_libro import Libro
 from src.models.models_usuario import Usuario
 from src.models.models_reserva import Reserva
+from src.models.models_busqueda import IndiceBusqueda
+from src.models.models_resumen import ResumenCatalogo
+from src.models.models_importacion import TrabajoImportacion
+from src.models.models_version import VersionCatalogo
+from src.models.models_actividad import ActividadDiaria
 from extensions import db
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,39 @@
+"""Índice por estado y fecha de préstamo para el marcado de préstamos vencidos
+
+Añade el índice que usan `flask marcar-vencidos` (préstamos activos anteriores
+al plazo de préstamo) y los listados y conteos de préstamos vencidos.
+
+Como en la revisión anterior, solo se crea si aún no existe, porque
+`db.create_all()` ya lo crea en las bases de datos nuevas.
+
+Revision ID: 3f2a9c81d5e4
+Revises: 8640900237df
+Create Date: 2025-05-17 11:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c81d5e4'
+down_revision = '8640900237df'
+branch_labels = None
+depends_on = None
+
+INDICE = "ix_prestamo_estado_fecha"
+
+
+def _indices_existentes(tabla):
+    inspector = sa.inspect(op.get_bind())
+    return {indice["name"] for indice in inspector.get_indexes(tabla)}
+
+
+def upgrade():
+    if INDICE not in _indices_existentes("prestamo"):
+        op.create_index(INDICE, "prestamo", ["estado", "fecha_prestamo"])
+
+
+def downgrade():
+    if INDICE in _indices_existentes("prestamo"):
+        op.drop_index(INDICE, table_name="prestamo")
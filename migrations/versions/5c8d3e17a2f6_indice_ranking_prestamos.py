@@ -0,0 +1,36 @@
+"""Índice por fecha de préstamo y libro para el ranking de libros más prestados
+
+Permite agregar los préstamos de un periodo por libro leyendo solo el índice.
+Como en las revisiones anteriores, solo se crea si aún no existe.
+
+Revision ID: 5c8d3e17a2f6
+Revises: b71e04d2c9a3
+Create Date: 2025-05-17 13:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c8d3e17a2f6'
+down_revision = 'b71e04d2c9a3'
+branch_labels = None
+depends_on = None
+
+INDICE = "ix_prestamo_fecha_libro"
+
+
+def _indices_existentes(tabla):
+    inspector = sa.inspect(op.get_bind())
+    return {indice["name"] for indice in inspector.get_indexes(tabla)}
+
+
+def upgrade():
+    if INDICE not in _indices_existentes("prestamo"):
+        op.create_index(INDICE, "prestamo", ["fecha_prestamo", "libro_id"])
+
+
+def downgrade():
+    if INDICE in _indices_existentes("prestamo"):
+        op.drop_index(INDICE, table_name="prestamo")
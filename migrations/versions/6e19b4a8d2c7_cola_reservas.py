@@ -0,0 +1,52 @@
+"""Cola de espera de reservas por libro
+
+Añade `reserva.fecha_retencion`, la fecha en que se aparta para una reserva
+el ejemplar devuelto, y el índice (libro_id, estado, fecha_reserva), que
+obtiene la primera reserva de la cola de un libro y la posición de cada una.
+Como en las revisiones anteriores, solo se crea lo que aún no existe.
+
+Revision ID: 6e19b4a8d2c7
+Revises: d3a7f51c0e28
+Create Date: 2025-05-17 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e19b4a8d2c7'
+down_revision = 'd3a7f51c0e28'
+branch_labels = None
+depends_on = None
+
+
+def _columnas_existentes(tabla):
+    inspector = sa.inspect(op.get_bind())
+    return {columna["name"] for columna in inspector.get_columns(tabla)}
+
+
+def _indices_existentes(tabla):
+    inspector = sa.inspect(op.get_bind())
+    return {indice["name"] for indice in inspector.get_indexes(tabla)}
+
+
+def upgrade():
+    if "fecha_retencion" not in _columnas_existentes("reserva"):
+        op.add_column(
+            "reserva", sa.Column("fecha_retencion", sa.DateTime(), nullable=True)
+        )
+    if "ix_reserva_libro_estado_fecha" not in _indices_existentes("reserva"):
+        op.create_index(
+            "ix_reserva_libro_estado_fecha",
+            "reserva",
+            ["libro_id", "estado", "fecha_reserva"],
+        )
+
+
+def downgrade():
+    if "ix_reserva_libro_estado_fecha" in _indices_existentes("reserva"):
+        op.drop_index("ix_reserva_libro_estado_fecha", table_name="reserva")
+    if "fecha_retencion" in _columnas_existentes("reserva"):
+        with op.batch_alter_table("reserva") as batch_op:
+            batch_op.drop_column("fecha_retencion")
@@ -0,0 +1,50 @@
+"""Índices compuestos para las consultas frecuentes de préstamos, reservas y usuarios
+
+Añade los índices que usan las devoluciones (préstamo sin devolver de un
+libro), el límite de préstamos por usuario, la lista de reservas pendientes y
+la confirmación de correo por token.
+
+Las tablas se crean con `iniciar_base_de_datos.py` (`db.create_all()`), que en
+bases de datos nuevas ya crea estos índices a partir de los modelos; por eso
+la migración solo crea los que aún no existen.
+
+Revision ID: 8640900237df
+Revises:
+Create Date: 2025-05-17 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8640900237df'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (tabla, nombre del índice, columnas)
+INDICES = (
+    ("prestamo", "ix_prestamo_libro_devolucion", ["libro_id", "fecha_devolucion"]),
+    ("prestamo", "ix_prestamo_usuario_devolucion", ["usuario_id", "fecha_devolucion"]),
+    ("prestamo", "ix_prestamo_usuario_estado", ["usuario_id", "estado"]),
+    ("reserva", "ix_reserva_estado_fecha", ["estado", "fecha_reserva"]),
+    ("usuario", "ix_usuario_token_confirmacion", ["token_confirmacion"]),
+)
+
+
+def _indices_existentes(tabla):
+    inspector = sa.inspect(op.get_bind())
+    return {indice["name"] for indice in inspector.get_indexes(tabla)}
+
+
+def upgrade():
+    for tabla, nombre, columnas in INDICES:
+        if nombre not in _indices_existentes(tabla):
+            op.create_index(nombre, tabla, columnas)
+
+
+def downgrade():
+    for tabla, nombre, _ in reversed(INDICES):
+        if nombre in _indices_existentes(tabla):
+            op.drop_index(nombre, table_name=tabla)
@@ -0,0 +1,44 @@
+"""Índices para la lista paginada de préstamos sin devolver
+
+Añade el índice (fecha_devolucion, fecha_prestamo), que recorre los préstamos
+sin devolver en orden de vencimiento, y el índice por nombre de usuario para
+ordenarlos por usuario. Como en las revisiones anteriores, solo se crean los
+que aún no existen.
+
+Revision ID: 9b2d7c4e8f15
+Revises: e4a1f6b09c72
+Create Date: 2025-05-17 15:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b2d7c4e8f15'
+down_revision = 'e4a1f6b09c72'
+branch_labels = None
+depends_on = None
+
+# (tabla, nombre del índice, columnas)
+INDICES = (
+    ("prestamo", "ix_prestamo_devolucion_fecha", ["fecha_devolucion", "fecha_prestamo"]),
+    ("usuario", "ix_usuario_nombre", ["nombre"]),
+)
+
+
+def _indices_existentes(tabla):
+    inspector = sa.inspect(op.get_bind())
+    return {indice["name"] for indice in inspector.get_indexes(tabla)}
+
+
+def upgrade():
+    for tabla, nombre, columnas in INDICES:
+        if nombre not in _indices_existentes(tabla):
+            op.create_index(nombre, tabla, columnas)
+
+
+def downgrade():
+    for tabla, nombre, _ in reversed(INDICES):
+        if nombre in _indices_existentes(tabla):
+            op.drop_index(nombre, table_name=tabla)
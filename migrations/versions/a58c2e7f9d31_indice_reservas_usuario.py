@@ -0,0 +1,39 @@
+"""Índice de las reservas de cada usuario por estado
+
+Añade el índice (usuario_id, estado, fecha_reserva), que filtra por usuario
+la lista paginada de reservas por gestionar. Como en las revisiones
+anteriores, solo se crea si aún no existe.
+
+Revision ID: a58c2e7f9d31
+Revises: 6e19b4a8d2c7
+Create Date: 2025-05-17 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a58c2e7f9d31'
+down_revision = '6e19b4a8d2c7'
+branch_labels = None
+depends_on = None
+
+
+def _indices_existentes(tabla):
+    inspector = sa.inspect(op.get_bind())
+    return {indice["name"] for indice in inspector.get_indexes(tabla)}
+
+
+def upgrade():
+    if "ix_reserva_usuario_estado_fecha" not in _indices_existentes("reserva"):
+        op.create_index(
+            "ix_reserva_usuario_estado_fecha",
+            "reserva",
+            ["usuario_id", "estado", "fecha_reserva"],
+        )
+
+
+def downgrade():
+    if "ix_reserva_usuario_estado_fecha" in _indices_existentes("reserva"):
+        op.drop_index("ix_reserva_usuario_estado_fecha", table_name="reserva")
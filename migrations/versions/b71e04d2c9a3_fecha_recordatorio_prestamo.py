@@ -0,0 +1,37 @@
+"""Fecha de envío del recordatorio de vencimiento de cada préstamo
+
+Añade `prestamo.fecha_recordatorio`, que registra cuándo se envió el
+recordatorio de `flask enviar-recordatorios` para no enviarlo dos veces.
+
+Revision ID: b71e04d2c9a3
+Revises: 3f2a9c81d5e4
+Create Date: 2025-05-17 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b71e04d2c9a3'
+down_revision = '3f2a9c81d5e4'
+branch_labels = None
+depends_on = None
+
+
+def _columnas_existentes(tabla):
+    inspector = sa.inspect(op.get_bind())
+    return {columna["name"] for columna in inspector.get_columns(tabla)}
+
+
+def upgrade():
+    if "fecha_recordatorio" not in _columnas_existentes("prestamo"):
+        op.add_column(
+            "prestamo", sa.Column("fecha_recordatorio", sa.DateTime(), nullable=True)
+        )
+
+
+def downgrade():
+    if "fecha_recordatorio" in _columnas_existentes("prestamo"):
+        with op.batch_alter_table("prestamo") as batch_op:
+            batch_op.drop_column("fecha_recordatorio")
@@ -0,0 +1,51 @@
+"""Tabla de agregados diarios de actividad de préstamos
+
+Crea `actividad_diaria`, con los préstamos, devoluciones, vencidos y usuarios
+distintos de cada día por género, autor y total, que mantiene
+`flask actualizar-actividad`.
+
+Revision ID: d3a7f51c0e28
+Revises: 9b2d7c4e8f15
+Create Date: 2025-05-17 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a7f51c0e28'
+down_revision = '9b2d7c4e8f15'
+branch_labels = None
+depends_on = None
+
+
+def _tablas_existentes():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    if "actividad_diaria" in _tablas_existentes():
+        return
+    op.create_table(
+        "actividad_diaria",
+        sa.Column("fecha", sa.Date(), nullable=False),
+        sa.Column("dimension", sa.String(length=20), nullable=False),
+        sa.Column("valor", sa.String(length=100), nullable=False),
+        sa.Column("prestamos", sa.Integer(), nullable=False),
+        sa.Column("devoluciones", sa.Integer(), nullable=False),
+        sa.Column("vencidos", sa.Integer(), nullable=False),
+        sa.Column("usuarios", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("fecha", "dimension", "valor"),
+    )
+    op.create_index(
+        "ix_actividad_dimension_valor_fecha",
+        "actividad_diaria",
+        ["dimension", "valor", "fecha"],
+    )
+
+
+def downgrade():
+    if "actividad_diaria" in _tablas_existentes():
+        op.drop_index("ix_actividad_dimension_valor_fecha", table_name="actividad_diaria")
+        op.drop_table("actividad_diaria")
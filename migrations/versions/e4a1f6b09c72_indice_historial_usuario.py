@@ -0,0 +1,37 @@
+"""Índice por usuario y fecha de préstamo para el historial paginado
+
+Permite leer el historial de un usuario ordenado por fecha de préstamo a
+partir de un cursor. Como en las revisiones anteriores, solo se crea si aún
+no existe.
+
+Revision ID: e4a1f6b09c72
+Revises: 5c8d3e17a2f6
+Create Date: 2025-05-17 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a1f6b09c72'
+down_revision = '5c8d3e17a2f6'
+branch_labels = None
+depends_on = None
+
+INDICE = "ix_prestamo_usuario_fecha"
+
+
+def _indices_existentes(tabla):
+    inspector = sa.inspect(op.get_bind())
+    return {indice["name"] for indice in inspector.get_indexes(tabla)}
+
+
+def upgrade():
+    if INDICE not in _indices_existentes("prestamo"):
+        op.create_index(INDICE, "prestamo", ["usuario_id", "fecha_prestamo"])
+
+
+def downgrade():
+    if INDICE in _indices_existentes("prestamo"):
+        op.drop_index(INDICE, table_name="prestamo")
@@ -0,0 +1,227 @@
+"""
+Módulo de comandos de línea de órdenes para la aplicación de gestión de biblioteca.
+
+Define los comandos de mantenimiento que se registran en la CLI de Flask
+(`flask <comando>`), como la reconstrucción del índice de búsqueda o de los
+contadores del catálogo, el procesamiento de la cola de importaciones, el
+marcado de préstamos vencidos, la expiración de reservas, el envío de
+recordatorios, la actualización de los agregados diarios de actividad y la
+comprobación de los planes de las consultas frecuentes.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import click
+from flask.cli import with_appcontext
+
+
+@click.command("reindexar-busqueda")
+@click.option(
+    "--lote", default=1000, show_default=True, help="Libros procesados por lote."
+)
+@with_appcontext
+def reindexar_busqueda(lote):
+    """
+    Reconstruye desde cero el índice de búsqueda del catálogo.
+    """
+    from src.services.services_busqueda import reconstruir_indice
+
+    total = reconstruir_indice(tamano_lote=lote)
+    click.echo(f"Índice de búsqueda reconstruido: {total} libros indexados.")
+
+
+@click.command("reconciliar-resumen")
+@click.option(
+    "--lote", default=1000, show_default=True, help="Libros procesados por lote."
+)
+@with_appcontext
+def reconciliar_resumen(lote):
+    """
+    Reconstruye desde cero los contadores materializados del catálogo.
+    """
+    from src.services.services_resumen import reconstruir_resumen
+
+    total = reconstruir_resumen(tamano_lote=lote)
+    click.echo(f"Resumen del catálogo reconstruido: {total} libros contabilizados.")
+
+
+@click.command("procesar-importaciones")
+@click.option("--hilos", type=int, default=None, help="Hilos trabajadores.")
+@click.option(
+    "--una-vez", is_flag=True, help="Terminar cuando no queden importaciones pendientes."
+)
+@click.option(
+    "--reencolar",
+    is_flag=True,
+    help="Reencolar antes las importaciones que quedaron a medias.",
+)
+@with_appcontext
+def procesar_importaciones(hilos, una_vez, reencolar):
+    """
+    Procesa en segundo plano la cola de importaciones de libros.
+    """
+    from src.services.services_trabajos import (
+        ejecutar_trabajadores,
+        reencolar_interrumpidos,
+    )
+
+    if reencolar:
+        click.echo(f"Importaciones reencoladas: {reencolar_interrumpidos()}.")
+    ejecutar_trabajadores(hilos=hilos, una_vez=una_vez)
+
+
+@click.command("marcar-vencidos")
+@click.option(
+    "--lote", type=int, default=None, help="Préstamos actualizados en cada UPDATE."
+)
+@click.option(
+    "--continuo",
+    is_flag=True,
+    help="Repetir cada VENCIMIENTOS_INTERVALO segundos hasta detener el proceso.",
+)
+@click.option("--intervalo", type=int, default=None, help="Segundos entre pasadas.")
+@with_appcontext
+def marcar_vencidos(lote, continuo, intervalo):
+    """
+    Marca como vencidos los préstamos activos cuyo plazo ha terminado.
+    """
+    from src.services.services_vencimientos import (
+        ejecutar_marcado_periodico,
+        marcar_vencidos as marcar,
+    )
+
+    if continuo:
+        ejecutar_marcado_periodico(intervalo=intervalo, tamano_lote=lote)
+    else:
+        total = marcar(tamano_lote=lote)
+        click.echo(f"Préstamos marcados como vencidos: {total}.")
+
+
+@click.command("expirar-reservas")
+@click.option("--lote", type=int, default=None, help="Reservas por bloque.")
+@click.option(
+    "--continuo",
+    is_flag=True,
+    help="Repetir cada RESERVAS_INTERVALO segundos hasta detener el proceso.",
+)
+@click.option("--intervalo", type=int, default=None, help="Segundos entre pasadas.")
+@with_appcontext
+def expirar_reservas(lote, continuo, intervalo):
+    """
+    Rechaza las reservas retenidas cuyo ejemplar no se ha recogido en plazo.
+    """
+    from src.models.models_reserva import Reserva
+    from src.services.services_reservas import ejecutar_expiracion_periodica
+
+    if continuo:
+        ejecutar_expiracion_periodica(intervalo=intervalo, tamano_lote=lote)
+    else:
+        total = Reserva.expirar_reservas(tamano_lote=lote)
+        click.echo(f"Reservas expiradas: {total}.")
+
+
+@click.command("enviar-recordatorios")
+@click.option(
+    "--lote", type=int, default=None, help="Préstamos procesados por bloque."
+)
+@click.option(
+    "--maximo", type=int, default=None, help="Recordatorios como máximo en esta ejecución."
+)
+@with_appcontext
+def enviar_recordatorios(lote, maximo):
+    """
+    Envía por correo el recordatorio de los préstamos que vencen pronto.
+
+    Usa la configuración MAIL_* de la aplicación; para probarlo contra un
+    servidor SMTP local basta con cambiar MAIL_SERVER y MAIL_PORT.
+    """
+    from src.services.services_recordatorios import enviar_recordatorios as enviar
+
+    resumen = enviar(tamano_lote=lote, maximo=maximo)
+    click.echo(
+        f"Recordatorios enviados: {resumen['enviados']}. "
+        f"Fallidos: {resumen['fallidos']}."
+    )
+
+
+@click.command("actualizar-actividad")
+@click.option(
+    "--desde",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Recalcular desde este día (AAAA-MM-DD) en lugar de desde el último agregado.",
+)
+@click.option(
+    "--continuo",
+    is_flag=True,
+    help="Repetir cada ACTIVIDAD_INTERVALO segundos hasta detener el proceso.",
+)
+@click.option("--intervalo", type=int, default=None, help="Segundos entre pasadas.")
+@with_appcontext
+def actualizar_actividad(desde, continuo, intervalo):
+    """
+    Actualiza los agregados diarios de préstamos por género y autor.
+    """
+    from src.services.services_actividad import (
+        actualizar_actividad as actualizar,
+        ejecutar_actualizacion_periodica,
+    )
+
+    if continuo:
+        ejecutar_actualizacion_periodica(intervalo=intervalo)
+    else:
+        total = actualizar(desde=desde.date() if desde else None)
+        click.echo(f"Actividad diaria actualizada: {total} días recalculados.")
+
+
+@click.command("verificar-planes")
+@click.option(
+    "--temporal",
+    is_flag=True,
+    help="Comprobar sobre una base SQLite en memoria con datos de ejemplo.",
+)
+@click.option(
+    "--registros",
+    default=5000,
+    show_default=True,
+    help="Préstamos de ejemplo de la base temporal.",
+)
+@with_appcontext
+def verificar_planes(temporal, registros):
+    """
+    Comprueba con EXPLAIN que las consultas frecuentes usan índices.
+
+    Termina con código 1 si alguna recorre una tabla completa.
+    """
+    from src.services.services_planes import verificar_planes as obtener_planes
+
+    resultados = obtener_planes(base_temporal=temporal, registros=registros)
+    for resultado in resultados:
+        estado = "ESCANEO COMPLETO" if resultado["escaneo_completo"] else "OK"
+        click.echo(f"[{estado}] {resultado['nombre']}")
+        for linea in resultado["plan"]:
+            click.echo(f"    {linea}")
+    fallidas = sum(resultado["escaneo_completo"] for resultado in resultados)
+    if fallidas:
+        raise click.ClickException(
+            f"{fallidas} consultas frecuentes recorren una tabla completa."
+        )
+    click.echo("Todas las consultas frecuentes usan índices.")
+
+
+def register_commands(app):
+    """
+    Registra los comandos de mantenimiento en la CLI de la aplicación.
+
+    Args:
+        app (Flask): Instancia de la aplicación Flask.
+    """
+    app.cli.add_command(reindexar_busqueda)
+    app.cli.add_command(reconciliar_resumen)
+    app.cli.add_command(procesar_importaciones)
+    app.cli.add_command(marcar_vencidos)
+    app.cli.add_command(expirar_reservas)
+    app.cli.add_command(enviar_recordatorios)
+    app.cli.add_command(actualizar_actividad)
+    app.cli.add_command(verificar_planes)
@@ -4,3 +4,8 @@ from src.models.models_libro import Libro as Libro
 from src.models.models_usuario import Usuario as Usuario
 from src.models.models_prestamo import Prestamo as Prestamo
 from src.models.models_reserva import Reserva as Reserva
+from src.models.models_busqueda import IndiceBusqueda as IndiceBusqueda
+from src.models.models_resumen import ResumenCatalogo as ResumenCatalogo
+from src.models.models_importacion import TrabajoImportacion as TrabajoImportacion
+from src.models.models_version import VersionCatalogo as VersionCatalogo
+from src.models.models_actividad import ActividadDiaria as ActividadDiaria
@@ -0,0 +1,52 @@
+"""
+Módulo de modelo de datos para la actividad diaria de préstamos de la aplicación de biblioteca.
+
+Define la clase ActividadDiaria, una tabla de agregados por día con los
+préstamos, devoluciones, préstamos vencidos y usuarios distintos de cada
+género y autor (y del total de la biblioteca), que mantiene
+`flask actualizar-actividad` a partir de la tabla de préstamos.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+from extensions import db
+
+
+class ActividadDiaria(db.Model):
+    """
+    Modelo que representa la actividad de préstamos de un día para un valor de una dimensión.
+
+    Atributos:
+        fecha (date): Día (UTC) al que corresponden los contadores.
+        dimension (str): Campo del libro por el que se agrupa ('genero',
+            'autor') o 'catalogo' para los totales de la biblioteca.
+        valor (str): Valor del campo (cadena vacía en los totales).
+        prestamos (int): Préstamos realizados ese día.
+        devoluciones (int): Préstamos devueltos ese día.
+        vencidos (int): Préstamos cuyo plazo terminó ese día sin haberse devuelto.
+        usuarios (int): Usuarios distintos que tomaron prestado algún libro ese día.
+    """
+
+    __tablename__ = "actividad_diaria"
+    __table_args__ = (
+        # Serie de un valor de una dimensión en un rango de días
+        db.Index("ix_actividad_dimension_valor_fecha", "dimension", "valor", "fecha"),
+    )
+
+    fecha = db.Column(db.Date, primary_key=True)
+    dimension = db.Column(db.String(20), primary_key=True)
+    valor = db.Column(db.String(100), primary_key=True)
+    prestamos = db.Column(db.Integer, nullable=False, default=0)
+    devoluciones = db.Column(db.Integer, nullable=False, default=0)
+    vencidos = db.Column(db.Integer, nullable=False, default=0)
+    usuarios = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        """
+        Representación legible del objeto ActividadDiaria para depuración.
+        """
+        return (
+            f"<ActividadDiaria {self.fecha} {self.dimension}={self.valor}: "
+            f"{self.prestamos}>"
+        )
@@ -0,0 +1,44 @@
+"""
+Módulo de modelo de datos para el índice de búsqueda de la aplicación de biblioteca.
+
+Define la clase IndiceBusqueda, el índice invertido que usa el buscador del
+catálogo: una fila por término, libro y campo, con la frecuencia del término
+y la longitud del campo necesarias para el cálculo de relevancia BM25.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+from extensions import db
+
+
+class IndiceBusqueda(db.Model):
+    """
+    Modelo que representa una entrada (posting) del índice invertido del catálogo.
+
+    Atributos:
+        termino (str): Término normalizado (raíz sin tildes).
+        libro_id (int): ID del libro que contiene el término.
+        campo (str): Campo del libro donde aparece ('titulo', 'autor', ...).
+        frecuencia (int): Número de apariciones del término en el campo.
+        longitud (int): Número total de términos del campo.
+    """
+
+    __tablename__ = "indice_busqueda"
+
+    termino = db.Column(db.String(64), primary_key=True)
+    libro_id = db.Column(
+        db.Integer,
+        db.ForeignKey("libro.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+    campo = db.Column(db.String(20), primary_key=True)
+    frecuencia = db.Column(db.Integer, nullable=False)
+    longitud = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        """
+        Representación legible del objeto IndiceBusqueda para depuración.
+        """
+        return f"<IndiceBusqueda {self.termino} en {self.campo} de {self.libro_id}>"
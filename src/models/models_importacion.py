@@ -0,0 +1,118 @@
+"""
+Módulo de modelo de datos para los trabajos de importación de la aplicación de biblioteca.
+
+Define la clase TrabajoImportacion, que representa la importación de un
+archivo CSV de libros encolada para procesarse en segundo plano, con su
+estado, contadores de progreso y errores.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+from extensions import db
+from datetime import datetime, timezone
+
+
+class TrabajoImportacion(db.Model):
+    """
+    Modelo que representa un trabajo de importación de libros en segundo plano.
+
+    Atributos:
+        id (int): Identificador único del trabajo.
+        usuario_id (int): ID del administrador que subió el archivo.
+        nombre_archivo (str): Nombre original del archivo subido.
+        ruta (str): Ruta del archivo guardado pendiente de procesar.
+        tamano (int): Tamaño del archivo en bytes.
+        bytes_procesados (int): Bytes del archivo leídos hasta el momento.
+        estado (str): Estado del trabajo ('pendiente', 'en_proceso',
+            'completado', 'fallido').
+        procesadas (int): Filas leídas.
+        insertados (int): Libros añadidos.
+        actualizados (int): Libros actualizados.
+        errores (int): Filas con errores.
+        detalle_errores (list): Primeros errores con su línea y mensaje.
+        mensaje (str): Motivo del fallo, si lo hubo.
+        fecha_creacion (datetime): Fecha en que se encoló el trabajo.
+        fecha_inicio (datetime): Fecha en que empezó a procesarse.
+        fecha_fin (datetime): Fecha en que terminó.
+    """
+
+    __tablename__ = "trabajo_importacion"
+
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(
+        db.Integer, db.ForeignKey("usuario.id", ondelete="SET NULL"), nullable=True
+    )
+    nombre_archivo = db.Column(db.String(255), nullable=False)
+    ruta = db.Column(db.String(255), nullable=False)
+    tamano = db.Column(db.BigInteger, nullable=False, default=0)
+    bytes_procesados = db.Column(db.BigInteger, nullable=False, default=0)
+    estado = db.Column(
+        db.String(20), nullable=False, default="pendiente", index=True
+    )  # Estados: pendiente, en_proceso, completado, fallido
+    procesadas = db.Column(db.Integer, nullable=False, default=0)
+    insertados = db.Column(db.Integer, nullable=False, default=0)
+    actualizados = db.Column(db.Integer, nullable=False, default=0)
+    errores = db.Column(db.Integer, nullable=False, default=0)
+    detalle_errores = db.Column(db.JSON, nullable=True)
+    mensaje = db.Column(db.String(500), nullable=True)
+    fecha_creacion = db.Column(
+        db.DateTime, default=lambda: datetime.now(timezone.utc)
+    )
+    fecha_inicio = db.Column(db.DateTime, nullable=True)
+    fecha_fin = db.Column(db.DateTime, nullable=True)
+
+    usuario = db.relationship("Usuario")
+
+    def __repr__(self):
+        """
+        Representación legible del objeto TrabajoImportacion para depuración.
+        """
+        return f"<TrabajoImportacion {self.id} {self.estado}>"
+
+    @property
+    def porcentaje(self):
+        """
+        Porcentaje del archivo procesado.
+
+        Returns:
+            int: Valor entre 0 y 100.
+        """
+        if self.estado == "completado":
+            return 100
+        if not self.tamano:
+            return 0
+        return min(int(self.bytes_procesados * 100 / self.tamano), 99)
+
+    @property
+    def terminado(self):
+        """
+        Indica si el trabajo ya no va a avanzar más.
+
+        Returns:
+            bool: True si está completado o fallido.
+        """
+        return self.estado in ("completado", "fallido")
+
+    def a_diccionario(self):
+        """
+        Devuelve el estado del trabajo en un formato serializable a JSON.
+
+        Returns:
+            dict: Estado, progreso, contadores y errores del trabajo.
+        """
+        return {
+            "id": self.id,
+            "nombre_archivo": self.nombre_archivo,
+            "estado": self.estado,
+            "terminado": self.terminado,
+            "porcentaje": self.porcentaje,
+            "procesadas": self.procesadas,
+            "insertados": self.insertados,
+            "actualizados": self.actualizados,
+            "errores": self.errores,
+            "detalle_errores": self.detalle_errores or [],
+            "mensaje": self.mensaje,
+            "fecha_creacion": self.fecha_creacion.isoformat() if self.fecha_creacion else None,
+            "fecha_fin": self.fecha_fin.isoformat() if self.fecha_fin else None,
+        }
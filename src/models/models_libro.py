@@ -9,8 +9,18 @@ Fecha: 2025-05-17
 """
 
 from extensions import db
+from flask import current_app
+from src.services.services_cache import CacheLocal
+from src.services.services_eventos import cambios_confirmados, seguir_cambios
+from src.services.services_paginacion import paginar_por_clave
 import re  # Eliminamos logging porque no se usa
 
+# Caché del catálogo compartida por las consultas agregadas sobre libros
+cache_catalogo = CacheLocal()
+
+# Formato de los campos de texto: letras, espacios, puntos y guiones
+PATRON_TEXTO = re.compile(r"^[a-zA-ZáéíóúÁÉÍÓÚñÑ\s\.\-]+$")
+
 
 class Libro(db.Model):
     """
@@ -110,19 +120,21 @@ class Libro(db.Model):
         return digito_verificacion == int(isbn[-1])
 
     @staticmethod
-    def validar_isbn(isbn, libro_id=None):
+    def validar_formato_isbn(isbn):
         """
-        Valida que el ISBN sea válido (ISBN-10 o ISBN-13) y único en la base de datos.
+        Valida el formato y el dígito de control de un ISBN (ISBN-10 o ISBN-13).
+
+        No consulta la base de datos, por lo que puede aplicarse a lotes de
+        filas antes de comprobar la unicidad con una sola consulta.
 
         Args:
             isbn (str): El ISBN a validar.
-            libro_id (int, opcional): ID del libro actual para evitar falsos positivos al editar.
 
         Returns:
             str: El ISBN limpio y validado.
 
         Raises:
-            ValueError: Si el ISBN no es válido o ya existe.
+            ValueError: Si el ISBN no es válido.
         """
         if not isbn or isbn.strip() == "":
             raise ValueError("El ISBN no puede estar vacío.")
@@ -146,6 +158,25 @@ class Libro(db.Model):
                 "Ejemplo de ISBN-13: '978-3-16-148410-0'."
             )
 
+        return isbn_limpio
+
+    @staticmethod
+    def validar_isbn(isbn, libro_id=None):
+        """
+        Valida que el ISBN sea válido (ISBN-10 o ISBN-13) y único en la base de datos.
+
+        Args:
+            isbn (str): El ISBN a validar.
+            libro_id (int, opcional): ID del libro actual para evitar falsos positivos al editar.
+
+        Returns:
+            str: El ISBN limpio y validado.
+
+        Raises:
+            ValueError: Si el ISBN no es válido o ya existe.
+        """
+        isbn_limpio = Libro.validar_formato_isbn(isbn)
+
         libro = Libro.query.filter_by(isbn=isbn).first()
         if libro and (libro_id is None or libro.id != libro_id):
             raise ValueError("El ISBN ya existe en la base de datos.")
@@ -153,29 +184,47 @@ class Libro(db.Model):
         return isbn_limpio
 
     @staticmethod
-    def validar_titulo(titulo, libro_id=None):
+    def validar_formato_titulo(titulo):
         """
-        Valida que el título no esté duplicado en la base de datos y tenga formato adecuado.
+        Valida que el título no esté vacío y tenga un formato adecuado.
 
         Args:
             titulo (str): El título a validar.
-            libro_id (int, opcional): ID del libro actual para evitar falsos positivos al editar.
 
         Returns:
             str: El título validado.
 
         Raises:
-            ValueError: Si el título ya existe o tiene formato inválido.
+            ValueError: Si el título tiene un formato inválido.
         """
         if not titulo or titulo.strip() == "":
             raise ValueError("El título no puede estar vacío.")
 
         # Permite letras, espacios, puntos y guiones
-        if not re.match(r"^[a-zA-ZáéíóúÁÉÍÓÚñÑ\s\.\-]+$", titulo):
+        if not PATRON_TEXTO.match(titulo):
             raise ValueError(
                 "El título solo puede contener letras, espacios, puntos y guiones."
             )
 
+        return titulo
+
+    @staticmethod
+    def validar_titulo(titulo, libro_id=None):
+        """
+        Valida que el título no esté duplicado en la base de datos y tenga formato adecuado.
+
+        Args:
+            titulo (str): El título a validar.
+            libro_id (int, opcional): ID del libro actual para evitar falsos positivos al editar.
+
+        Returns:
+            str: El título validado.
+
+        Raises:
+            ValueError: Si el título ya existe o tiene formato inválido.
+        """
+        Libro.validar_formato_titulo(titulo)
+
         libro = Libro.query.filter_by(titulo=titulo).first()
         if libro and (libro_id is None or libro.id != libro_id):
             raise ValueError("El título ya existe en la base de datos.")
@@ -199,7 +248,7 @@ class Libro(db.Model):
         if not autor or autor.strip() == "":
             raise ValueError("El autor no puede estar vacío.")
 
-        if not re.match(r"^[a-zA-ZáéíóúÁÉÍÓÚñÑ\s\.\-]+$", autor):
+        if not PATRON_TEXTO.match(autor):
             raise ValueError(
                 "El autor solo puede contener letras, espacios, puntos y guiones."
             )
@@ -223,7 +272,7 @@ class Libro(db.Model):
         if not genero or genero.strip() == "":
             raise ValueError("El género no puede estar vacía.")
 
-        if not re.match(r"^[a-zA-ZáéíóúÁÉÍÓÚñÑ\s\.\-]+$", genero):
+        if not PATRON_TEXTO.match(genero):
             raise ValueError(
                 "El género solo puede contener letras, espacios, puntos y guiones."
             )
@@ -247,7 +296,7 @@ class Libro(db.Model):
         if not editorial or editorial.strip() == "":
             raise ValueError("La editorial no puede estar vacía.")
 
-        if not re.match(r"^[a-zA-ZáéíóúÁÉÍÓÚñÑ\s\.\-]+$", editorial):
+        if not PATRON_TEXTO.match(editorial):
             raise ValueError(
                 "La editorial solo puede contener letras, espacios, puntos y guiones."
             )
@@ -285,10 +334,49 @@ class Libro(db.Model):
         """
         Cuenta el número total de libros en la biblioteca.
 
+        El resultado se guarda en caché y se invalida al insertar o eliminar
+        libros, por lo que la consulta COUNT solo se repite tras un cambio.
+
         Returns:
             int: Número total de libros.
         """
-        return cls.query.count()
+        return cache_catalogo.obtener(
+            "total_libros",
+            cls.query.count,
+            ttl=current_app.config["CACHE_CATALOGO_TTL"],
+        )
+
+    @classmethod
+    def pagina_catalogo(cls, despues=None, antes=None, limite=None):
+        """
+        Obtiene una página del catálogo ordenada por título mediante paginación por clave.
+
+        Solo se leen las columnas que muestra el listado, sin construir objetos
+        Libro, y la página se localiza con el índice de `titulo` a partir del
+        cursor, de modo que el coste no depende del tamaño del catálogo.
+
+        Args:
+            despues (str, opcional): Cursor de la última fila de la página anterior.
+            antes (str, opcional): Cursor de la primera fila de la página siguiente.
+            limite (int, opcional): Tamaño de página (por defecto LIBROS_POR_PAGINA).
+
+        Returns:
+            dict: Página con las claves 'elementos', 'siguiente' y 'anterior'.
+        """
+        limite = limite or current_app.config["LIBROS_POR_PAGINA"]
+        consulta = db.select(
+            cls.id,
+            cls.titulo,
+            cls.autor,
+            (cls.cantidad > 0).label("esta_disponible"),
+        )
+        return paginar_por_clave(
+            consulta,
+            orden=[(cls.titulo, False), (cls.id, False)],
+            limite=limite,
+            despues=despues,
+            antes=antes,
+        )
 
     def reducir_cantidad(self):
         """
@@ -306,3 +394,15 @@ class Libro(db.Model):
         Incrementa la cantidad disponible en 1 al devolver un préstamo.
         """
         self.cantidad += 1
+
+
+seguir_cambios(Libro)
+
+
+@cambios_confirmados.connect_via(Libro)
+def _invalidar_conteo_libros(modelo, cambios):
+    """
+    Invalida el total de libros cacheado cuando se insertan o eliminan libros.
+    """
+    if any(operacion in ("insert", "delete") for operacion, _, _ in cambios):
+        cache_catalogo.invalidar("total_libros")
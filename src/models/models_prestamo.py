@@ -10,8 +10,23 @@ Fecha: 2025-05-17
 """
 
 from datetime import datetime, timezone, timedelta
+from flask import current_app
 import sqlalchemy as sa
 from extensions import db
+from src.services.services_paginacion import paginar_por_clave
+
+# Ordenaciones de la lista de préstamos sin devolver: columnas y sentido
+ORDENES_SIN_DEVOLVER = {
+    "vencimiento": lambda: [(Prestamo.fecha_prestamo, False), (Prestamo.id, False)],
+    "usuario": lambda: [(Usuario.nombre, False), (Prestamo.id, False)],
+}
+
+# Filtros del historial de préstamos de un usuario
+FILTROS_HISTORIAL = {
+    "pendiente": lambda: Prestamo.fecha_devolucion.is_(None),
+    "devuelto": lambda: Prestamo.fecha_devolucion.isnot(None),
+    "vencido": lambda: Prestamo.estado == "vencido",
+}
 
 
 class Prestamo(db.Model):
@@ -25,9 +40,27 @@ class Prestamo(db.Model):
         fecha_prestamo (datetime): Fecha y hora en que se realizó el préstamo.
         fecha_devolucion (datetime): Fecha y hora en que se devolvió el libro.
         estado (str): Estado del préstamo ('activo', 'devuelto', 'vencido').
+        fecha_recordatorio (datetime): Fecha y hora en que se envió el
+            recordatorio de vencimiento (None si aún no se ha enviado).
     """
 
     __tablename__ = "prestamo"
+    __table_args__ = (
+        # Préstamo sin devolver de un libro (devoluciones)
+        db.Index("ix_prestamo_libro_devolucion", "libro_id", "fecha_devolucion"),
+        # Préstamos sin devolver de un usuario (límite, recordatorios, historial)
+        db.Index("ix_prestamo_usuario_devolucion", "usuario_id", "fecha_devolucion"),
+        # Préstamos de un usuario por estado (Prestamo.validar_prestamo)
+        db.Index("ix_prestamo_usuario_estado", "usuario_id", "estado"),
+        # Préstamos por estado y antigüedad (marcado y listado de vencidos)
+        db.Index("ix_prestamo_estado_fecha", "estado", "fecha_prestamo"),
+        # Préstamos por libro en un periodo (ranking de libros más prestados)
+        db.Index("ix_prestamo_fecha_libro", "fecha_prestamo", "libro_id"),
+        # Historial de un usuario ordenado por fecha (paginación por clave)
+        db.Index("ix_prestamo_usuario_fecha", "usuario_id", "fecha_prestamo"),
+        # Préstamos sin devolver ordenados por vencimiento (gestión de préstamos)
+        db.Index("ix_prestamo_devolucion_fecha", "fecha_devolucion", "fecha_prestamo"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     libro_id = db.Column(
@@ -47,6 +80,7 @@ class Prestamo(db.Model):
     estado = db.Column(
         db.String(20), default="activo"
     )  # Estados: activo, devuelto, vencido
+    fecha_recordatorio = db.Column(db.DateTime, nullable=True)
 
     # Relaciones con otros modelos
     libro = db.relationship("Libro", backref=db.backref("prestamos", lazy=True))
@@ -101,20 +135,59 @@ class Prestamo(db.Model):
         """
         Marca el préstamo como devuelto y actualiza la cantidad disponible del libro.
 
+        Si el libro tiene reservas en espera, el ejemplar se aparta para la
+        primera de la cola en la misma transacción en lugar de volver a estar
+        disponible. La devolución se hace con sentencias condicionales (ver
+        `services_prestamos.devolver_prestamo`), no con los valores cargados
+        en este objeto, que pueden estar desactualizados.
+
         Raises:
             ValueError: Si el préstamo ya ha sido devuelto.
         """
-        if self.fecha_devolucion:
-            raise ValueError("El préstamo ya ha sido devuelto.")
-        self.fecha_devolucion = datetime.now(timezone.utc)
-        self.estado = "devuelto"
-        self.libro.incrementar_cantidad()
-        db.session.commit()
+        # Importación local para evitar dependencias circulares
+        from src.services.services_prestamos import devolver_prestamo
+
+        devolver_prestamo(self.id)
+
+    @classmethod
+    def consulta_sin_devolver_de_libro(cls, libro_id):
+        """
+        Construye la consulta del préstamo sin devolver más antiguo de un libro.
+
+        Args:
+            libro_id (int): ID del libro.
+
+        Returns:
+            Select: Consulta de Prestamo que devuelve como mucho un préstamo.
+        """
+        return (
+            sa.select(cls)
+            .where(cls.libro_id == libro_id, cls.fecha_devolucion.is_(None))
+            .order_by(cls.fecha_prestamo, cls.id)
+            .limit(1)
+        )
+
+    @classmethod
+    def consulta_prestamos_activos(cls, usuario_id):
+        """
+        Construye la consulta que cuenta los préstamos activos y vencidos de un usuario.
+
+        Args:
+            usuario_id (int): ID del usuario.
+
+        Returns:
+            Select: Consulta con el número de préstamos.
+        """
+        return (
+            sa.select(sa.func.count())
+            .select_from(cls)
+            .where(cls.usuario_id == usuario_id, cls.estado.in_(("activo", "vencido")))
+        )
 
     @staticmethod
     def prestamos_activos(usuario_id):
         """
-        Devuelve el número de préstamos activos de un usuario.
+        Devuelve el número de préstamos activos (incluidos los vencidos) de un usuario.
 
         Args:
             usuario_id (int): ID del usuario.
@@ -122,13 +195,15 @@ class Prestamo(db.Model):
         Returns:
             int: Número de préstamos activos.
         """
-        return Prestamo.query.filter_by(usuario_id=usuario_id, estado="activo").count()
+        return db.session.execute(Prestamo.consulta_prestamos_activos(usuario_id)).scalar()
 
     @staticmethod
     def validar_prestamo(usuario_id, limite_prestamos=3):
         """
         Valida si un usuario puede realizar un nuevo préstamo.
 
+        Los préstamos vencidos siguen contando para el límite.
+
         Args:
             usuario_id (int): ID del usuario.
             limite_prestamos (int): Límite de préstamos permitidos.
@@ -136,9 +211,7 @@ class Prestamo(db.Model):
         Raises:
             ValueError: Si el usuario ha alcanzado el límite de préstamos.
         """
-        prestamos_activos = Prestamo.query.filter_by(
-            usuario_id=usuario_id, estado="activo"
-        ).count()
+        prestamos_activos = Prestamo.prestamos_activos(usuario_id)
         if prestamos_activos >= limite_prestamos:
             raise ValueError(
                 "El usuario ha alcanzado el límite de préstamos permitidos."
@@ -185,6 +258,162 @@ class Prestamo(db.Model):
             .all()
         )
 
+    @classmethod
+    def consulta_historial(cls, usuario_id, estado=None):
+        """
+        Construye la consulta del historial de un usuario y su ordenación.
+
+        Args:
+            usuario_id (int): ID del usuario.
+            estado (str, opcional): 'pendiente', 'devuelto' o 'vencido'.
+
+        Returns:
+            tuple: Consulta sin ORDER BY ni LIMIT y ordenación, como los
+            recibe `paginar_por_clave`.
+
+        Raises:
+            ValueError: Si el filtro de estado no es válido.
+        """
+        if estado and estado not in FILTROS_HISTORIAL:
+            raise ValueError(f"Estado no válido: {estado}")
+        consulta = (
+            sa.select(
+                cls.id,
+                cls.fecha_prestamo,
+                cls.fecha_devolucion,
+                cls.estado,
+                Libro.titulo.label("titulo"),
+            )
+            .outerjoin(Libro, Libro.id == cls.libro_id)
+            .where(cls.usuario_id == usuario_id)
+        )
+        if estado:
+            consulta = consulta.where(FILTROS_HISTORIAL[estado]())
+        return consulta, [(cls.fecha_prestamo, True), (cls.id, True)]
+
+    @classmethod
+    def pagina_historial(
+        cls, usuario_id, estado=None, despues=None, antes=None, limite=None
+    ):
+        """
+        Obtiene una página del historial de préstamos de un usuario, del más reciente al más antiguo.
+
+        Solo se leen las columnas que muestra el historial (con el título del
+        libro unido en la misma consulta) y la página se localiza con el índice
+        (usuario_id, fecha_prestamo) a partir del cursor.
+
+        Args:
+            usuario_id (int): ID del usuario.
+            estado (str, opcional): 'pendiente', 'devuelto' o 'vencido'.
+            despues (str, opcional): Cursor de la última fila de la página anterior.
+            antes (str, opcional): Cursor de la primera fila de la página siguiente.
+            limite (int, opcional): Tamaño de página (por defecto HISTORIAL_POR_PAGINA).
+
+        Returns:
+            dict: Página con las claves 'elementos', 'siguiente' y 'anterior'.
+
+        Raises:
+            ValueError: Si el filtro de estado no es válido.
+        """
+        consulta, orden = cls.consulta_historial(usuario_id, estado)
+        return paginar_por_clave(
+            consulta,
+            orden=orden,
+            limite=limite or current_app.config["HISTORIAL_POR_PAGINA"],
+            despues=despues,
+            antes=antes,
+        )
+
+    @classmethod
+    def consulta_sin_devolver(
+        cls, vencidos=False, usuario_id=None, libro_id=None, orden="vencimiento"
+    ):
+        """
+        Construye la consulta de la lista de préstamos sin devolver y su ordenación.
+
+        Args:
+            vencidos (bool): Si es True, solo los préstamos vencidos.
+            usuario_id (int, opcional): Solo los préstamos de este usuario.
+            libro_id (int, opcional): Solo los préstamos de este libro.
+            orden (str): 'vencimiento' (primero los que vencen antes) o 'usuario'.
+
+        Returns:
+            tuple: Consulta sin ORDER BY ni LIMIT y ordenación, como los
+            recibe `paginar_por_clave`.
+
+        Raises:
+            ValueError: Si la ordenación no es válida.
+        """
+        if orden not in ORDENES_SIN_DEVOLVER:
+            raise ValueError(f"Ordenación no válida: {orden}")
+        consulta = (
+            sa.select(
+                cls.id,
+                cls.fecha_prestamo,
+                cls.estado,
+                cls.libro_id,
+                cls.usuario_id,
+                Libro.titulo.label("titulo"),
+                Usuario.nombre,
+            )
+            .join(Usuario, Usuario.id == cls.usuario_id)
+            .outerjoin(Libro, Libro.id == cls.libro_id)
+            .where(cls.fecha_devolucion.is_(None))
+        )
+        if vencidos:
+            consulta = consulta.where(cls.estado == "vencido")
+        if usuario_id is not None:
+            consulta = consulta.where(cls.usuario_id == usuario_id)
+        if libro_id is not None:
+            consulta = consulta.where(cls.libro_id == libro_id)
+        return consulta, ORDENES_SIN_DEVOLVER[orden]()
+
+    @classmethod
+    def pagina_sin_devolver(
+        cls,
+        vencidos=False,
+        usuario_id=None,
+        libro_id=None,
+        orden="vencimiento",
+        despues=None,
+        antes=None,
+        limite=None,
+    ):
+        """
+        Obtiene una página de los préstamos sin devolver para su gestión.
+
+        Solo se leen las columnas que muestra la lista, con el título del libro
+        y el nombre del usuario unidos en la misma consulta. Cada combinación
+        de filtro y orden se resuelve con un índice: (fecha_devolucion,
+        fecha_prestamo), (estado, fecha_prestamo), (usuario_id,
+        fecha_devolucion), (libro_id, fecha_devolucion) o el nombre del usuario.
+
+        Args:
+            vencidos (bool): Si es True, solo los préstamos vencidos.
+            usuario_id (int, opcional): Solo los préstamos de este usuario.
+            libro_id (int, opcional): Solo los préstamos de este libro.
+            orden (str): 'vencimiento' (primero los que vencen antes) o 'usuario'.
+            despues (str, opcional): Cursor de la última fila de la página anterior.
+            antes (str, opcional): Cursor de la primera fila de la página siguiente.
+            limite (int, opcional): Tamaño de página (por defecto PRESTAMOS_POR_PAGINA).
+
+        Returns:
+            dict: Página con las claves 'elementos', 'siguiente' y 'anterior'.
+
+        Raises:
+            ValueError: Si la ordenación no es válida.
+        """
+        consulta, orden_pagina = cls.consulta_sin_devolver(
+            vencidos, usuario_id, libro_id, orden
+        )
+        return paginar_por_clave(
+            consulta,
+            orden=orden_pagina,
+            limite=limite or current_app.config["PRESTAMOS_POR_PAGINA"],
+            despues=despues,
+            antes=antes,
+        )
+
     def calcular_penalizacion(self, tarifa_por_dia=1):
         """
         Calcula la penalización por días de retraso.
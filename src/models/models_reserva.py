@@ -10,7 +10,12 @@ Fecha: 2025-05-17
 
 from extensions import db
 from datetime import datetime, timezone, timedelta
-from sqlalchemy import exc
+from flask import current_app
+from sqlalchemy import exc, select, update
+from src.services.services_paginacion import paginar_por_clave
+
+# Estados de la lista de reservas por gestionar
+ESTADOS_GESTION = ("pendiente", "retenida")
 
 
 class Reserva(db.Model):
@@ -22,10 +27,23 @@ class Reserva(db.Model):
         libro_id (int): ID del libro reservado.
         usuario_id (int): ID del usuario que realiza la reserva.
         fecha_reserva (datetime): Fecha y hora en que se realizó la reserva.
-        estado (str): Estado de la reserva ('pendiente', 'aprobada', 'rechazada').
+        estado (str): Estado de la reserva ('pendiente' mientras espera en la
+            cola del libro, 'retenida' si se le ha apartado un ejemplar
+            devuelto, 'aprobada', 'rechazada').
+        fecha_retencion (datetime): Fecha en que se apartó el ejemplar, o None.
     """
 
     __tablename__ = "reserva"
+    __table_args__ = (
+        # Reservas por estado en orden de llegada (reservas pendientes)
+        db.Index("ix_reserva_estado_fecha", "estado", "fecha_reserva"),
+        # Cola de espera de cada libro: primera reserva y posición de cada una
+        db.Index("ix_reserva_libro_estado_fecha", "libro_id", "estado", "fecha_reserva"),
+        # Reservas de un usuario por estado en orden de llegada
+        db.Index(
+            "ix_reserva_usuario_estado_fecha", "usuario_id", "estado", "fecha_reserva"
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     libro_id = db.Column(
@@ -37,7 +55,8 @@ class Reserva(db.Model):
     fecha_reserva = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     estado = db.Column(
         db.String(20), default="pendiente"
-    )  # Estados posibles: pendiente, aprobada, rechazada
+    )  # Estados posibles: pendiente, retenida, aprobada, rechazada
+    fecha_retencion = db.Column(db.DateTime, nullable=True)
 
     # Relaciones con otros modelos
     libro = db.relationship("Libro", backref=db.backref("reservas", lazy=True))
@@ -58,11 +77,14 @@ class Reserva(db.Model):
         """
         Valida si un libro puede ser reservado.
 
+        Los libros sin ejemplares disponibles también se pueden reservar: la
+        reserva espera en la cola del libro.
+
         Args:
             libro_id (int): ID del libro a reservar.
 
         Raises:
-            ValueError: Si el libro no existe o no está disponible para reserva.
+            ValueError: Si el libro no existe.
         """
         # Importación local para evitar dependencias circulares
         from src.models.models_libro import Libro
@@ -70,25 +92,175 @@ class Reserva(db.Model):
         libro = Libro.query.get(libro_id)
         if not libro:
             raise ValueError("El libro no existe.")
-        # Se llama como propiedad, no como método
-        if not libro.esta_disponible:
-            raise ValueError("El libro no está disponible para reserva.")
+
+    @classmethod
+    def consulta_gestion(cls, estado="pendiente", usuario_id=None, libro_id=None):
+        """
+        Construye la consulta de la lista de reservas por gestionar y su ordenación.
+
+        Args:
+            estado (str): 'pendiente' (en espera) o 'retenida' (con ejemplar apartado).
+            usuario_id (int, opcional): Solo las reservas de este usuario.
+            libro_id (int, opcional): Solo las reservas de este libro.
+
+        Returns:
+            tuple: Consulta sin ORDER BY ni LIMIT y ordenación, como los
+            recibe `paginar_por_clave`.
+
+        Raises:
+            ValueError: Si el estado no es válido.
+        """
+        # Importación local para evitar dependencias circulares
+        from src.models.models_libro import Libro
+        from src.models.models_usuario import Usuario
+
+        if estado not in ESTADOS_GESTION:
+            raise ValueError(f"Estado no válido: {estado}")
+        consulta = (
+            select(
+                cls.id,
+                cls.fecha_reserva,
+                cls.fecha_retencion,
+                cls.estado,
+                cls.libro_id,
+                cls.usuario_id,
+                Libro.titulo,
+                Usuario.nombre,
+                Usuario.email,
+            )
+            .outerjoin(Libro, Libro.id == cls.libro_id)
+            .outerjoin(Usuario, Usuario.id == cls.usuario_id)
+            .where(cls.estado == estado)
+        )
+        if usuario_id is not None:
+            consulta = consulta.where(cls.usuario_id == usuario_id)
+        if libro_id is not None:
+            consulta = consulta.where(cls.libro_id == libro_id)
+        return consulta, [(cls.fecha_reserva, False), (cls.id, False)]
+
+    @classmethod
+    def pagina_gestion(
+        cls,
+        estado="pendiente",
+        usuario_id=None,
+        libro_id=None,
+        despues=None,
+        antes=None,
+        limite=None,
+    ):
+        """
+        Obtiene una página de las reservas por gestionar, por orden de llegada.
+
+        Solo se leen las columnas que muestra la lista, con el título del libro
+        y el nombre y correo del usuario unidos en la misma consulta. Cada
+        filtro se resuelve con un índice: (estado, fecha_reserva), (libro_id,
+        estado, fecha_reserva) o (usuario_id, estado, fecha_reserva).
+
+        Args:
+            estado (str): 'pendiente' (en espera) o 'retenida' (con ejemplar apartado).
+            usuario_id (int, opcional): Solo las reservas de este usuario.
+            libro_id (int, opcional): Solo las reservas de este libro.
+            despues (str, opcional): Cursor de la última fila de la página anterior.
+            antes (str, opcional): Cursor de la primera fila de la página siguiente.
+            limite (int, opcional): Tamaño de página (por defecto RESERVAS_POR_PAGINA).
+
+        Returns:
+            dict: Página con las claves 'elementos', 'siguiente' y 'anterior'.
+
+        Raises:
+            ValueError: Si el estado no es válido.
+        """
+        consulta, orden = cls.consulta_gestion(estado, usuario_id, libro_id)
+        return paginar_por_clave(
+            consulta,
+            orden=orden,
+            limite=limite or current_app.config["RESERVAS_POR_PAGINA"],
+            despues=despues,
+            antes=antes,
+        )
+
+    @classmethod
+    def consulta_retenciones_caducadas(cls, fecha_limite, limite):
+        """
+        Construye la consulta de las reservas retenidas antes de `fecha_limite`.
+
+        Args:
+            fecha_limite (datetime): Fecha de retención a partir de la cual
+                el ejemplar sigue apartado.
+            limite (int): Número máximo de reservas.
+
+        Returns:
+            Select: IDs y libros de las reservas, de la retención más antigua
+            a la más reciente.
+        """
+        return (
+            select(cls.id, cls.libro_id)
+            .where(cls.estado == "retenida", cls.fecha_retencion < fecha_limite)
+            .order_by(cls.fecha_retencion, cls.id)
+            .limit(limite)
+        )
 
     @staticmethod
-    def expirar_reservas():
+    def expirar_reservas(tamano_lote=None, ahora=None):
         """
-        Marca como expiradas (rechazadas) las reservas que no se han aprobado después de un período de tiempo.
+        Marca como expiradas (rechazadas) las reservas retenidas cuyo ejemplar no se ha recogido a tiempo.
+
+        Las reservas pendientes no expiran: esperan en la cola del libro hasta
+        que se les aparta un ejemplar, y su turno depende de su posición y no
+        de su antigüedad. Una reserva retenida expira RESERVAS_DIAS_EXPIRACION
+        días (7 por defecto) después de `fecha_retencion`, y su ejemplar pasa a
+        la siguiente reserva de la cola o vuelve a estar disponible, de modo
+        que un usuario que no lo recoge no lo deja fuera de circulación.
+
+        Las reservas se procesan por bloques que se leen y bloquean con el
+        prefijo (estado) del índice (estado, fecha_reserva); cada bloque se
+        rechaza con un único UPDATE, libera sus ejemplares y se confirma en su
+        propia transacción.
 
-        El período de expiración es de 7 días desde la fecha de reserva.
+        Args:
+            tamano_lote (int, opcional): Reservas por bloque (por defecto
+                RESERVAS_TAMANO_LOTE).
+            ahora (datetime, opcional): Momento de referencia.
+
+        Returns:
+            int: Número de reservas expiradas.
         """
-        fecha_limite = datetime.now(timezone.utc) - timedelta(days=7)
-        reservas_expiradas = Reserva.query.filter(
-            Reserva.estado == "pendiente", Reserva.fecha_reserva < fecha_limite
-        ).all()
-        for reserva in reservas_expiradas:
-            reserva.estado = "rechazada"
-        try:
-            db.session.commit()
-        except exc.SQLAlchemyError:
-            db.session.rollback()
-            raise  # Eliminamos la variable `e` porque no se usa
+        # Importación local para evitar dependencias circulares
+        from src.services.services_reservas import liberar_ejemplares
+
+        configuracion = current_app.config
+        tamano_lote = tamano_lote or configuracion["RESERVAS_TAMANO_LOTE"]
+        ahora = ahora or datetime.now(timezone.utc)
+        fecha_limite = ahora - timedelta(days=configuracion["RESERVAS_DIAS_EXPIRACION"])
+        total = 0
+        while True:
+            try:
+                filas = db.session.execute(
+                    Reserva.consulta_retenciones_caducadas(
+                        fecha_limite, tamano_lote
+                    ).with_for_update()
+                ).all()
+                if not filas:
+                    db.session.rollback()
+                    break
+                db.session.execute(
+                    update(Reserva)
+                    .where(
+                        Reserva.id.in_([fila.id for fila in filas]),
+                        Reserva.estado == "retenida",
+                    )
+                    .values(estado="rechazada")
+                    .execution_options(synchronize_session=False)
+                )
+                # Las nuevas retenciones empiezan ahora, así que no caducan en este bucle
+                liberar_ejemplares(
+                    [fila.libro_id for fila in filas if fila.libro_id is not None], ahora
+                )
+                db.session.commit()
+            except exc.SQLAlchemyError:
+                db.session.rollback()
+                raise
+            total += len(filas)
+            if len(filas) < tamano_lote:
+                break
+        return total
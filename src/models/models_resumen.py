@@ -0,0 +1,41 @@
+"""
+Módulo de modelo de datos para el resumen del catálogo de la aplicación de biblioteca.
+
+Define la clase ResumenCatalogo, una tabla de contadores materializados con el
+número de libros, ejemplares disponibles y ejemplares prestados por autor,
+género y editorial, que se mantiene en la misma transacción que las
+escrituras de libros y préstamos.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+from extensions import db
+
+
+class ResumenCatalogo(db.Model):
+    """
+    Modelo que representa los contadores del catálogo para un valor de una dimensión.
+
+    Atributos:
+        dimension (str): Campo por el que se agrupa ('autor', 'genero' o
+            'editorial').
+        valor (str): Valor del campo.
+        libros (int): Número de libros con ese valor.
+        disponibles (int): Suma de ejemplares disponibles de esos libros.
+        prestados (int): Número de préstamos sin devolver de esos libros.
+    """
+
+    __tablename__ = "resumen_catalogo"
+
+    dimension = db.Column(db.String(20), primary_key=True)
+    valor = db.Column(db.String(100), primary_key=True)
+    libros = db.Column(db.Integer, nullable=False, default=0)
+    disponibles = db.Column(db.Integer, nullable=False, default=0)
+    prestados = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        """
+        Representación legible del objeto ResumenCatalogo para depuración.
+        """
+        return f"<ResumenCatalogo {self.dimension}={self.valor}: {self.libros}>"
@@ -43,12 +43,12 @@ class Usuario(UserMixin, db.Model):
     __tablename__ = "usuario"
 
     id = db.Column(db.Integer, primary_key=True)
-    nombre = db.Column(db.String(100), nullable=False)
+    nombre = db.Column(db.String(100), nullable=False, index=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     __contrasena_hash = db.Column(db.String(255), nullable=False)
     rol = db.Column(db.String(20), default="usuario")
     email_confirmado = db.Column(db.Boolean, default=False)
-    token_confirmacion = db.Column(db.String(100), nullable=True)
+    token_confirmacion = db.Column(db.String(100), nullable=True, index=True)
     intentos_fallidos = db.Column(db.Integer, default=0)
     cuenta_bloqueada_hasta = db.Column(db.DateTime, nullable=True)
     token_expiracion = db.Column(db.DateTime, nullable=True)
@@ -210,6 +210,19 @@ class Usuario(UserMixin, db.Model):
             logging.error(error_msg)
             raise ValueError(error_msg)
 
+    @classmethod
+    def consulta_por_token(cls, token):
+        """
+        Construye la consulta del usuario con un token de confirmación o recuperación.
+
+        Args:
+            token (str): Token recibido en el enlace.
+
+        Returns:
+            Select: Consulta de Usuario que devuelve como mucho un usuario.
+        """
+        return db.select(cls).where(cls.token_confirmacion == token).limit(1)
+
     def confirmar_email(self):
         """
         Marca el correo del usuario como confirmado y elimina el token.
@@ -407,28 +420,90 @@ class Usuario(UserMixin, db.Model):
 
     def tiene_reservas_activas(self):
         """
-        Verifica si el usuario tiene reservas pendientes o aprobadas.
+        Verifica si el usuario tiene reservas pendientes, retenidas o aprobadas.
+
+        Se resuelve con un EXISTS sobre el índice (usuario_id, estado), sin
+        cargar las reservas.
 
         Returns:
             bool: True si tiene reservas activas, False en caso contrario.
         """
-        return any(
-            reserva.estado in ["pendiente", "aprobada"] for reserva in self.reservas
-        )
+        # Importación local para evitar dependencias circulares
+        from src.models.models_reserva import Reserva
+
+        return db.session.execute(
+            db.select(
+                db.exists().where(
+                    Reserva.usuario_id == self.id,
+                    Reserva.estado.in_(("pendiente", "retenida", "aprobada")),
+                )
+            )
+        ).scalar()
 
     def obtener_estadisticas_reservas(self):
         """
         Obtiene estadísticas de las reservas del usuario.
 
         Returns:
-            dict: Diccionario con estadísticas de reservas.
+            dict: Diccionario con estadísticas de reservas (ver
+            `estadisticas_reservas`).
         """
-        return {
-            "total": len(self.reservas),
-            "pendientes": sum(1 for r in self.reservas if r.estado == "pendiente"),
-            "aprobadas": sum(1 for r in self.reservas if r.estado == "aprobada"),
-            "rechazadas": sum(1 for r in self.reservas if r.estado == "rechazada"),
+        return Usuario.estadisticas_reservas([self.id])[self.id]
+
+    @staticmethod
+    def consulta_estadisticas_reservas(usuario_ids):
+        """
+        Construye la consulta que cuenta las reservas por usuario y estado.
+
+        Args:
+            usuario_ids (iterable): IDs de los usuarios.
+
+        Returns:
+            Select: Consulta con filas (usuario_id, estado, total).
+        """
+        # Importación local para evitar dependencias circulares
+        from src.models.models_reserva import Reserva
+
+        return (
+            db.select(Reserva.usuario_id, Reserva.estado, db.func.count())
+            .where(Reserva.usuario_id.in_(list(usuario_ids)))
+            .group_by(Reserva.usuario_id, Reserva.estado)
+        )
+
+    @staticmethod
+    def estadisticas_reservas(usuario_ids):
+        """
+        Obtiene las estadísticas de reservas de varios usuarios con una sola consulta.
+
+        Las reservas se cuentan agrupadas por usuario y estado con el índice
+        (usuario_id, estado), de modo que un listado de usuarios no carga las
+        reservas de cada uno.
+
+        Args:
+            usuario_ids (list): IDs de los usuarios.
+
+        Returns:
+            dict: Por cada ID, un diccionario con 'total', 'pendientes',
+            'retenidas', 'aprobadas' y 'rechazadas' (0 si no tiene reservas).
+        """
+        claves = {
+            "pendiente": "pendientes",
+            "retenida": "retenidas",
+            "aprobada": "aprobadas",
+            "rechazada": "rechazadas",
+        }
+        estadisticas = {
+            usuario_id: dict.fromkeys(("total", *claves.values()), 0)
+            for usuario_id in usuario_ids
         }
+        if not estadisticas:
+            return estadisticas
+        filas = db.session.execute(Usuario.consulta_estadisticas_reservas(estadisticas))
+        for usuario_id, estado, total in filas:
+            estadisticas[usuario_id]["total"] += total
+            if estado in claves:
+                estadisticas[usuario_id][claves[estado]] += total
+        return estadisticas
 
     def notificar_eliminacion(self):
         """
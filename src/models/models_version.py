@@ -0,0 +1,36 @@
+"""
+Módulo de modelo de datos para la versión del catálogo de la aplicación de biblioteca.
+
+Define la clase VersionCatalogo, una tabla de una sola fila con un contador
+que se incrementa tras cada transacción que modifica libros o préstamos. Sirve
+para generar los ETag y la fecha Last-Modified de las páginas del catálogo.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+from extensions import db
+
+
+class VersionCatalogo(db.Model):
+    """
+    Modelo que representa la versión actual de los datos del catálogo.
+
+    Atributos:
+        id (int): Identificador de la fila (siempre 1).
+        version (int): Contador incrementado tras cada commit que modifica
+            libros o préstamos.
+        fecha_modificacion (datetime): Fecha y hora (UTC) del último incremento.
+    """
+
+    __tablename__ = "version_catalogo"
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    fecha_modificacion = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        """
+        Representación legible del objeto VersionCatalogo para depuración.
+        """
+        return f"<VersionCatalogo {self.version}>"
@@ -100,7 +100,7 @@ def confirmar_email(token):
         },
     ]
     try:
-        usuario = Usuario.query.filter_by(token_confirmacion=token).first()
+        usuario = db.session.execute(Usuario.consulta_por_token(token)).scalar()
         if not usuario:
             return render_template(
                 "confirmar_email.html",
@@ -245,7 +245,7 @@ def restablecer_contrasena(token):
             "url": url_for("auth.restablecer_contrasena", token=token),
         },
     ]
-    usuario = Usuario.query.filter_by(token_confirmacion=token).first()
+    usuario = db.session.execute(Usuario.consulta_por_token(token)).scalar()
 
     # Verificar si el token es válido
     if not usuario or datetime.utcnow() > usuario.token_expiracion:
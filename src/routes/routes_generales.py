@@ -8,8 +8,9 @@ Autor: Francisco Javier
 Fecha: 2025-05-17
 """
 
-from flask import Blueprint, send_from_directory, render_template, url_for
+from flask import Blueprint, send_from_directory, render_template, url_for, request
 from src.models.models_libro import Libro  # Importar la clase Libro
+from src.services.services_version import respuesta_condicional
 import os
 import logging
 
@@ -33,30 +34,28 @@ def favicon():
 
 
 @generales_bp.route("/")
+@respuesta_condicional
 def index():
     """
     Página principal de la aplicación.
 
-    Muestra una lista de libros disponibles y el total de libros en la biblioteca.
+    Muestra una página del catálogo ordenada por título y el total de libros
+    en la biblioteca. La navegación entre páginas usa los cursores `despues`
+    y `antes` de la URL. Responde 304 si el catálogo no ha cambiado desde la
+    versión que tiene el navegador.
 
     Returns:
         str: Renderiza la plantilla 'index.html' con los datos de los libros y breadcrumbs.
     """
     breadcrumbs = [{"name": "Inicio", "url": url_for("generales.index")}]
-    libros = Libro.query.all()
-    libros_data = [
-        {
-            "id": libro.id,
-            "titulo": libro.titulo,
-            "autor": libro.autor,
-            "esta_disponible": libro.esta_disponible,  # Propiedad booleana
-        }
-        for libro in libros
-    ]
+    pagina = Libro.pagina_catalogo(
+        despues=request.args.get("despues"), antes=request.args.get("antes")
+    )
     total_libros = Libro.contar_libros()
     return render_template(
         "index.html",
-        libros=libros_data,
+        libros=pagina["elementos"],
+        pagina=pagina,
         total_libros=total_libros,
         breadcrumbs=breadcrumbs,
     )
@@ -1,7 +1,7 @@
 """
 Módulo de rutas para la gestión de libros en la aplicación de biblioteca.
 
-Incluye rutas para agregar, editar, eliminar, buscar, importar libros y
+Incluye rutas para agregar, editar, eliminar, buscar, importar y exportar libros y
 mostrar libros agrupados por autor, género o título. Solo usuarios con
 rol de bibliotecario o administrador pueden modificar los datos.
 
@@ -9,20 +9,34 @@ Autor: Francisco Javier
 Fecha: 2025-05-17
 """
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request
-from flask_login import login_required
+from flask import (
+    Blueprint,
+    render_template,
+    redirect,
+    url_for,
+    flash,
+    request,
+    abort,
+    jsonify,
+)
+from flask_login import login_required, current_user
 from src.models.models_libro import Libro
+from src.models.models_importacion import TrabajoImportacion
 from src.forms.forms import AgregarLibroForm, EditarLibroForm
 from src.permissions import requiere_rol
+from src.services.services_busqueda import buscar_libros
+from src.services.services_exportacion import respuesta_exportacion
+from src.services.services_version import respuesta_condicional
+from src.services.services_trabajos import encolar_importacion, trabajos_recientes
+from src.services.services_facetas import (
+    pagina_facetas,
+    miembros_faceta as obtener_miembros_faceta,
+)
 from extensions import db
 import logging
-import os
-import csv
-from werkzeug.utils import secure_filename
 
 libros_bp = Blueprint("libros", __name__)
 
-UPLOAD_FOLDER = "uploads"
 ALLOWED_EXTENSIONS = {"csv"}
 
 
@@ -96,10 +110,14 @@ def agregar_libro():
 
 
 @libros_bp.route("/buscar_libro", methods=["GET", "POST"])
+@respuesta_condicional
 def buscar_libro():
     """
     Ruta para buscar libros por término (título, autor, ISBN, género o editorial).
 
+    Los resultados se obtienen del índice invertido del catálogo, ordenados por
+    relevancia y paginados con el parámetro `pagina`.
+
     Returns:
         str: Renderiza la plantilla con los resultados de la búsqueda.
     """
@@ -108,23 +126,23 @@ def buscar_libro():
         {"name": "Buscar Libro", "url": url_for("libros.buscar_libro")},
     ]
     termino = request.args.get("termino", "").strip()
-    libros = []
+    pagina = request.args.get("pagina", 1, type=int)
+    resultado = {"libros": [], "total": 0, "pagina": 1, "paginas": 0}
     if termino:
-        libros = Libro.query.filter(
-            (Libro.titulo.ilike(f"%{termino}%"))
-            | (Libro.autor.ilike(f"%{termino}%"))
-            | (Libro.isbn.ilike(f"%{termino}%"))
-            | (Libro.genero.ilike(f"%{termino}%"))
-            | (Libro.editorial.ilike(f"%{termino}%"))
-        ).all()
+        resultado = buscar_libros(termino, pagina=pagina)
     return render_template(
-        "buscar_libro.html", libros=libros, termino=termino, breadcrumbs=breadcrumbs
+        "buscar_libro.html",
+        libros=resultado["libros"],
+        resultado=resultado,
+        termino=termino,
+        breadcrumbs=breadcrumbs,
     )
 
 
 @libros_bp.route("/gestion_libros")
 @login_required
 @requiere_rol("bibliotecario", "admin")
+@respuesta_condicional
 def gestion_libros():
     """
     Ruta para mostrar la gestión de libros (solo bibliotecarios y admins).
@@ -220,12 +238,35 @@ def eliminar_libro(libro_id):
     return render_template("eliminar_libro.html", libro=libro, breadcrumbs=breadcrumbs)
 
 
+def renderizar_facetas(faceta, plantilla, breadcrumbs):
+    """
+    Renderiza una página de valores de faceta con su número de libros.
+
+    Args:
+        faceta (str): Campo por el que se agrupa el catálogo.
+        plantilla (str): Plantilla que muestra las facetas.
+        breadcrumbs (list): Migas de pan de la página.
+
+    Returns:
+        str: Plantilla renderizada.
+    """
+    pagina = request.args.get("pagina", 1, type=int)
+    facetas = pagina_facetas(faceta, pagina=pagina)
+    return render_template(
+        plantilla, faceta=faceta, facetas=facetas, breadcrumbs=breadcrumbs
+    )
+
+
 @libros_bp.route("/autores", methods=["GET"])
 @login_required
+@respuesta_condicional
 def libros_por_autor():
     """
     Ruta para mostrar libros agrupados por autor.
 
+    Lista los autores paginados con su número de libros; los libros de cada
+    autor se cargan al desplegarlo desde `libros.miembros_faceta`.
+
     Returns:
         str: Renderiza la plantilla con los libros agrupados por autor.
     """
@@ -233,27 +274,19 @@ def libros_por_autor():
         {"name": "Inicio", "url": url_for("generales.index")},
         {"name": "Autores", "url": url_for("libros.libros_por_autor")},
     ]
-    libros = Libro.query.all()
-    data = {}
-    for libro in libros:
-        if libro.autor not in data:
-            data[libro.autor] = []
-        data[libro.autor].append(
-            {
-                "id": libro.id,
-                "titulo": libro.titulo,
-                "esta_disponible": libro.esta_disponible,  # Propiedad booleana
-            }
-        )
-    return render_template("autores.html", data=data, breadcrumbs=breadcrumbs)
+    return renderizar_facetas("autor", "autores.html", breadcrumbs)
 
 
 @libros_bp.route("/generos", methods=["GET"])
 @login_required
+@respuesta_condicional
 def libros_por_genero():
     """
     Ruta para mostrar libros agrupados por género.
 
+    Lista los géneros paginados con su número de libros; los libros de cada
+    género se cargan al desplegarlo desde `libros.miembros_faceta`.
+
     Returns:
         str: Renderiza la plantilla con los libros agrupados por género.
     """
@@ -261,27 +294,19 @@ def libros_por_genero():
         {"name": "Inicio", "url": url_for("generales.index")},
         {"name": "Genero", "url": url_for("libros.libros_por_genero")},
     ]
-    libros = Libro.query.all()
-    data = {}
-    for libro in libros:
-        if libro.genero not in data:
-            data[libro.genero] = []
-        data[libro.genero].append(
-            {
-                "id": libro.id,
-                "titulo": libro.titulo,
-                "esta_disponible": libro.esta_disponible,
-            }
-        )
-    return render_template("generos.html", data=data, breadcrumbs=breadcrumbs)
+    return renderizar_facetas("genero", "generos.html", breadcrumbs)
 
 
 @libros_bp.route("/titulos", methods=["GET"])
 @login_required
+@respuesta_condicional
 def libros_por_titulo():
     """
     Ruta para mostrar libros agrupados por título.
 
+    Lista los títulos paginados con su número de ejemplares registrados; los
+    libros de cada título se cargan al desplegarlo desde `libros.miembros_faceta`.
+
     Returns:
         str: Renderiza la plantilla con los libros agrupados por título.
     """
@@ -289,20 +314,32 @@ def libros_por_titulo():
         {"name": "Inicio", "url": url_for("generales.index")},
         {"name": "Titulo", "url": url_for("libros.libros_por_titulo")},
     ]
-    libros = Libro.query.all()
-    data = {}
-    for libro in libros:
-        if libro.titulo not in data:
-            data[libro.titulo] = []
-        data[libro.titulo].append(
-            {
-                "id": libro.id,
-                "titulo": libro.titulo,
-                "autor": libro.autor,
-                "disponible": libro.esta_disponible,
-            }
-        )
-    return render_template("titulos.html", data=data, breadcrumbs=breadcrumbs)
+    return renderizar_facetas("titulo", "titulos.html", breadcrumbs)
+
+
+@libros_bp.route("/facetas/<faceta>/miembros", methods=["GET"])
+@login_required
+def miembros_faceta(faceta):
+    """
+    Devuelve el fragmento HTML con una página de libros de un valor de faceta.
+
+    Se solicita desde el navegador al desplegar un autor, género o título.
+
+    Args:
+        faceta (str): Campo por el que se agrupa ('autor', 'genero', 'titulo').
+
+    Returns:
+        str: Fragmento HTML con la lista de libros, o 404 si la faceta no existe.
+    """
+    valor = request.args.get("valor", "")
+    pagina = request.args.get("pagina", 1, type=int)
+    try:
+        miembros = obtener_miembros_faceta(faceta, valor, pagina=pagina)
+    except ValueError:
+        abort(404)
+    return render_template(
+        "_miembros_faceta.html", faceta=faceta, valor=valor, miembros=miembros
+    )
 
 
 @libros_bp.route("/importar_datos", methods=["GET", "POST"])
@@ -313,11 +350,12 @@ def importar_datos():
     Ruta para importar libros desde un archivo CSV.
 
     - Solo accesible para administradores.
-    - Valida y procesa el archivo.
-    - Agrega los libros a la base de datos.
+    - Guarda el archivo y encola su importación en segundo plano.
+    - Muestra las últimas importaciones.
 
     Returns:
-        str: Renderiza la plantilla de importación o redirige tras importar.
+        str: Renderiza la plantilla de importación o redirige al seguimiento
+        del trabajo creado.
     """
     breadcrumbs = [
         {"name": "Inicio", "url": url_for("generales.index")},
@@ -333,39 +371,84 @@ def importar_datos():
             flash("No se seleccionó ningún archivo.", "danger")
             return redirect(request.url)
         if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(UPLOAD_FOLDER, filename)
-            file.save(filepath)
             try:
-                with open(filepath, newline="", encoding="utf-8") as csvfile:
-                    reader = csv.DictReader(csvfile)
-                    for row in reader:
-                        if (
-                            not row["titulo"]
-                            or not row["autor"]
-                            or not row["isbn"]
-                            or not row["cantidad"]
-                            or not row["editorial"]
-                            or not row["genero"]
-                        ):
-                            raise ValueError(
-                                "Faltan campos obligatorios en el archivo CSV."
-                            )
-                        nuevo_libro = Libro(
-                            titulo=row["titulo"],
-                            autor=row["autor"],
-                            isbn=row["isbn"],
-                            editorial=row["editorial"],
-                            genero=row["genero"],
-                            cantidad=int(row["cantidad"]),
-                        )
-                        db.session.add(nuevo_libro)
-                    db.session.commit()
-                    flash("Datos importados exitosamente.", "success")
-            except Exception as e:
-                db.session.rollback()
+                trabajo = encolar_importacion(file, current_user.id)
+            except ValueError as e:
                 flash(f"Error al importar datos: {e}", "danger")
-            finally:
-                os.remove(filepath)
-            return redirect(url_for("libros.gestion_libros"))
-    return render_template("importar_datos.html", breadcrumbs=breadcrumbs)
+                return redirect(request.url)
+            flash("Archivo recibido. La importación se procesa en segundo plano.", "info")
+            return redirect(
+                url_for("libros.trabajo_importacion", trabajo_id=trabajo.id)
+            )
+    return render_template(
+        "importar_datos.html",
+        breadcrumbs=breadcrumbs,
+        trabajos=trabajos_recientes(),
+    )
+
+
+@libros_bp.route("/importaciones/<int:trabajo_id>", methods=["GET"])
+@login_required
+@requiere_rol("admin")
+def trabajo_importacion(trabajo_id):
+    """
+    Ruta para seguir el progreso de una importación en segundo plano.
+
+    Args:
+        trabajo_id (int): ID del trabajo de importación.
+
+    Returns:
+        str: Renderiza la plantilla con el estado y los errores del trabajo.
+    """
+    trabajo = TrabajoImportacion.query.get_or_404(trabajo_id)
+    breadcrumbs = [
+        {"name": "Inicio", "url": url_for("generales.index")},
+        {"name": "Importar Datos", "url": url_for("libros.importar_datos")},
+        {
+            "name": f"Importación {trabajo.id}",
+            "url": url_for("libros.trabajo_importacion", trabajo_id=trabajo.id),
+        },
+    ]
+    return render_template(
+        "trabajo_importacion.html", trabajo=trabajo, breadcrumbs=breadcrumbs
+    )
+
+
+@libros_bp.route("/importaciones/<int:trabajo_id>/estado", methods=["GET"])
+@login_required
+@requiere_rol("admin")
+def estado_trabajo_importacion(trabajo_id):
+    """
+    Devuelve en JSON el estado y el progreso de una importación.
+
+    Args:
+        trabajo_id (int): ID del trabajo de importación.
+
+    Returns:
+        Response: Estado del trabajo en formato JSON.
+    """
+    trabajo = TrabajoImportacion.query.get_or_404(trabajo_id)
+    return jsonify(trabajo.a_diccionario())
+
+
+@libros_bp.route("/exportar", methods=["GET"])
+@login_required
+@requiere_rol("bibliotecario", "admin")
+def exportar_libros():
+    """
+    Exporta el catálogo de libros en CSV o JSON Lines, en streaming.
+
+    Parámetros de la petición:
+        formato (str): 'csv' (por defecto) o 'ndjson'.
+        gzip (bool): Si es verdadero, el archivo se comprime con gzip.
+        autor, genero, editorial (str): Filtran por valor exacto.
+        disponible (bool): Solo libros con o sin ejemplares disponibles.
+
+    Returns:
+        Response: Archivo adjunto generado por bloques, o 400 si algún
+        parámetro no es válido.
+    """
+    try:
+        return respuesta_exportacion("libros", request.args)
+    except ValueError as e:
+        abort(400, description=str(e))
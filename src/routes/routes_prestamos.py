@@ -1,26 +1,58 @@
 """
 Módulo de rutas para la gestión de préstamos y reservas en la aplicación de biblioteca.
 
-Incluye rutas para prestar, devolver, reservar libros, aprobar/rechazar reservas,
-gestionar préstamos, mostrar recordatorios e historial, y buscar usuarios.
+Incluye rutas para prestar, devolver, reservar libros, consultar la cola de
+reservas propia, aprobar/rechazar reservas una a una o por lotes,
+gestionar y exportar préstamos, prestar o devolver por lotes en el mostrador,
+consultar y exportar el informe de multas, consultar la actividad diaria,
+mostrar recordatorios e historial, y buscar usuarios.
 Solo usuarios con rol de bibliotecario o administrador pueden modificar préstamos.
 
 Autor: Francisco Javier
 Fecha: 2025-05-17
 """
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import (
+    Blueprint,
+    current_app,
+    render_template,
+    redirect,
+    url_for,
+    flash,
+    request,
+    jsonify,
+    abort,
+)
 from flask_login import login_required, current_user
 from extensions import db
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, timezone, timedelta
 from sqlalchemy.orm import joinedload
 import logging
 from urllib.parse import urlencode
 from src.models.models_prestamo import Prestamo
 from src.models.models_libro import Libro
-from src.models.models_usuario import Usuario
 from src.permissions import requiere_rol
 from src.models.models_reserva import Reserva
+from src.services.services_actividad import (
+    TOTAL_ACTIVIDAD,
+    serie_actividad,
+    totales_actividad,
+)
+from src.services.services_autocompletar import autocompletar_usuarios
+from src.services.services_exportacion import respuesta_exportacion
+from src.services.services_prestamos import (
+    devolver_lote,
+    prestar_lote,
+    realizar_prestamo,
+)
+from src.services.services_multas import AGRUPACIONES, pagina_totales, total_multas
+from src.services.services_ranking import VENTANAS, libros_mas_prestados
+from src.services.services_reservas import (
+    cola_usuario,
+    posicion_en_cola,
+    procesar_reservas,
+)
+from src.services.services_vencimientos import contar_vencidos
 
 prestamos_bp = Blueprint("prestamos", __name__)
 
@@ -31,11 +63,15 @@ prestamos_bp = Blueprint("prestamos", __name__)
 @requiere_rol("bibliotecario", "admin")
 def prestar(libro_id, reserva_id=None):
     """
-    Permite prestar un libro directamente o basado en una reserva aprobada.
+    Permite prestar un libro directamente o basado en una reserva aprobada o retenida.
+
+    El préstamo se registra con `realizar_prestamo`, que descuenta el
+    ejemplar de forma atómica aunque varios mostradores presten a la vez; si
+    la reserva está retenida, se presta el ejemplar que se le apartó.
 
     Args:
         libro_id (int): ID del libro a prestar.
-        reserva_id (int, opcional): ID de la reserva aprobada.
+        reserva_id (int, opcional): ID de la reserva aprobada o retenida.
 
     Returns:
         str: Renderiza la plantilla de préstamo o redirige tras prestar.
@@ -45,14 +81,16 @@ def prestar(libro_id, reserva_id=None):
 
     if reserva_id:
         reserva = Reserva.query.get_or_404(reserva_id)
-        if reserva.estado != "aprobada":
+        if reserva.estado not in ("aprobada", "retenida"):
             flash(
                 "La reserva no está aprobada. No se puede realizar el préstamo.",
                 "warning",
             )
             return redirect(url_for("prestamos.reservas_pendientes"))
 
-    if not libro.esta_disponible():
+    # Una reserva retenida ya tiene su ejemplar apartado fuera de los disponibles
+    retenida = reserva is not None and reserva.estado == "retenida"
+    if not retenida and not libro.esta_disponible:
         flash("No hay ejemplares disponibles para préstamo.", "warning")
         return redirect(
             url_for("prestamos.reservas_pendientes" if reserva else "generales.index")
@@ -81,15 +119,14 @@ def prestar(libro_id, reserva_id=None):
                 )
                 return redirect(url_for("prestamos.prestar", libro_id=libro_id))
 
-            Prestamo.validar_prestamo(usuario_id)
-
-            prestamo = Prestamo(libro_id=libro.id, usuario_id=usuario_id)
-            libro.reducir_cantidad()
-            db.session.add(prestamo)
-            db.session.commit()
+            realizar_prestamo(
+                libro.id, usuario_id, reserva_id=reserva.id if retenida else None
+            )
 
             flash(f'Préstamo realizado para el libro "{libro.titulo}".', "success")
             return redirect(url_for("generales.index"))
+        except ValueError as e:
+            flash(str(e), "warning")
         except Exception as e:
             logging.error(f"Error al realizar el préstamo: {e}")
             flash(
@@ -98,7 +135,11 @@ def prestar(libro_id, reserva_id=None):
             )
 
     return render_template(
-        "prestar_libro.html", libro=libro, reserva=reserva, breadcrumbs=breadcrumbs
+        "prestar_libro.html",
+        libro=libro,
+        reserva=reserva,
+        min_caracteres=current_app.config["AUTOCOMPLETAR_MIN_CARACTERES"],
+        breadcrumbs=breadcrumbs,
     )
 
 
@@ -116,9 +157,9 @@ def devolver(libro_id):
         str: Renderiza la plantilla de devolución o redirige tras devolver.
     """
     libro = Libro.query.get_or_404(libro_id)
-    prestamo = Prestamo.query.filter_by(
-        libro_id=libro.id, fecha_devolucion=None
-    ).first()
+    prestamo = db.session.execute(
+        Prestamo.consulta_sin_devolver_de_libro(libro.id)
+    ).scalar()
 
     if not prestamo:
         flash("Este libro no está prestado actualmente.", "warning")
@@ -194,16 +235,22 @@ def recordatorios():
 @login_required
 def historial():
     """
-    Muestra el historial de préstamos del usuario actual.
+    Muestra el historial de préstamos del usuario actual, paginado por cursor.
+
+    Parámetros de la petición:
+        estado (str): 'pendiente', 'devuelto' o 'vencido' (opcional).
+        despues, antes (str): Cursores de paginación.
 
     Returns:
         str: Renderiza la plantilla con el historial del usuario.
     """
+    estado = request.args.get("estado") or None
     try:
-        prestamos = (
-            Prestamo.query.options(joinedload(Prestamo.libro))
-            .filter_by(usuario_id=current_user.id)
-            .all()
+        pagina = Prestamo.pagina_historial(
+            current_user.id,
+            estado=estado,
+            despues=request.args.get("despues"),
+            antes=request.args.get("antes"),
         )
 
         breadcrumbs = [
@@ -212,14 +259,60 @@ def historial():
         ]
 
         return render_template(
-            "historial.html", prestamos=prestamos, breadcrumbs=breadcrumbs
+            "historial.html", pagina=pagina, estado=estado, breadcrumbs=breadcrumbs
         )
+    except ValueError as e:
+        abort(400, description=str(e))
     except Exception as e:
         logging.error(f"Error al cargar historial: {e}")
         flash("Ocurrió un error al cargar el historial. Intenta nuevamente.", "danger")
         return redirect(url_for("generales.index"))
 
 
+@prestamos_bp.route("/historial/datos", methods=["GET"])
+@login_required
+def historial_datos():
+    """
+    Devuelve una página del historial del usuario actual en JSON (scroll infinito).
+
+    Acepta los mismos parámetros que `historial` y 'limite' (como máximo
+    HISTORIAL_POR_PAGINA). Cada préstamo incluye solo 'id', 'titulo',
+    'fecha_prestamo', 'fecha_devolucion' (ISO 8601) y 'estado'.
+
+    Returns:
+        Response: JSON con 'prestamos' y 'siguiente' (cursor de la página
+        siguiente o None), o 400 si algún parámetro no es válido.
+    """
+    por_pagina = current_app.config["HISTORIAL_POR_PAGINA"]
+    limite = request.args.get("limite", por_pagina, type=int)
+    try:
+        pagina = Prestamo.pagina_historial(
+            current_user.id,
+            estado=request.args.get("estado") or None,
+            despues=request.args.get("despues"),
+            limite=max(1, min(limite, por_pagina)),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(
+        {
+            "prestamos": [
+                {
+                    "id": fila.id,
+                    "titulo": fila.titulo,
+                    "fecha_prestamo": fila.fecha_prestamo.isoformat(),
+                    "fecha_devolucion": fila.fecha_devolucion.isoformat()
+                    if fila.fecha_devolucion
+                    else None,
+                    "estado": fila.estado,
+                }
+                for fila in pagina["elementos"]
+            ],
+            "siguiente": pagina["siguiente"],
+        }
+    )
+
+
 @prestamos_bp.route("/historial_prestamos")
 @login_required
 @requiere_rol("bibliotecario", "admin")
@@ -227,21 +320,16 @@ def historial_prestamos():
     """
     Muestra el historial de préstamos de la biblioteca, incluyendo los libros más prestados.
 
+    Parámetros de la petición:
+        periodo (str): '7', '30' o '365' (últimos días) o 'total' (por defecto).
+
     Returns:
         str: Renderiza la plantilla con el historial general.
     """
-    libros_mas_prestados = Prestamo.libros_mas_prestados()
-    historial = []
-    for libro_id, total_prestamos in libros_mas_prestados:
-        libro = Libro.query.get(libro_id)
-        if libro:
-            historial.append(
-                {
-                    "titulo": libro.titulo,
-                    "autor": libro.autor,
-                    "total_prestamos": total_prestamos,
-                }
-            )
+    periodo = request.args.get("periodo", "total")
+    if periodo not in VENTANAS:
+        periodo = "total"
+    historial = libros_mas_prestados(periodo)
 
     breadcrumbs = [
         {"name": "Inicio", "url": url_for("generales.index")},
@@ -252,7 +340,10 @@ def historial_prestamos():
     ]
 
     return render_template(
-        "historial_prestamos.html", historial=historial, breadcrumbs=breadcrumbs
+        "historial_prestamos.html",
+        historial=historial,
+        periodo=periodo,
+        breadcrumbs=breadcrumbs,
     )
 
 
@@ -262,6 +353,9 @@ def reservar(libro_id):
     """
     Permite a un usuario estándar reservar un libro.
 
+    Si no quedan ejemplares, la reserva entra en la cola de espera del libro
+    y se le apartará un ejemplar cuando le llegue el turno.
+
     Args:
         libro_id (int): ID del libro a reservar.
 
@@ -270,10 +364,6 @@ def reservar(libro_id):
     """
     libro = Libro.query.get_or_404(libro_id)
 
-    if not libro.esta_disponible():
-        flash("El libro no está disponible para reserva.", "warning")
-        return redirect(url_for("generales.index"))
-
     breadcrumbs = [
         {"name": "Inicio", "url": url_for("generales.index")},
         {
@@ -284,8 +374,10 @@ def reservar(libro_id):
 
     if request.method == "POST":
         try:
-            reserva_existente = Reserva.query.filter_by(
-                libro_id=libro.id, usuario_id=current_user.id, estado="pendiente"
+            reserva_existente = Reserva.query.filter(
+                Reserva.libro_id == libro.id,
+                Reserva.usuario_id == current_user.id,
+                Reserva.estado.in_(("pendiente", "retenida")),
             ).first()
             if reserva_existente:
                 flash("Ya tienes una reserva pendiente para este libro.", "warning")
@@ -296,7 +388,8 @@ def reservar(libro_id):
             db.session.commit()
 
             flash(
-                f'Reserva para el libro "{libro.titulo}" realizada correctamente.',
+                f'Reserva para el libro "{libro.titulo}" realizada correctamente. '
+                f"Posición en la cola: {posicion_en_cola(reserva.id)}.",
                 "success",
             )
             return redirect(url_for("generales.index"))
@@ -309,21 +402,75 @@ def reservar(libro_id):
     return render_template("reservar_libro.html", libro=libro, breadcrumbs=breadcrumbs)
 
 
+@prestamos_bp.route("/mis_reservas", methods=["GET"])
+@login_required
+def mis_reservas():
+    """
+    Devuelve en JSON las reservas en espera o retenidas del usuario actual.
+
+    Cada reserva incluye su posición en la cola del libro y la fecha estimada
+    en que le llegará un ejemplar (ISO 8601; None si no hay ejemplares
+    libres ni prestados).
+
+    Returns:
+        Response: JSON con 'reservas'.
+    """
+    return jsonify(
+        {
+            "reservas": [
+                {
+                    "id": reserva["id"],
+                    "libro_id": reserva["libro_id"],
+                    "titulo": reserva["titulo"],
+                    "fecha_reserva": reserva["fecha_reserva"].isoformat(),
+                    "estado": reserva["estado"],
+                    "posicion": reserva["posicion"],
+                    "fecha_estimada": reserva["fecha_estimada"].isoformat()
+                    if reserva["fecha_estimada"]
+                    else None,
+                }
+                for reserva in cola_usuario(current_user.id)
+            ]
+        }
+    )
+
+
 @prestamos_bp.route("/reservas_pendientes")
 @login_required
 @requiere_rol("bibliotecario", "admin")
 def reservas_pendientes():
     """
-    Muestra todas las reservas pendientes para que el bibliotecario las gestione.
+    Muestra las reservas pendientes o retenidas para que el bibliotecario las gestione.
+
+    La lista se pagina por cursor en el servidor, por orden de llegada, y lee
+    el libro y el usuario de cada reserva en la misma consulta.
+
+    Parámetros de la petición:
+        estado (str): 'pendiente' (por defecto) o 'retenida'.
+        usuario_id, libro_id (int): Filtran por usuario o libro.
+        despues, antes (str): Cursores de paginación.
 
     Returns:
-        str: Renderiza la plantilla con las reservas pendientes.
+        str: Renderiza la plantilla con las reservas, o 400 si algún
+        parámetro no es válido.
     """
     if not current_user.es_bibliotecario() and not current_user.es_admin():
         flash("No tienes permiso para acceder a esta página.", "danger")
         return redirect(url_for("generales.index"))
 
-    reservas = Reserva.query.filter_by(estado="pendiente").all()
+    filtros = {
+        "estado": request.args.get("estado") or "pendiente",
+        "usuario_id": request.args.get("usuario_id", type=int),
+        "libro_id": request.args.get("libro_id", type=int),
+    }
+    try:
+        pagina = Reserva.pagina_gestion(
+            **filtros,
+            despues=request.args.get("despues"),
+            antes=request.args.get("antes"),
+        )
+    except ValueError as e:
+        abort(400, description=str(e))
 
     breadcrumbs = [
         {"name": "Inicio", "url": url_for("generales.index")},
@@ -334,7 +481,11 @@ def reservas_pendientes():
     ]
 
     return render_template(
-        "reservas_pendientes.html", reservas=reservas, breadcrumbs=breadcrumbs
+        "reservas_pendientes.html",
+        reservas=pagina["elementos"],
+        pagina=pagina,
+        filtros=filtros,
+        breadcrumbs=breadcrumbs,
     )
 
 
@@ -345,6 +496,10 @@ def aprobar_reserva(reserva_id):
     """
     Permite al bibliotecario aprobar una reserva y crear un préstamo.
 
+    Usa `procesar_reservas`, igual que la aprobación por lotes, para descontar
+    el ejemplar (o usar el apartado si está retenida) y respetar el límite de
+    préstamos del usuario.
+
     Args:
         reserva_id (int): ID de la reserva a aprobar.
 
@@ -358,10 +513,6 @@ def aprobar_reserva(reserva_id):
     reserva = Reserva.query.get_or_404(reserva_id)
     libro = reserva.libro
 
-    if not libro.esta_disponible():
-        flash("El libro ya no está disponible.", "warning")
-        return redirect(url_for("prestamos.reservas_pendientes"))
-
     breadcrumbs = [
         {"name": "Inicio", "url": url_for("generales.index")},
         {
@@ -375,12 +526,10 @@ def aprobar_reserva(reserva_id):
     ]
 
     try:
-        prestamo = Prestamo(libro_id=libro.id, usuario_id=reserva.usuario_id)
-        libro.esta_disponible = False  # Marcar como no disponible
-        reserva.estado = "aprobada"
-
-        db.session.add(prestamo)
-        db.session.commit()
+        (resultado,) = procesar_reservas([reserva_id], "aprobar")
+        if not resultado["correcto"]:
+            flash(resultado["mensaje"], "warning")
+            return redirect(url_for("prestamos.reservas_pendientes"))
 
         flash(
             f'Reserva aprobada y préstamo creado para el libro "{libro.titulo}".',
@@ -425,8 +574,10 @@ def rechazar_reserva(reserva_id):
     ]
 
     try:
-        reserva.estado = "rechazada"
-        db.session.commit()
+        (resultado,) = procesar_reservas([reserva_id], "rechazar")
+        if not resultado["correcto"]:
+            flash(resultado["mensaje"], "warning")
+            return redirect(url_for("prestamos.reservas_pendientes"))
 
         flash(f'Reserva para el libro "{reserva.libro.titulo}" rechazada.', "success")
         return redirect(url_for("prestamos.reservas_pendientes"))
@@ -436,52 +587,388 @@ def rechazar_reserva(reserva_id):
         return redirect(url_for("prestamos.reservas_pendientes"))
 
 
+@prestamos_bp.route("/reservas_pendientes/lote", methods=["POST"])
+@login_required
+@requiere_rol("bibliotecario", "admin")
+def gestionar_reservas_lote():
+    """
+    Aprueba o rechaza de una vez las reservas marcadas en la lista.
+
+    El formulario envía 'accion' ('aprobar' o 'rechazar') y los IDs en
+    'reserva_ids'; todas se procesan en una transacción y se informa de las
+    que no se pudieron procesar.
+
+    Returns:
+        str: Redirige a la lista de reservas con los mismos filtros.
+    """
+    try:
+        resultados = procesar_reservas(
+            request.form.getlist("reserva_ids"), request.form.get("accion")
+        )
+        correctos = sum(resultado["correcto"] for resultado in resultados)
+        flash(
+            f"{correctos} de {len(resultados)} reservas procesadas correctamente.",
+            "success" if correctos == len(resultados) else "warning",
+        )
+        for resultado in resultados:
+            if not resultado["correcto"]:
+                flash(f"Reserva {resultado['reserva_id']}: {resultado['mensaje']}", "warning")
+    except ValueError as e:
+        flash(str(e), "warning")
+    except Exception as e:
+        logging.error(f"Error al procesar reservas por lotes: {e}")
+        flash("Ocurrió un error al procesar las reservas. Intenta nuevamente.", "danger")
+    filtros = {
+        clave: request.form.get(clave) or None
+        for clave in ("estado", "usuario_id", "libro_id")
+    }
+    return redirect(url_for("prestamos.reservas_pendientes", **filtros))
+
+
+@prestamos_bp.route("/reservas_pendientes/lote/api", methods=["POST"])
+@login_required
+@requiere_rol("bibliotecario", "admin")
+def reservas_lote():
+    """
+    API de la gestión de reservas por lotes.
+
+    Recibe un JSON con 'accion' ('aprobar' o 'rechazar') y 'reserva_ids'
+    (lista de IDs) y procesa todas las reservas en una transacción.
+
+    Returns:
+        Response: JSON con 'resultados' (uno por reserva), o 'error' y código
+        400 si la petición no es válida.
+    """
+    datos = request.get_json(silent=True) or {}
+    reserva_ids = datos.get("reserva_ids")
+    if not isinstance(reserva_ids, list):
+        return jsonify({"error": "'reserva_ids' debe ser una lista."}), 400
+    try:
+        resultados = procesar_reservas(reserva_ids, datos.get("accion"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"resultados": resultados})
+
+
 @prestamos_bp.route("/gestionar_prestamos")
 @login_required
 @requiere_rol("bibliotecario", "admin")
 def gestionar_prestamos():
     """
-    Muestra todos los préstamos activos para que el bibliotecario o administrador los gestione.
+    Muestra los préstamos sin devolver para que el bibliotecario o administrador los gestione.
+
+    La lista se pagina por cursor en el servidor y solo lee las columnas que
+    se muestran.
+
+    Parámetros de la petición:
+        estado (str): 'vencido' para mostrar solo los préstamos vencidos.
+        usuario_id, libro_id (int): Filtran por usuario o libro.
+        orden (str): 'vencimiento' (por defecto) o 'usuario'.
+        despues, antes (str): Cursores de paginación.
 
     Returns:
-        str: Renderiza la plantilla con los préstamos activos.
+        str: Renderiza la plantilla con los préstamos, o 400 si algún
+        parámetro no es válido.
     """
     if not current_user.es_bibliotecario() and not current_user.es_admin():
         flash("No tienes permiso para acceder a esta página.", "danger")
         return redirect(url_for("generales.index"))
 
-    prestamos = (
-        Prestamo.query.options(joinedload(Prestamo.libro), joinedload(Prestamo.usuario))
-        .filter(Prestamo.fecha_devolucion.is_(None))
-        .all()
+    filtros = {
+        "estado": "vencido" if request.args.get("estado") == "vencido" else None,
+        "usuario_id": request.args.get("usuario_id", type=int),
+        "libro_id": request.args.get("libro_id", type=int),
+        "orden": request.args.get("orden") or "vencimiento",
+    }
+    try:
+        pagina = Prestamo.pagina_sin_devolver(
+            vencidos=filtros["estado"] == "vencido",
+            usuario_id=filtros["usuario_id"],
+            libro_id=filtros["libro_id"],
+            orden=filtros["orden"],
+            despues=request.args.get("despues"),
+            antes=request.args.get("antes"),
+        )
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    dias = timedelta(days=current_app.config["PRESTAMOS_DIAS"])
+    prestamos = [
+        dict(fila._mapping, fecha_vencimiento=fila.fecha_prestamo + dias)
+        for fila in pagina["elementos"]
+    ]
+
+    breadcrumbs = [
+        {"name": "Inicio", "url": url_for("generales.index")},
+        {
+            "name": "Gestión de Préstamos",
+            "url": url_for("prestamos.gestionar_prestamos"),
+        },
+    ]
+
+    return render_template(
+        "gestionar_prestamos.html",
+        prestamos=prestamos,
+        pagina=pagina,
+        filtros=filtros,
+        total_vencidos=contar_vencidos(),
+        breadcrumbs=breadcrumbs,
     )
 
+
+def procesar_mostrador(operacion, usuario_id, codigos):
+    """
+    Presta o devuelve un lote de libros según la operación indicada.
+
+    Args:
+        operacion (str): 'prestar' o 'devolver'.
+        usuario_id (int | str | None): Usuario del préstamo (obligatorio al
+            prestar, opcional al devolver).
+        codigos (list): IDs o ISBN de los libros.
+
+    Returns:
+        list: Resultado de cada código.
+
+    Raises:
+        ValueError: Si la operación, el usuario o los códigos no son válidos.
+    """
+    if operacion == "prestar":
+        if not usuario_id:
+            raise ValueError("Debes seleccionar un usuario para realizar el préstamo.")
+        return prestar_lote(usuario_id, codigos)
+    if operacion == "devolver":
+        return devolver_lote(codigos, usuario_id=usuario_id or None)
+    raise ValueError("Operación no válida.")
+
+
+@prestamos_bp.route("/mostrador", methods=["GET", "POST"])
+@login_required
+@requiere_rol("bibliotecario", "admin")
+def mostrador():
+    """
+    Mostrador por lotes: presta o devuelve de una vez una lista de libros escaneados.
+
+    El formulario recibe la operación, el usuario y los códigos (ID o ISBN,
+    uno por línea) y muestra el resultado de cada libro.
+
+    Returns:
+        str: Renderiza la plantilla del mostrador con los resultados.
+    """
     breadcrumbs = [
         {"name": "Inicio", "url": url_for("generales.index")},
         {
             "name": "Gestión de Préstamos",
             "url": url_for("prestamos.gestionar_prestamos"),
         },
+        {"name": "Mostrador", "url": url_for("prestamos.mostrador")},
     ]
+    resultados = None
+    operacion = request.form.get("operacion", "prestar")
+    if request.method == "POST":
+        try:
+            resultados = procesar_mostrador(
+                operacion,
+                request.form.get("usuario_id"),
+                request.form.get("codigos", "").splitlines(),
+            )
+            correctos = sum(resultado["correcto"] for resultado in resultados)
+            flash(
+                f"{correctos} de {len(resultados)} libros procesados correctamente.",
+                "success" if correctos == len(resultados) else "warning",
+            )
+        except ValueError as e:
+            flash(str(e), "warning")
+        except Exception as e:
+            logging.error(f"Error en el mostrador de préstamos: {e}")
+            flash("Ocurrió un error al procesar el lote. Intenta nuevamente.", "danger")
 
     return render_template(
-        "gestionar_prestamos.html", prestamos=prestamos, breadcrumbs=breadcrumbs
+        "mostrador.html",
+        operacion=operacion,
+        resultados=resultados,
+        min_caracteres=current_app.config["AUTOCOMPLETAR_MIN_CARACTERES"],
+        breadcrumbs=breadcrumbs,
     )
 
 
+@prestamos_bp.route("/mostrador/lote", methods=["POST"])
+@login_required
+@requiere_rol("bibliotecario", "admin")
+def mostrador_lote():
+    """
+    API del mostrador por lotes.
+
+    Recibe un JSON con 'operacion' ('prestar' o 'devolver'), 'usuario_id' y
+    'codigos' (lista de IDs o ISBN) y procesa todo el lote en una transacción.
+
+    Returns:
+        Response: JSON con 'resultados' (uno por código), o 'error' y código
+        400 si la petición no es válida.
+    """
+    datos = request.get_json(silent=True) or {}
+    codigos = datos.get("codigos")
+    if not isinstance(codigos, list):
+        return jsonify({"error": "'codigos' debe ser una lista."}), 400
+    try:
+        resultados = procesar_mostrador(
+            datos.get("operacion"), datos.get("usuario_id"), codigos
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"resultados": resultados})
+
+
 @prestamos_bp.route("/buscar_usuarios", methods=["GET"])
 @login_required
 def buscar_usuarios():
     """
-    Permite buscar usuarios por nombre para autocompletar en formularios.
+    Permite buscar usuarios por nombre o correo para autocompletar en formularios.
+
+    Usa el índice en memoria de autocompletado: devuelve como máximo
+    AUTOCOMPLETAR_LIMITE usuarios cuyo nombre, alguna palabra del nombre o
+    correo empiecen por el texto `q`, y nada si el texto es demasiado corto.
 
     Returns:
         Response: JSON con los usuarios encontrados.
     """
     termino = request.args.get("q", "")
-    usuarios = Usuario.query.filter(Usuario.nombre.ilike(f"%{termino}%")).all()
-    usuarios_data = [
-        {"id": usuario.id, "nombre": usuario.nombre, "email": usuario.email}
-        for usuario in usuarios
+    limite = request.args.get("limite", type=int)
+    return jsonify(autocompletar_usuarios(termino, limite=limite))
+
+
+@prestamos_bp.route("/exportar", methods=["GET"])
+@login_required
+@requiere_rol("bibliotecario", "admin")
+def exportar_prestamos():
+    """
+    Exporta los préstamos en CSV o JSON Lines, en streaming.
+
+    Parámetros de la petición:
+        formato (str): 'csv' (por defecto) o 'ndjson'.
+        gzip (bool): Si es verdadero, el archivo se comprime con gzip.
+        estado (str): Estado del préstamo ('activo', 'devuelto', 'vencido').
+        usuario_id, libro_id (int): Filtran por usuario o libro.
+        desde, hasta (str): Rango de fechas de préstamo (AAAA-MM-DD, 'hasta' excluida).
+
+    Returns:
+        Response: Archivo adjunto generado por bloques, o 400 si algún
+        parámetro no es válido.
+    """
+    try:
+        return respuesta_exportacion("prestamos", request.args)
+    except ValueError as e:
+        abort(400, description=str(e))
+
+
+@prestamos_bp.route("/multas", methods=["GET"])
+@login_required
+@requiere_rol("bibliotecario", "admin")
+def informe_multas():
+    """
+    Informe paginado de multas por retraso, agrupadas por usuario, libro o mes.
+
+    Las multas se calculan y agregan en la base de datos, de mayor a menor
+    importe.
+
+    Parámetros de la petición:
+        agrupacion (str): 'usuario' (por defecto), 'libro' o 'mes'.
+        desde, hasta (str): Rango de fechas de préstamo (AAAA-MM-DD, 'hasta' excluida).
+        despues, antes (str): Cursores de paginación.
+
+    Returns:
+        str: Renderiza la plantilla del informe, o 400 si algún parámetro no es válido.
+    """
+    agrupacion = request.args.get("agrupacion") or "usuario"
+    desde = request.args.get("desde") or None
+    hasta = request.args.get("hasta") or None
+    try:
+        fecha_desde = datetime.fromisoformat(desde) if desde else None
+        fecha_hasta = datetime.fromisoformat(hasta) if hasta else None
+        pagina = pagina_totales(
+            agrupacion,
+            desde=fecha_desde,
+            hasta=fecha_hasta,
+            despues=request.args.get("despues"),
+            antes=request.args.get("antes"),
+        )
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    breadcrumbs = [
+        {"name": "Inicio", "url": url_for("generales.index")},
+        {
+            "name": "Gestión de Préstamos",
+            "url": url_for("prestamos.gestionar_prestamos"),
+        },
+        {"name": "Multas", "url": url_for("prestamos.informe_multas")},
     ]
-    return jsonify(usuarios_data)
+
+    return render_template(
+        "multas.html",
+        pagina=pagina,
+        resumen=total_multas(desde=fecha_desde, hasta=fecha_hasta),
+        agrupaciones=list(AGRUPACIONES),
+        filtros={"agrupacion": agrupacion, "desde": desde, "hasta": hasta},
+        breadcrumbs=breadcrumbs,
+    )
+
+
+@prestamos_bp.route("/multas/exportar", methods=["GET"])
+@login_required
+@requiere_rol("bibliotecario", "admin")
+def exportar_multas():
+    """
+    Exporta el informe de multas completo en CSV o JSON Lines, en streaming.
+
+    Parámetros de la petición:
+        formato (str): 'csv' (por defecto) o 'ndjson'.
+        gzip (bool): Si es verdadero, el archivo se comprime con gzip.
+        agrupacion (str): 'usuario' (por defecto), 'libro' o 'mes'.
+        desde, hasta (str): Rango de fechas de préstamo (AAAA-MM-DD, 'hasta' excluida).
+
+    Returns:
+        Response: Archivo adjunto generado por bloques, o 400 si algún
+        parámetro no es válido.
+    """
+    try:
+        return respuesta_exportacion("multas", request.args)
+    except ValueError as e:
+        abort(400, description=str(e))
+
+
+@prestamos_bp.route("/actividad", methods=["GET"])
+@login_required
+@requiere_rol("bibliotecario", "admin")
+def actividad():
+    """
+    Devuelve en JSON la actividad diaria de préstamos leída de los agregados.
+
+    Con 'valor' (o sin 'dimension') devuelve la serie día a día de ese valor
+    o de los totales; solo con 'dimension' devuelve los totales del periodo
+    por cada género o autor.
+
+    Parámetros de la petición:
+        dimension (str): 'genero', 'autor' o 'catalogo' (por defecto).
+        valor (str): Género o autor de la serie.
+        desde, hasta (str): Rango de días (AAAA-MM-DD, 'hasta' excluido).
+
+    Returns:
+        Response: JSON con 'actividad', o 400 si algún parámetro no es válido.
+    """
+    dimension = request.args.get("dimension") or TOTAL_ACTIVIDAD
+    valor = request.args.get("valor", "")
+    desde = request.args.get("desde") or None
+    hasta = request.args.get("hasta") or None
+    try:
+        fecha_desde = date.fromisoformat(desde) if desde else None
+        fecha_hasta = date.fromisoformat(hasta) if hasta else None
+        if dimension == TOTAL_ACTIVIDAD or valor:
+            filas = [
+                {**fila, "fecha": fila["fecha"].isoformat()}
+                for fila in serie_actividad(dimension, valor, fecha_desde, fecha_hasta)
+            ]
+        else:
+            filas = totales_actividad(dimension, fecha_desde, fecha_hasta)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"actividad": filas})
@@ -1,14 +1,22 @@
 """
 Módulo de rutas para la gestión de usuarios en la aplicación de biblioteca.
 
-Incluye rutas para listar, crear, eliminar y cambiar roles de usuarios.
+Incluye rutas para listar, crear, eliminar, exportar y cambiar roles de usuarios.
 Solo los administradores pueden acceder a estas funciones.
 
 Autor: Francisco Javier
 Fecha: 2025-05-17
 """
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import (
+    Blueprint,
+    render_template,
+    redirect,
+    url_for,
+    flash,
+    request,
+    abort,
+)
 from flask_login import login_required, current_user
 from src.forms.forms import CrearUsuarioForm
 from src.models.models_usuario import Usuario
@@ -18,6 +26,7 @@ import logging
 from src.models.models_prestamo import Prestamo
 from sqlalchemy import exc  # Importa las excepciones de SQLAlchemy
 from datetime import datetime, timedelta
+from src.services.services_exportacion import respuesta_exportacion
 
 usuarios_bp = Blueprint("usuarios", __name__)
 
@@ -47,6 +56,8 @@ def gestion_usuarios():
     Muestra una lista de usuarios y permite al administrador gestionar sus roles.
 
     Permite buscar usuarios por nombre o correo y actualizar el rol de un usuario.
+    Las estadísticas de reservas de todos los usuarios listados se obtienen
+    con una sola consulta.
     """
     breadcrumbs = [
         {"name": "Inicio", "url": url_for("generales.index")},
@@ -87,6 +98,7 @@ def gestion_usuarios():
     return render_template(
         "gestionar_usuarios.html",
         usuarios=usuarios,
+        reservas=Usuario.estadisticas_reservas([usuario.id for usuario in usuarios]),
         termino=termino,
         breadcrumbs=breadcrumbs,
     )
@@ -297,3 +309,26 @@ def recuperar_cuenta():
     else:
         flash("Usuario no encontrado", "warning")
     return redirect(url_for("auth.recuperar_cuenta"))
+
+
+@usuarios_bp.route("/exportar", methods=["GET"])
+@login_required
+@requiere_rol("admin")
+def exportar_usuarios():
+    """
+    Exporta los usuarios (sin contraseñas) en CSV o JSON Lines, en streaming.
+
+    Parámetros de la petición:
+        formato (str): 'csv' (por defecto) o 'ndjson'.
+        gzip (bool): Si es verdadero, el archivo se comprime con gzip.
+        rol (str): Rol de los usuarios.
+        email_confirmado (bool): Solo usuarios con o sin el correo confirmado.
+
+    Returns:
+        Response: Archivo adjunto generado por bloques, o 400 si algún
+        parámetro no es válido.
+    """
+    try:
+        return respuesta_exportacion("usuarios", request.args)
+    except ValueError as e:
+        abort(400, description=str(e))
@@ -0,0 +1 @@
+# Este archivo marca el directorio como un paquete de Python.
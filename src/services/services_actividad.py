@@ -0,0 +1,332 @@
+"""
+Módulo de agregados diarios de actividad de préstamos para la aplicación de biblioteca.
+
+Mantiene la tabla `actividad_diaria` con los préstamos, devoluciones,
+préstamos vencidos y usuarios distintos de cada día por género y autor (y los
+totales de la biblioteca), de modo que preguntas como "préstamos por género y
+día" se responden leyendo las filas del periodo, sin recorrer `prestamo`.
+
+Los agregados se calculan con `flask actualizar-actividad`, que recalcula
+desde la marca de agua (el último día agregado, que pudo quedar a medias)
+hasta hoy con consultas GROUP BY limitadas por rango de fechas. Los usuarios
+distintos no se pueden sumar por incrementos, así que cada día se recalcula
+entero en lugar de actualizarse desde los eventos de préstamo. Los préstamos
+se asignan al género y autor que tiene el libro al calcular el día.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import logging
+import time
+from datetime import date, datetime, time as hora, timedelta, timezone
+from flask import current_app
+from sqlalchemy import delete, func, or_, select
+from extensions import db
+from src.models.models_actividad import ActividadDiaria
+from src.models.models_libro import Libro
+from src.models.models_prestamo import Prestamo
+from src.services.services_multas import dias_entre
+
+# Campos del libro por los que se agrega la actividad
+DIMENSIONES_ACTIVIDAD = ("genero", "autor")
+
+# Dimensión de las filas con los totales de la biblioteca
+TOTAL_ACTIVIDAD = "catalogo"
+
+# Contadores de cada fila, en el orden en que se acumulan
+CONTADORES = ("prestamos", "devoluciones", "vencidos", "usuarios")
+
+
+def _dia(valor):
+    """
+    Convierte el resultado de DATE() en fecha (SQLite lo devuelve como texto).
+    """
+    return date.fromisoformat(valor) if isinstance(valor, str) else valor
+
+
+def _inicio(dia):
+    """
+    Devuelve el instante inicial (UTC) de un día.
+    """
+    return datetime.combine(dia, hora.min)
+
+
+def _acumular(filas, consulta, dimension, contadores, desplazamiento=0):
+    """
+    Suma a `filas` los contadores de una consulta agrupada por día y valor.
+
+    Args:
+        filas (dict): Contadores por clave (fecha, dimension, valor).
+        consulta (Select): Consulta con las columnas 'dia', 'valor' (salvo en
+            los totales) y una por contador.
+        dimension (str): Dimensión de las filas.
+        contadores (tuple): Nombres de los contadores que devuelve la consulta.
+        desplazamiento (int): Días que se suman al día agrupado.
+    """
+    for fila in db.session.execute(consulta):
+        valores = fila._mapping
+        clave = (
+            _dia(valores["dia"]) + timedelta(days=desplazamiento),
+            dimension,
+            valores.get("valor") or "",
+        )
+        acumulado = filas.setdefault(clave, dict.fromkeys(CONTADORES, 0))
+        for contador in contadores:
+            acumulado[contador] += valores[contador]
+
+
+def calcular_actividad(desde, hasta, ahora=None):
+    """
+    Calcula los agregados de actividad de los días [desde, hasta).
+
+    Por cada dimensión (y los totales) se ejecuta una consulta agrupada por
+    día para los préstamos y usuarios, otra para las devoluciones y otra para
+    los vencidos, cada una limitada al rango de fechas con su índice.
+
+    Args:
+        desde (date): Primer día incluido.
+        hasta (date): Día excluido.
+        ahora (datetime, opcional): Momento de referencia para los vencidos.
+
+    Returns:
+        dict: Contadores por clave (fecha, dimension, valor).
+    """
+    ahora = ahora or datetime.now(timezone.utc)
+    dias = current_app.config["PRESTAMOS_DIAS"]
+    inicio, fin = _inicio(desde), _inicio(hasta)
+    filas = {}
+    for dimension in DIMENSIONES_ACTIVIDAD + (TOTAL_ACTIVIDAD,):
+        if dimension == TOTAL_ACTIVIDAD:
+            columnas, agrupar = [], lambda consulta: consulta
+        else:
+            campo = getattr(Libro, dimension)
+            columnas = [campo.label("valor")]
+
+            def agrupar(consulta, campo=campo):
+                return consulta.join(Libro, Libro.id == Prestamo.libro_id).group_by(
+                    campo
+                )
+
+        dia_prestamo = func.date(Prestamo.fecha_prestamo).label("dia")
+        _acumular(
+            filas,
+            agrupar(
+                select(
+                    dia_prestamo,
+                    *columnas,
+                    func.count().label("prestamos"),
+                    func.count(func.distinct(Prestamo.usuario_id)).label("usuarios"),
+                )
+                .where(Prestamo.fecha_prestamo >= inicio, Prestamo.fecha_prestamo < fin)
+                .group_by(dia_prestamo)
+            ),
+            dimension,
+            ("prestamos", "usuarios"),
+        )
+
+        dia_devolucion = func.date(Prestamo.fecha_devolucion).label("dia")
+        _acumular(
+            filas,
+            agrupar(
+                select(dia_devolucion, *columnas, func.count().label("devoluciones"))
+                .where(
+                    Prestamo.fecha_devolucion >= inicio, Prestamo.fecha_devolucion < fin
+                )
+                .group_by(dia_devolucion)
+            ),
+            dimension,
+            ("devoluciones",),
+        )
+
+        # Un préstamo vence el día de su préstamo más PRESTAMOS_DIAS: se
+        # agrupan los préstamos de [desde - dias, hasta - dias) y se desplazan
+        _acumular(
+            filas,
+            agrupar(
+                select(dia_prestamo, *columnas, func.count().label("vencidos"))
+                .where(
+                    Prestamo.fecha_prestamo >= inicio - timedelta(days=dias),
+                    Prestamo.fecha_prestamo < fin - timedelta(days=dias),
+                    Prestamo.fecha_prestamo < ahora - timedelta(days=dias),
+                    or_(
+                        Prestamo.fecha_devolucion.is_(None),
+                        dias_entre(Prestamo.fecha_prestamo, Prestamo.fecha_devolucion)
+                        >= dias,
+                    ),
+                )
+                .group_by(dia_prestamo)
+            ),
+            dimension,
+            ("vencidos",),
+            desplazamiento=dias,
+        )
+    return filas
+
+
+def _marca_de_agua():
+    """
+    Devuelve el último día agregado, o el del primer préstamo si no hay ninguno.
+    """
+    ultimo = db.session.execute(select(func.max(ActividadDiaria.fecha))).scalar()
+    if ultimo is not None:
+        return _dia(ultimo)
+    primero = db.session.execute(
+        select(func.min(Prestamo.fecha_prestamo))
+    ).scalar()
+    return primero.date() if primero else None
+
+
+def actualizar_actividad(desde=None, dias_por_lote=None, ahora=None):
+    """
+    Recalcula los agregados diarios desde `desde` (o la marca de agua) hasta hoy.
+
+    Los días se procesan por bloques de `dias_por_lote`; cada bloque borra
+    sus filas e inserta las recalculadas en una única transacción, de modo
+    que los lectores nunca ven un día a medio calcular.
+
+    Args:
+        desde (date, opcional): Primer día a recalcular (por defecto, el
+            último día agregado).
+        dias_por_lote (int, opcional): Días por transacción (por defecto
+            ACTIVIDAD_DIAS_POR_LOTE).
+        ahora (datetime, opcional): Momento de referencia.
+
+    Returns:
+        int: Número de días recalculados.
+    """
+    ahora = ahora or datetime.now(timezone.utc)
+    dias_por_lote = dias_por_lote or current_app.config["ACTIVIDAD_DIAS_POR_LOTE"]
+    desde = desde or _marca_de_agua()
+    if desde is None:
+        return 0
+    hasta = ahora.date() + timedelta(days=1)
+    total = 0
+    inicio = desde
+    while inicio < hasta:
+        fin = min(inicio + timedelta(days=dias_por_lote), hasta)
+        filas = calcular_actividad(inicio, fin, ahora)
+        db.session.execute(
+            delete(ActividadDiaria).where(
+                ActividadDiaria.fecha >= inicio, ActividadDiaria.fecha < fin
+            )
+        )
+        if filas:
+            db.session.execute(
+                ActividadDiaria.__table__.insert(),
+                [
+                    {"fecha": clave[0], "dimension": clave[1], "valor": clave[2], **valores}
+                    for clave, valores in sorted(filas.items())
+                ],
+            )
+        db.session.commit()
+        total += (fin - inicio).days
+        inicio = fin
+    return total
+
+
+def ejecutar_actualizacion_periodica(intervalo=None):
+    """
+    Actualiza los agregados cada `intervalo` segundos hasta que se detenga el proceso.
+
+    Args:
+        intervalo (int, opcional): Segundos entre pasadas (por defecto
+            ACTIVIDAD_INTERVALO).
+    """
+    intervalo = intervalo or current_app.config["ACTIVIDAD_INTERVALO"]
+    while True:
+        try:
+            actualizar_actividad()
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error al actualizar la actividad diaria: {e}")
+        time.sleep(intervalo)
+
+
+def _validar_dimension(dimension):
+    """
+    Comprueba que la dimensión tenga agregados.
+
+    Raises:
+        ValueError: Si la dimensión no es válida.
+    """
+    if dimension not in DIMENSIONES_ACTIVIDAD + (TOTAL_ACTIVIDAD,):
+        raise ValueError(f"Dimensión no válida: {dimension}")
+
+
+def serie_actividad(dimension=TOTAL_ACTIVIDAD, valor="", desde=None, hasta=None):
+    """
+    Devuelve la actividad día a día de un valor de una dimensión.
+
+    Args:
+        dimension (str): 'genero', 'autor' o 'catalogo' (totales).
+        valor (str): Valor de la dimensión (vacío en los totales).
+        desde (date, opcional): Primer día incluido.
+        hasta (date, opcional): Día excluido.
+
+    Returns:
+        list: Un diccionario por día con actividad, con 'fecha' y los contadores.
+
+    Raises:
+        ValueError: Si la dimensión no es válida.
+    """
+    _validar_dimension(dimension)
+    consulta = select(ActividadDiaria).where(
+        ActividadDiaria.dimension == dimension, ActividadDiaria.valor == valor
+    )
+    if desde:
+        consulta = consulta.where(ActividadDiaria.fecha >= desde)
+    if hasta:
+        consulta = consulta.where(ActividadDiaria.fecha < hasta)
+    filas = db.session.execute(consulta.order_by(ActividadDiaria.fecha)).scalars()
+    return [
+        {"fecha": fila.fecha, **{contador: getattr(fila, contador) for contador in CONTADORES}}
+        for fila in filas
+    ]
+
+
+def totales_actividad(dimension, desde=None, hasta=None, limite=None):
+    """
+    Suma la actividad de un periodo por cada valor de una dimensión.
+
+    Los usuarios distintos no se pueden sumar entre días, así que no se incluyen.
+
+    Args:
+        dimension (str): 'genero' o 'autor'.
+        desde (date, opcional): Primer día incluido.
+        hasta (date, opcional): Día excluido.
+        limite (int, opcional): Número máximo de valores, de más a menos préstamos.
+
+    Returns:
+        list: Diccionarios con 'valor', 'prestamos', 'devoluciones' y 'vencidos'.
+
+    Raises:
+        ValueError: Si la dimensión no es válida.
+    """
+    if dimension not in DIMENSIONES_ACTIVIDAD:
+        raise ValueError(f"Dimensión no válida: {dimension}")
+    prestamos = func.sum(ActividadDiaria.prestamos).label("prestamos")
+    consulta = select(
+        ActividadDiaria.valor,
+        prestamos,
+        func.sum(ActividadDiaria.devoluciones).label("devoluciones"),
+        func.sum(ActividadDiaria.vencidos).label("vencidos"),
+    ).where(ActividadDiaria.dimension == dimension)
+    if desde:
+        consulta = consulta.where(ActividadDiaria.fecha >= desde)
+    if hasta:
+        consulta = consulta.where(ActividadDiaria.fecha < hasta)
+    consulta = consulta.group_by(ActividadDiaria.valor).order_by(
+        prestamos.desc(), ActividadDiaria.valor
+    )
+    if limite:
+        consulta = consulta.limit(limite)
+    return [
+        {
+            "valor": fila.valor,
+            "prestamos": int(fila.prestamos),
+            "devoluciones": int(fila.devoluciones),
+            "vencidos": int(fila.vencidos),
+        }
+        for fila in db.session.execute(consulta)
+    ]
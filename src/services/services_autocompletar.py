@@ -0,0 +1,209 @@
+"""
+Módulo de autocompletado de usuarios para la aplicación de gestión de biblioteca.
+
+Mantiene en memoria un índice ordenado de los nombres y correos normalizados
+de los usuarios para responder a las búsquedas por prefijo del mostrador de
+préstamos sin consultar la base de datos en cada pulsación de tecla.
+
+El índice se carga la primera vez que se usa, se actualiza de forma
+incremental al confirmarse altas, cambios de nombre o bajas de usuarios en
+este proceso, y se recarga por completo cada AUTOCOMPLETAR_TTL segundos para
+incorporar los cambios hechos por otros procesos.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import bisect
+import threading
+import time
+from flask import current_app
+from sqlalchemy import select
+from extensions import db
+from src.models.models_usuario import Usuario
+from src.services.services_eventos import cambios_confirmados, seguir_cambios
+from src.services.services_texto import normalizar
+
+# Tipos de coincidencia, en orden de relevancia
+NOMBRE_COMPLETO = 0
+PALABRA_NOMBRE = 1
+EMAIL = 2
+
+
+class IndiceUsuarios:
+    """
+    Índice en memoria de usuarios ordenado por claves normalizadas.
+
+    Guarda una lista ordenada de tuplas (clave, id) por cada tipo de
+    coincidencia, de modo que las búsquedas por prefijo se resuelven con una
+    búsqueda binaria y solo recorren los resultados que se devuelven.
+    """
+
+    def __init__(self):
+        """
+        Inicializa el índice vacío y sin cargar.
+        """
+        self._lock = threading.RLock()
+        self._listas = ([], [], [])
+        self._claves = {}
+        self._usuarios = {}
+        self._cargado_en = None
+
+    @staticmethod
+    def _claves_de(nombre, email):
+        """
+        Calcula las claves de búsqueda de un usuario por tipo de coincidencia.
+        """
+        nombre = " ".join(normalizar(nombre).split())
+        palabras = set(nombre.split()[1:])
+        return (
+            [nombre] if nombre else [],
+            sorted(palabras),
+            [normalizar(email)] if email else [],
+        )
+
+    def _agregar(self, usuario_id, nombre, email):
+        """
+        Añade un usuario al índice (debe llamarse con el bloqueo adquirido).
+        """
+        claves = self._claves_de(nombre, email)
+        for lista, claves_tipo in zip(self._listas, claves):
+            for clave in claves_tipo:
+                bisect.insort(lista, (clave, usuario_id))
+        self._claves[usuario_id] = claves
+        self._usuarios[usuario_id] = {"id": usuario_id, "nombre": nombre, "email": email}
+
+    def _quitar(self, usuario_id):
+        """
+        Elimina un usuario del índice (debe llamarse con el bloqueo adquirido).
+        """
+        claves = self._claves.pop(usuario_id, None)
+        self._usuarios.pop(usuario_id, None)
+        if not claves:
+            return
+        for lista, claves_tipo in zip(self._listas, claves):
+            for clave in claves_tipo:
+                posicion = bisect.bisect_left(lista, (clave, usuario_id))
+                if posicion < len(lista) and lista[posicion] == (clave, usuario_id):
+                    del lista[posicion]
+
+    def cargar(self):
+        """
+        Carga el índice completo desde la base de datos.
+
+        Solo se leen las columnas id, nombre y email, por lotes.
+        """
+        listas = ([], [], [])
+        claves = {}
+        usuarios = {}
+        filas = db.session.execute(
+            select(Usuario.id, Usuario.nombre, Usuario.email).execution_options(
+                yield_per=1000
+            )
+        )
+        for usuario_id, nombre, email in filas:
+            claves_usuario = self._claves_de(nombre, email)
+            for lista, claves_tipo in zip(listas, claves_usuario):
+                lista.extend((clave, usuario_id) for clave in claves_tipo)
+            claves[usuario_id] = claves_usuario
+            usuarios[usuario_id] = {"id": usuario_id, "nombre": nombre, "email": email}
+        for lista in listas:
+            lista.sort()
+        with self._lock:
+            self._listas, self._claves, self._usuarios = listas, claves, usuarios
+            self._cargado_en = time.monotonic()
+
+    def _asegurar_cargado(self):
+        """
+        Carga o recarga el índice si aún no existe o si ha caducado.
+        """
+        ttl = current_app.config["AUTOCOMPLETAR_TTL"]
+        cargado_en = self._cargado_en
+        if cargado_en is None or (ttl and time.monotonic() - cargado_en > ttl):
+            self.cargar()
+
+    def actualizar(self, cambios):
+        """
+        Aplica al índice los cambios confirmados de usuarios.
+
+        Args:
+            cambios (list): Tuplas (operacion, antes, despues) de la señal
+                `cambios_confirmados`.
+        """
+        with self._lock:
+            if self._cargado_en is None:
+                return
+            for operacion, antes, despues in cambios:
+                if antes is not None:
+                    self._quitar(antes["id"])
+                if despues is not None:
+                    self._agregar(despues["id"], despues["nombre"], despues["email"])
+
+    def buscar(self, texto, limite):
+        """
+        Busca usuarios cuyo nombre, alguna palabra del nombre o correo empiecen por `texto`.
+
+        Los resultados se ordenan por tipo de coincidencia (nombre completo,
+        palabra del nombre, correo) y, dentro de cada tipo, alfabéticamente.
+
+        Args:
+            texto (str): Prefijo buscado.
+            limite (int): Número máximo de resultados.
+
+        Returns:
+            list: Diccionarios con id, nombre y email.
+        """
+        prefijo = " ".join(normalizar(texto).split())
+        if not prefijo:
+            return []
+        self._asegurar_cargado()
+
+        resultados = []
+        vistos = set()
+        with self._lock:
+            for lista in self._listas:
+                posicion = bisect.bisect_left(lista, (prefijo,))
+                while posicion < len(lista) and len(resultados) < limite:
+                    clave, usuario_id = lista[posicion]
+                    if not clave.startswith(prefijo):
+                        break
+                    if usuario_id not in vistos:
+                        vistos.add(usuario_id)
+                        resultados.append(dict(self._usuarios[usuario_id]))
+                    posicion += 1
+                if len(resultados) >= limite:
+                    break
+        return resultados
+
+
+indice_usuarios = IndiceUsuarios()
+
+seguir_cambios(Usuario, columnas=("id", "nombre", "email"))
+
+
+@cambios_confirmados.connect_via(Usuario)
+def _actualizar_indice_usuarios(modelo, cambios):
+    """
+    Mantiene el índice de autocompletado al día tras cada commit de usuarios.
+    """
+    indice_usuarios.actualizar(cambios)
+
+
+def autocompletar_usuarios(texto, limite=None):
+    """
+    Devuelve los usuarios que coinciden con el prefijo escrito en el mostrador.
+
+    Args:
+        texto (str): Texto escrito por el bibliotecario.
+        limite (int, opcional): Número de resultados pedido; se acota a
+            AUTOCOMPLETAR_LIMITE.
+
+    Returns:
+        list: Diccionarios con id, nombre y email (vacía si el texto es
+        más corto que AUTOCOMPLETAR_MIN_CARACTERES).
+    """
+    if len((texto or "").strip()) < current_app.config["AUTOCOMPLETAR_MIN_CARACTERES"]:
+        return []
+    maximo = current_app.config["AUTOCOMPLETAR_LIMITE"]
+    limite = min(limite or maximo, maximo)
+    return indice_usuarios.buscar(texto, limite)
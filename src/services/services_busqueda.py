@@ -0,0 +1,312 @@
+"""
+Módulo del buscador del catálogo para la aplicación de gestión de biblioteca.
+
+Mantiene un índice invertido (tabla `indice_busqueda`) con los términos de
+título, autor, ISBN, género y editorial de cada libro, y resuelve las búsquedas
+con relevancia BM25 ponderada por campo. El índice se actualiza en la misma
+transacción que las altas, modificaciones y bajas de libros mediante eventos
+de SQLAlchemy, y puede reconstruirse con `flask reindexar-busqueda`.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import math
+import re
+from flask import current_app
+from sqlalchemy import and_, case, delete, distinct, event, func, inspect, select
+from extensions import db
+from src.models.models_busqueda import IndiceBusqueda
+from src.models.models_libro import Libro
+from src.services.services_cache import CacheLocal
+from src.services.services_texto import analizar, normalizar
+
+# Campos del libro que se indexan
+CAMPOS_INDEXADOS = ("titulo", "autor", "isbn", "genero", "editorial")
+
+# Parámetros de BM25
+K1 = 1.2
+B = 0.75
+
+# Longitud máxima de un término en el índice
+LONGITUD_TERMINO = 64
+
+_PATRON_ISBN = re.compile(r"^[0-9]{9}[0-9xX]$|^[0-9]{13}$")
+
+# Longitudes medias por campo, costosas de calcular y estables en el tiempo
+_cache_estadisticas = CacheLocal()
+
+
+def terminos_de_campo(campo, valor):
+    """
+    Obtiene los términos indexables de un campo de un libro.
+
+    El ISBN se indexa como un único término limpio (sin guiones ni espacios);
+    el resto de campos se analizan como texto en español.
+
+    Args:
+        campo (str): Nombre del campo.
+        valor (str): Valor del campo.
+
+    Returns:
+        list: Términos del campo (con repeticiones).
+    """
+    if not valor:
+        return []
+    if campo == "isbn":
+        return [normalizar(Libro._limpiar_isbn(valor))[:LONGITUD_TERMINO]]
+    return [termino[:LONGITUD_TERMINO] for termino in analizar(valor)]
+
+
+def entradas_de_libro(libro):
+    """
+    Genera las entradas del índice invertido para un libro.
+
+    Args:
+        libro (Libro | dict | Row): Libro con id y los campos indexados.
+
+    Returns:
+        list: Diccionarios listos para insertar en `indice_busqueda`.
+    """
+    obtener = libro.get if isinstance(libro, dict) else lambda c: getattr(libro, c)
+    entradas = []
+    for campo in CAMPOS_INDEXADOS:
+        terminos = terminos_de_campo(campo, obtener(campo))
+        frecuencias = {}
+        for termino in terminos:
+            frecuencias[termino] = frecuencias.get(termino, 0) + 1
+        for termino, frecuencia in frecuencias.items():
+            entradas.append(
+                {
+                    "termino": termino,
+                    "libro_id": obtener("id"),
+                    "campo": campo,
+                    "frecuencia": frecuencia,
+                    "longitud": len(terminos),
+                }
+            )
+    return entradas
+
+
+def desindexar_libros(connection, libro_ids):
+    """
+    Elimina del índice las entradas de los libros indicados.
+
+    Args:
+        connection (Connection): Conexión de la transacción en curso.
+        libro_ids (list): IDs de los libros.
+    """
+    if libro_ids:
+        connection.execute(
+            delete(IndiceBusqueda).where(IndiceBusqueda.libro_id.in_(libro_ids))
+        )
+
+
+def indexar_libros(connection, libros):
+    """
+    (Re)indexa un conjunto de libros dentro de la transacción en curso.
+
+    Las operaciones masivas que no pasan por el ORM (importaciones) deben
+    llamar a esta función con las filas que escriben.
+
+    Args:
+        connection (Connection): Conexión de la transacción en curso.
+        libros (list): Libros, filas o diccionarios con id y campos indexados.
+    """
+    if not libros:
+        return
+    desindexar_libros(
+        connection,
+        [libro["id"] if isinstance(libro, dict) else libro.id for libro in libros],
+    )
+    entradas = [entrada for libro in libros for entrada in entradas_de_libro(libro)]
+    if entradas:
+        connection.execute(IndiceBusqueda.__table__.insert(), entradas)
+
+
+@event.listens_for(Libro, "after_insert")
+def _indexar_libro_insertado(mapper, connection, target):
+    """
+    Indexa un libro recién insertado en la misma transacción.
+    """
+    indexar_libros(connection, [target])
+
+
+@event.listens_for(Libro, "after_update")
+def _reindexar_libro_modificado(mapper, connection, target):
+    """
+    Reindexa un libro si cambió alguno de los campos indexados.
+    """
+    estado = inspect(target)
+    if any(estado.attrs[campo].history.has_changes() for campo in CAMPOS_INDEXADOS):
+        indexar_libros(connection, [target])
+
+
+@event.listens_for(Libro, "after_delete")
+def _desindexar_libro_eliminado(mapper, connection, target):
+    """
+    Elimina del índice un libro borrado.
+    """
+    desindexar_libros(connection, [target.id])
+
+
+def reconstruir_indice(tamano_lote=1000):
+    """
+    Reconstruye el índice completo recorriendo el catálogo por lotes.
+
+    Cada lote se confirma por separado para no mantener una transacción
+    larga sobre tablas grandes.
+
+    Args:
+        tamano_lote (int): Número de libros por lote.
+
+    Returns:
+        int: Número de libros indexados.
+    """
+    db.session.execute(delete(IndiceBusqueda))
+    db.session.commit()
+
+    columnas = [Libro.id] + [getattr(Libro, campo) for campo in CAMPOS_INDEXADOS]
+    ultimo_id = 0
+    total = 0
+    while True:
+        filas = db.session.execute(
+            select(*columnas)
+            .where(Libro.id > ultimo_id)
+            .order_by(Libro.id)
+            .limit(tamano_lote)
+        ).all()
+        if not filas:
+            break
+        indexar_libros(db.session.connection(), filas)
+        db.session.commit()
+        ultimo_id = filas[-1].id
+        total += len(filas)
+    _cache_estadisticas.invalidar()
+    return total
+
+
+def _longitudes_medias():
+    """
+    Calcula la longitud media (en términos) de cada campo indexado.
+
+    Returns:
+        dict: Longitud media por campo.
+    """
+    filas = db.session.execute(
+        select(
+            IndiceBusqueda.campo,
+            func.sum(IndiceBusqueda.frecuencia),
+            func.count(distinct(IndiceBusqueda.libro_id)),
+        ).group_by(IndiceBusqueda.campo)
+    ).all()
+    return {campo: float(suma) / documentos for campo, suma, documentos in filas}
+
+
+def terminos_de_consulta(texto):
+    """
+    Obtiene los términos de búsqueda de un texto introducido por el usuario.
+
+    Args:
+        texto (str): Texto de la búsqueda.
+
+    Returns:
+        list: Términos únicos en orden de aparición.
+    """
+    terminos = [termino[:LONGITUD_TERMINO] for termino in analizar(texto)]
+    # Un ISBN escrito con guiones se tokeniza en trozos; se añade también limpio
+    isbn = Libro._limpiar_isbn(texto or "")
+    if _PATRON_ISBN.match(isbn):
+        terminos.append(normalizar(isbn))
+    return list(dict.fromkeys(terminos))
+
+
+def buscar_libros(texto, pagina=1, por_pagina=None):
+    """
+    Busca libros por relevancia BM25 sobre el índice invertido.
+
+    La puntuación de cada libro es la suma, para cada término de la consulta
+    y cada campo en que aparece, de `peso_campo * idf * tf_saturada`. Se
+    calcula en la base de datos con una única consulta agrupada por libro.
+
+    Args:
+        texto (str): Texto de la búsqueda.
+        pagina (int): Número de página (desde 1).
+        por_pagina (int, opcional): Resultados por página.
+
+    Returns:
+        dict: Diccionario con las claves:
+            - libros (list): Libros de la página, en orden de relevancia.
+            - total (int): Número total de libros encontrados.
+            - pagina (int): Página devuelta.
+            - paginas (int): Número total de páginas.
+    """
+    por_pagina = por_pagina or current_app.config["BUSQUEDA_RESULTADOS_POR_PAGINA"]
+    pagina = max(int(pagina), 1)
+    resultado = {"libros": [], "total": 0, "pagina": pagina, "paginas": 0}
+
+    terminos = terminos_de_consulta(texto)
+    if not terminos:
+        return resultado
+
+    indice = IndiceBusqueda.__table__
+    coincide = indice.c.termino.in_(terminos)
+
+    # Frecuencia de documento de cada término en cada campo
+    frecuencias = db.session.execute(
+        select(indice.c.termino, indice.c.campo, func.count())
+        .where(coincide)
+        .group_by(indice.c.termino, indice.c.campo)
+    ).all()
+    if not frecuencias:
+        return resultado
+
+    total_libros = max(Libro.contar_libros(), 1)
+    pesos_campos = current_app.config["BUSQUEDA_PESOS_CAMPOS"]
+    longitudes = _cache_estadisticas.obtener(
+        "longitudes_medias",
+        _longitudes_medias,
+        ttl=current_app.config["CACHE_CATALOGO_TTL"],
+    )
+
+    pesos = []
+    for termino, campo, documentos in frecuencias:
+        idf = math.log(1 + (total_libros - documentos + 0.5) / (documentos + 0.5))
+        pesos.append(
+            (
+                and_(indice.c.termino == termino, indice.c.campo == campo),
+                pesos_campos.get(campo, 1.0) * idf,
+            )
+        )
+    normas = [
+        (indice.c.campo == campo, K1 * B / max(longitud, 1.0))
+        for campo, longitud in longitudes.items()
+    ]
+
+    peso = case(*pesos, else_=0.0)
+    norma = case(*normas, else_=0.0) if normas else 0.0
+    puntuacion = func.sum(
+        peso
+        * indice.c.frecuencia
+        * (K1 + 1)
+        / (indice.c.frecuencia + K1 * (1 - B) + norma * indice.c.longitud)
+    ).label("puntuacion")
+
+    total = db.session.execute(
+        select(func.count(distinct(indice.c.libro_id))).where(coincide)
+    ).scalar()
+    ranking = db.session.execute(
+        select(indice.c.libro_id, puntuacion)
+        .where(coincide)
+        .group_by(indice.c.libro_id)
+        .order_by(puntuacion.desc(), indice.c.libro_id)
+        .limit(por_pagina)
+        .offset((pagina - 1) * por_pagina)
+    ).all()
+
+    ids = [fila.libro_id for fila in ranking]
+    libros = {libro.id: libro for libro in Libro.query.filter(Libro.id.in_(ids))}
+    resultado["libros"] = [libros[libro_id] for libro_id in ids if libro_id in libros]
+    resultado["total"] = total
+    resultado["paginas"] = math.ceil(total / por_pagina)
+    return resultado
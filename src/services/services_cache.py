@@ -0,0 +1,82 @@
+"""
+Módulo de caché en memoria para la aplicación de gestión de biblioteca.
+
+Define la clase CacheLocal, una caché sencilla por proceso con expiración
+opcional, pensada para guardar resultados costosos (conteos, agregados) que
+se invalidan explícitamente cuando cambian los datos de origen.
+
+Cada proceso de gunicorn mantiene su propia copia, por lo que la expiración
+(TTL) acota el tiempo que un proceso puede servir datos modificados por otro.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import threading
+import time
+
+
+class CacheLocal:
+    """
+    Caché en memoria, segura entre hilos, con expiración opcional por entrada.
+
+    Atributos:
+        ttl (float | None): Segundos de validez por defecto de cada entrada.
+    """
+
+    def __init__(self, ttl=None):
+        """
+        Inicializa la caché vacía.
+
+        Args:
+            ttl (float, opcional): Segundos de validez por defecto. None = sin expiración.
+        """
+        self.ttl = ttl
+        self._datos = {}
+        self._generacion = 0
+        self._lock = threading.Lock()
+
+    def obtener(self, clave, calcular, ttl=None):
+        """
+        Devuelve el valor guardado para `clave` o lo calcula y lo guarda.
+
+        Si la caché se invalida mientras se calcula el valor, el resultado se
+        devuelve pero no se guarda, para no conservar datos ya obsoletos.
+
+        Args:
+            clave (hashable): Clave de la entrada.
+            calcular (callable): Función sin argumentos que produce el valor.
+            ttl (float, opcional): Segundos de validez para esta entrada.
+
+        Returns:
+            object: Valor cacheado o recién calculado.
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None and (entrada[1] is None or entrada[1] > ahora):
+                return entrada[0]
+            generacion = self._generacion
+
+        valor = calcular()
+
+        ttl = self.ttl if ttl is None else ttl
+        expira = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if generacion == self._generacion:
+                self._datos[clave] = (valor, expira)
+        return valor
+
+    def invalidar(self, clave=None):
+        """
+        Elimina una entrada o, si no se indica clave, toda la caché.
+
+        Args:
+            clave (hashable, opcional): Clave a eliminar.
+        """
+        with self._lock:
+            self._generacion += 1
+            if clave is None:
+                self._datos.clear()
+            else:
+                self._datos.pop(clave, None)
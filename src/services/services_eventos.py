@@ -0,0 +1,144 @@
+"""
+Módulo de eventos de escritura para la aplicación de gestión de biblioteca.
+
+Registra los cambios (altas, modificaciones y bajas) que la sesión de SQLAlchemy
+realiza sobre los modelos seguidos y los notifica mediante señales de blinker
+una vez confirmada la transacción. Así las cachés en memoria y los índices
+derivados solo se actualizan con datos que realmente llegaron a la base de datos.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+from blinker import Namespace
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+senales = Namespace()
+
+# Señal emitida tras cada commit con los cambios de un modelo.
+# El emisor es la clase del modelo y recibe `cambios`, una lista de tuplas
+# (operacion, antes, despues) donde `antes`/`despues` son diccionarios de columnas.
+cambios_confirmados = senales.signal("cambios-confirmados")
+
+# Modelos seguidos y columnas que se copian de cada instancia
+_MODELOS_SEGUIDOS = {}
+
+# Clave usada en `session.info` para acumular los cambios de la transacción
+_CLAVE_PENDIENTES = "cambios_pendientes"
+
+
+def seguir_cambios(modelo, columnas=None):
+    """
+    Registra un modelo para que sus cambios se notifiquen tras el commit.
+
+    Args:
+        modelo (type): Clase del modelo de SQLAlchemy.
+        columnas (iterable, opcional): Columnas a copiar de cada instancia.
+            Si es None, se copian todas las columnas del modelo.
+    """
+    if columnas is None:
+        columnas = [attr.key for attr in inspect(modelo).column_attrs]
+    _MODELOS_SEGUIDOS[modelo] = tuple(columnas)
+
+
+def notificar_cambios(session, modelo, cambios):
+    """
+    Añade cambios a la transacción en curso de forma explícita.
+
+    Las operaciones masivas (INSERT/UPDATE de Core, `query.update()`) no pasan
+    por el flush de la sesión, por lo que deben declarar aquí sus cambios.
+
+    Args:
+        session (Session): Sesión en la que se realizó la operación.
+        modelo (type): Clase del modelo afectado.
+        cambios (iterable): Tuplas (operacion, antes, despues).
+    """
+    pendientes = session.info.setdefault(_CLAVE_PENDIENTES, {})
+    pendientes.setdefault(modelo, []).extend(cambios)
+
+
+def cambios_pendientes(session):
+    """
+    Devuelve los cambios acumulados en la transacción en curso, aún sin confirmar.
+
+    Args:
+        session (Session): Sesión de la transacción.
+
+    Returns:
+        dict: Listas de tuplas (operacion, antes, despues) por modelo.
+    """
+    return session.info.get(_CLAVE_PENDIENTES, {})
+
+
+def _copiar_columnas(instancia, columnas):
+    """
+    Copia los valores actuales de las columnas de una instancia.
+    """
+    return {columna: getattr(instancia, columna) for columna in columnas}
+
+
+def _copiar_columnas_anteriores(instancia, columnas):
+    """
+    Reconstruye los valores previos al flush a partir del historial de atributos.
+    """
+    estado = inspect(instancia)
+    anteriores = {}
+    for columna in columnas:
+        historial = estado.attrs[columna].history
+        if historial.deleted:
+            anteriores[columna] = historial.deleted[0]
+        else:
+            anteriores[columna] = getattr(instancia, columna)
+    return anteriores
+
+
+@event.listens_for(Session, "after_flush")
+def _registrar_flush(session, flush_context):
+    """
+    Acumula en la sesión los cambios de los modelos seguidos tras cada flush.
+    """
+    for modelo, columnas in _MODELOS_SEGUIDOS.items():
+        cambios = []
+        for instancia in session.new:
+            if isinstance(instancia, modelo):
+                cambios.append(
+                    ("insert", None, _copiar_columnas(instancia, columnas))
+                )
+        for instancia in session.dirty:
+            if isinstance(instancia, modelo) and session.is_modified(instancia):
+                cambios.append(
+                    (
+                        "update",
+                        _copiar_columnas_anteriores(instancia, columnas),
+                        _copiar_columnas(instancia, columnas),
+                    )
+                )
+        for instancia in session.deleted:
+            if isinstance(instancia, modelo):
+                cambios.append(
+                    ("delete", _copiar_columnas(instancia, columnas), None)
+                )
+        if cambios:
+            notificar_cambios(session, modelo, cambios)
+
+
+@event.listens_for(Session, "after_commit")
+def _emitir_confirmados(session):
+    """
+    Emite la señal `cambios_confirmados` con los cambios de la transacción.
+    """
+    pendientes = session.info.pop(_CLAVE_PENDIENTES, None)
+    if not pendientes:
+        return
+    for modelo, cambios in pendientes.items():
+        cambios_confirmados.send(modelo, cambios=cambios)
+
+
+@event.listens_for(Session, "after_rollback")
+@event.listens_for(Session, "after_begin")
+def _descartar_pendientes(session, *args):
+    """
+    Descarta los cambios acumulados si la transacción no llega a confirmarse.
+    """
+    session.info.pop(_CLAVE_PENDIENTES, None)
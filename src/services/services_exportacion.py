@@ -0,0 +1,286 @@
+"""
+Módulo de exportación del catálogo para la aplicación de biblioteca.
+
+Exporta libros, préstamos, usuarios y el informe de multas en CSV o JSON Lines (NDJSON) como una
+respuesta en streaming: las filas se leen con un cursor del lado del servidor
+(`yield_per`) y se escriben por bloques, opcionalmente comprimidas con gzip,
+de modo que la memoria del proceso web no depende del tamaño de la tabla.
+
+Solo se exportan las columnas declaradas en EXPORTACIONES; en particular,
+nunca se incluye el hash de la contraseña de los usuarios.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timezone
+from flask import Response, current_app, stream_with_context
+from sqlalchemy import select
+from extensions import db
+from src.models.models_libro import Libro
+from src.models.models_prestamo import Prestamo
+from src.models.models_usuario import Usuario
+from src.services.services_multas import consulta_totales
+
+# Formatos de exportación: tipo MIME y extensión del archivo
+FORMATOS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+_VERDADERO = ("true", "1", "t", "si", "sí")
+_FALSO = ("false", "0", "f", "no")
+
+
+def _booleano(valor):
+    """
+    Convierte el valor de un filtro en booleano.
+
+    Raises:
+        ValueError: Si el valor no es reconocible.
+    """
+    valor = valor.strip().lower()
+    if valor in _VERDADERO:
+        return True
+    if valor in _FALSO:
+        return False
+    raise ValueError(f"Valor booleano no válido: {valor}")
+
+
+def _fecha(valor):
+    """
+    Convierte el valor de un filtro en fecha (formato ISO 'AAAA-MM-DD').
+
+    Raises:
+        ValueError: Si el valor no es una fecha válida.
+    """
+    try:
+        return datetime.fromisoformat(valor.strip())
+    except ValueError:
+        raise ValueError(f"Fecha no válida: {valor}")
+
+
+def _consulta_multas(filtros):
+    """
+    Construye la consulta del informe de multas con su agrupación y rango de fechas.
+    """
+    desde, hasta = filtros.get("desde"), filtros.get("hasta")
+    totales = consulta_totales(
+        filtros.get("agrupacion") or "usuario",
+        desde=_fecha(desde) if desde else None,
+        hasta=_fecha(hasta) if hasta else None,
+    ).subquery()
+    return select(totales).order_by(totales.c.total.desc(), totales.c.clave)
+
+
+# Entidades exportables: columnas exportadas y filtros admitidos. Cada filtro
+# recibe el valor del parámetro de la petición y devuelve la condición WHERE.
+# Las entidades calculadas declaran en su lugar la función que construye la
+# consulta completa a partir de los parámetros.
+EXPORTACIONES = {
+    "libros": {
+        "columnas": (
+            Libro.id,
+            Libro.isbn,
+            Libro.titulo,
+            Libro.autor,
+            Libro.editorial,
+            Libro.genero,
+            Libro.cantidad,
+        ),
+        "filtros": {
+            "autor": lambda valor: Libro.autor == valor,
+            "genero": lambda valor: Libro.genero == valor,
+            "editorial": lambda valor: Libro.editorial == valor,
+            "disponible": lambda valor: (Libro.cantidad > 0)
+            if _booleano(valor)
+            else (Libro.cantidad <= 0),
+        },
+    },
+    "prestamos": {
+        "columnas": (
+            Prestamo.id,
+            Prestamo.libro_id,
+            Prestamo.usuario_id,
+            Prestamo.fecha_prestamo,
+            Prestamo.fecha_devolucion,
+            Prestamo.estado,
+        ),
+        "filtros": {
+            "estado": lambda valor: Prestamo.estado == valor,
+            "usuario_id": lambda valor: Prestamo.usuario_id == int(valor),
+            "libro_id": lambda valor: Prestamo.libro_id == int(valor),
+            "desde": lambda valor: Prestamo.fecha_prestamo >= _fecha(valor),
+            "hasta": lambda valor: Prestamo.fecha_prestamo < _fecha(valor),
+        },
+    },
+    "usuarios": {
+        "columnas": (
+            Usuario.id,
+            Usuario.nombre,
+            Usuario.email,
+            Usuario.rol,
+            Usuario.email_confirmado,
+        ),
+        "filtros": {
+            "rol": lambda valor: Usuario.rol == valor,
+            "email_confirmado": lambda valor: Usuario.email_confirmado.is_(
+                _booleano(valor)
+            ),
+        },
+    },
+    "multas": {"consulta": _consulta_multas},
+}
+
+
+def _consulta(entidad, filtros):
+    """
+    Construye la consulta de exportación de una entidad con sus filtros.
+
+    Raises:
+        ValueError: Si la entidad o algún valor de filtro no son válidos.
+    """
+    if entidad not in EXPORTACIONES:
+        raise ValueError(f"Entidad no exportable: {entidad}")
+    definicion = EXPORTACIONES[entidad]
+    if "consulta" in definicion:
+        return definicion["consulta"](filtros)
+    columnas = definicion["columnas"]
+    consulta = select(*columnas).order_by(columnas[0])
+    for nombre, condicion in definicion["filtros"].items():
+        valor = filtros.get(nombre)
+        if valor:
+            try:
+                consulta = consulta.where(condicion(valor))
+            except ValueError:
+                raise ValueError(f"Valor no válido para el filtro '{nombre}': {valor}")
+    return consulta
+
+
+def _serializar(valor):
+    """
+    Convierte fechas a texto ISO 8601 para el CSV y el JSON.
+    """
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+
+def _bloques_csv(nombres, particiones):
+    """
+    Genera el CSV por bloques de texto: la cabecera y luego un bloque por partición.
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(nombres)
+    yield buffer.getvalue()
+    for filas in particiones:
+        buffer.seek(0)
+        buffer.truncate()
+        escritor.writerows(
+            [_serializar(valor) for valor in fila] for fila in filas
+        )
+        yield buffer.getvalue()
+
+
+def _bloques_ndjson(nombres, particiones):
+    """
+    Genera JSON Lines por bloques de texto: un objeto por fila y un bloque por partición.
+    """
+    for filas in particiones:
+        yield "".join(
+            json.dumps(
+                {nombre: _serializar(valor) for nombre, valor in zip(nombres, fila)},
+                ensure_ascii=False,
+            )
+            + "\n"
+            for fila in filas
+        )
+
+
+def _comprimir(bloques):
+    """
+    Comprime con gzip un flujo de bloques de bytes sin acumularlo en memoria.
+    """
+    compresor = zlib.compressobj(wbits=31)  # 31: cabecera y cola gzip
+    for bloque in bloques:
+        comprimido = compresor.compress(bloque)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+
+def generar_exportacion(entidad, formato="csv", filtros=None, comprimir=False):
+    """
+    Genera el contenido de una exportación como un iterador de bloques de bytes.
+
+    La consulta se ejecuta con `yield_per`, que en MySQL usa un cursor sin
+    búfer en el servidor, así que solo hay en memoria un bloque de filas
+    (EXPORTACION_TAMANO_BLOQUE) a la vez.
+
+    Args:
+        entidad (str): 'libros', 'prestamos', 'usuarios' o 'multas'.
+        formato (str): 'csv' o 'ndjson'.
+        filtros (dict, opcional): Valores de los filtros de la entidad.
+        comprimir (bool): Si es True, el contenido se comprime con gzip.
+
+    Returns:
+        Iterator[bytes]: Bloques del archivo exportado.
+
+    Raises:
+        ValueError: Si la entidad, el formato o algún filtro no son válidos.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de exportación no válido: {formato}")
+    consulta = _consulta(entidad, filtros or {})
+    tamano = current_app.config["EXPORTACION_TAMANO_BLOQUE"]
+
+    def bloques():
+        resultado = db.session.execute(consulta.execution_options(yield_per=tamano))
+        try:
+            nombres = list(resultado.keys())
+            generador = _bloques_csv if formato == "csv" else _bloques_ndjson
+            for texto in generador(nombres, resultado.partitions()):
+                yield texto.encode("utf-8")
+        finally:
+            resultado.close()
+
+    return _comprimir(bloques()) if comprimir else bloques()
+
+
+def respuesta_exportacion(entidad, parametros):
+    """
+    Crea la respuesta HTTP en streaming de una exportación.
+
+    Args:
+        entidad (str): 'libros', 'prestamos', 'usuarios' o 'multas'.
+        parametros (MultiDict): Parámetros de la petición: 'formato' ('csv' o
+            'ndjson'), 'gzip' (booleano) y los filtros de la entidad.
+
+    Returns:
+        Response: Respuesta con el archivo adjunto, generada por bloques.
+
+    Raises:
+        ValueError: Si algún parámetro no es válido.
+    """
+    formato = parametros.get("formato", "csv")
+    comprimir = _booleano(parametros.get("gzip") or "false")
+    bloques = generar_exportacion(entidad, formato, parametros, comprimir)
+
+    tipo, extension = FORMATOS[formato]
+    fecha = datetime.now(timezone.utc).strftime("%Y%m%d")
+    nombre = f"{entidad}_{fecha}.{extension}"
+    if comprimir:
+        tipo, nombre = "application/gzip", f"{nombre}.gz"
+    return Response(
+        stream_with_context(bloques),
+        mimetype=tipo,
+        headers={
+            "Content-Disposition": f'attachment; filename="{nombre}"',
+            "Cache-Control": "no-store",
+        },
+    )
@@ -0,0 +1,148 @@
+"""
+Módulo de navegación por facetas del catálogo para la aplicación de biblioteca.
+
+Resuelve las vistas de libros agrupados por autor, género o título con
+consultas GROUP BY paginadas (valor de la faceta y número de libros) y carga
+los libros de cada valor solo cuando se despliega, también paginados.
+
+Las facetas de autor, género y editorial se leen de los contadores
+materializados de `resumen_catalogo`, que incluyen también los ejemplares
+disponibles y prestados. La de título se calcula con GROUP BY y se guarda en
+caché hasta que se confirma el alta o baja de un libro o un cambio de título.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import math
+from flask import current_app
+from sqlalchemy import func, select
+from extensions import db
+from src.models.models_libro import Libro
+from src.services.services_cache import CacheLocal
+from src.services.services_eventos import cambios_confirmados
+from src.services.services_resumen import DIMENSIONES, pagina_resumen
+
+# Campos del libro por los que se puede agrupar el catálogo
+FACETAS = ("autor", "genero", "titulo", "editorial")
+
+_cache_facetas = CacheLocal()
+
+
+def _columna(faceta):
+    """
+    Devuelve la columna del modelo Libro asociada a una faceta.
+
+    Raises:
+        ValueError: Si la faceta no es válida.
+    """
+    if faceta not in FACETAS:
+        raise ValueError(f"Faceta no válida: {faceta}")
+    return getattr(Libro, faceta)
+
+
+def _calcular_pagina_facetas(faceta, pagina, por_pagina):
+    """
+    Consulta una página de valores de la faceta con su número de libros.
+    """
+    columna = _columna(faceta)
+    total = db.session.execute(select(func.count(func.distinct(columna)))).scalar()
+    filas = db.session.execute(
+        select(columna.label("valor"), func.count(Libro.id).label("total"))
+        .group_by(columna)
+        .order_by(columna)
+        .limit(por_pagina)
+        .offset((pagina - 1) * por_pagina)
+    ).all()
+    return {
+        "elementos": [{"valor": fila.valor, "total": fila.total} for fila in filas],
+        "total": total,
+        "pagina": pagina,
+        "paginas": math.ceil(total / por_pagina),
+    }
+
+
+def pagina_facetas(faceta, pagina=1, por_pagina=None):
+    """
+    Obtiene una página de valores de una faceta con el número de libros de cada uno.
+
+    Para autor, género y editorial cada elemento incluye además los
+    ejemplares 'disponibles' y 'prestados'.
+
+    Args:
+        faceta (str): Campo por el que se agrupa ('autor', 'genero', 'titulo', 'editorial').
+        pagina (int): Número de página (desde 1).
+        por_pagina (int, opcional): Valores por página (por defecto FACETAS_POR_PAGINA).
+
+    Returns:
+        dict: Diccionario con 'elementos' (valor y total), 'total', 'pagina' y 'paginas'.
+
+    Raises:
+        ValueError: Si la faceta no es válida.
+    """
+    _columna(faceta)
+    por_pagina = por_pagina or current_app.config["FACETAS_POR_PAGINA"]
+    pagina = max(int(pagina), 1)
+    if faceta in DIMENSIONES:
+        return pagina_resumen(faceta, pagina=pagina, por_pagina=por_pagina)
+    return _cache_facetas.obtener(
+        (faceta, pagina, por_pagina),
+        lambda: _calcular_pagina_facetas(faceta, pagina, por_pagina),
+        ttl=current_app.config["CACHE_CATALOGO_TTL"],
+    )
+
+
+def miembros_faceta(faceta, valor, pagina=1, por_pagina=None):
+    """
+    Obtiene una página de los libros que tienen un valor concreto de la faceta.
+
+    Solo se leen las columnas que muestra el listado. No se cachea porque
+    incluye la disponibilidad, que cambia con cada préstamo.
+
+    Args:
+        faceta (str): Campo por el que se agrupa.
+        valor (str): Valor de la faceta (autor, género o título concreto).
+        pagina (int): Número de página (desde 1).
+        por_pagina (int, opcional): Libros por página (por defecto LIBROS_POR_PAGINA).
+
+    Returns:
+        dict: Diccionario con 'elementos', 'pagina' y 'siguiente' (número de
+        la página siguiente o None).
+
+    Raises:
+        ValueError: Si la faceta no es válida.
+    """
+    columna = _columna(faceta)
+    por_pagina = por_pagina or current_app.config["LIBROS_POR_PAGINA"]
+    pagina = max(int(pagina), 1)
+    filas = db.session.execute(
+        select(
+            Libro.id,
+            Libro.titulo,
+            Libro.autor,
+            (Libro.cantidad > 0).label("esta_disponible"),
+        )
+        .where(columna == valor)
+        .order_by(Libro.titulo, Libro.id)
+        .limit(por_pagina + 1)
+        .offset((pagina - 1) * por_pagina)
+    ).all()
+    return {
+        "elementos": filas[:por_pagina],
+        "pagina": pagina,
+        "siguiente": pagina + 1 if len(filas) > por_pagina else None,
+    }
+
+
+@cambios_confirmados.connect_via(Libro)
+def _invalidar_facetas(modelo, cambios):
+    """
+    Invalida las páginas de títulos cuando cambia la composición de algún grupo.
+
+    Los cambios que no afectan al título (préstamos, devoluciones o cambios de
+    autor) no alteran los grupos ni sus totales, así que no invalidan la caché.
+    """
+    for operacion, antes, despues in cambios:
+        if operacion != "update" or antes["titulo"] != despues["titulo"]:
+            _cache_facetas.invalidar()
+            return
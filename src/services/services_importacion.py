@@ -0,0 +1,313 @@
+"""
+Módulo de importación masiva de libros para la aplicación de gestión de biblioteca.
+
+Lee un archivo CSV como flujo, sin guardarlo en disco, y lo procesa por lotes:
+cada lote se valida de una vez con las reglas del modelo Libro, se comprueba la
+unicidad de ISBN y título con una consulta por lote y se escribe con INSERT y
+UPDATE de varias filas en su propia transacción. Los libros cuyo ISBN ya existe
+se actualizan (semántica upsert por ISBN). Las filas con errores se omiten y se
+devuelven en un informe con su número de línea, sin afectar al resto.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import csv
+import io
+import logging
+from flask import current_app
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.exc import SQLAlchemyError
+from extensions import db
+from src.models.models_libro import Libro
+from src.models.models_prestamo import Prestamo
+from src.services.services_busqueda import indexar_libros
+from src.services.services_eventos import notificar_cambios
+from src.services.services_resumen import (
+    DIMENSIONES,
+    aplicar_deltas,
+    sumar_contribucion,
+)
+from src.services.services_validacion import validar_lote
+
+# Columnas obligatorias del archivo CSV
+COLUMNAS_CSV = ("isbn", "titulo", "autor", "editorial", "genero", "cantidad")
+
+
+def nuevo_informe():
+    """
+    Crea un informe de importación vacío.
+
+    Returns:
+        dict: Informe con los contadores 'procesadas', 'insertados',
+        'actualizados' y 'errores', y la lista 'detalle_errores' con
+        diccionarios {'linea', 'mensaje'}.
+    """
+    return {
+        "procesadas": 0,
+        "insertados": 0,
+        "actualizados": 0,
+        "errores": 0,
+        "detalle_errores": [],
+    }
+
+
+def _registrar_error(informe, linea, mensaje):
+    """
+    Anota un error de una fila en el informe.
+
+    Todos los errores se cuentan, pero solo se guarda el detalle de los
+    primeros IMPORTACION_MAX_ERRORES para acotar el tamaño del informe.
+    """
+    informe["errores"] += 1
+    if len(informe["detalle_errores"]) < current_app.config["IMPORTACION_MAX_ERRORES"]:
+        informe["detalle_errores"].append({"linea": linea, "mensaje": mensaje})
+
+
+def comprobar_columnas(columnas):
+    """
+    Comprueba que la cabecera del CSV tenga todas las columnas obligatorias.
+
+    Args:
+        columnas (list): Nombres de columna de la cabecera.
+
+    Raises:
+        ValueError: Si falta alguna columna.
+    """
+    faltan = [columna for columna in COLUMNAS_CSV if columna not in (columnas or [])]
+    if faltan:
+        raise ValueError(f"Faltan columnas en el archivo CSV: {', '.join(faltan)}.")
+
+
+def _validar_lote(lote, informe, vistos):
+    """
+    Valida las filas de un lote de una vez y descarta las repetidas dentro del archivo.
+
+    Los formatos se comprueban con `validar_lote` para todo el lote; la
+    unicidad frente a la base de datos se resuelve después, al clasificarlo.
+
+    Returns:
+        list: Tuplas (linea, libro) de las filas válidas.
+    """
+    validos = []
+    resultados = validar_lote([fila for _, fila in lote], comprobar_unicidad=False)
+    for (linea, _), resultado in zip(lote, resultados):
+        if not resultado["valido"]:
+            _registrar_error(informe, linea, " ".join(resultado["errores"].values()))
+            continue
+        libro = resultado["libro"]
+        repetida = vistos["isbn"].get(libro["isbn"]) or vistos["titulo"].get(
+            libro["titulo"]
+        )
+        if repetida:
+            _registrar_error(
+                informe, linea, f"Libro repetido en el archivo (línea {repetida})."
+            )
+            continue
+        vistos["isbn"][libro["isbn"]] = linea
+        vistos["titulo"][libro["titulo"]] = linea
+        validos.append((linea, libro))
+    return validos
+
+
+def _clasificar_lote(validos, informe):
+    """
+    Separa las filas válidas en altas y actualizaciones según su ISBN.
+
+    Usa una consulta para los ISBN y otra para los títulos del lote. Las filas
+    cuyo título pertenece a otro libro se anotan como error.
+
+    Returns:
+        tuple: Listas de altas [(linea, libro)] y de actualizaciones
+        [(linea, anterior, libro)], donde `anterior` es la fila actual.
+    """
+    existentes = {
+        fila.isbn: fila
+        for fila in db.session.execute(
+            select(
+                Libro.id,
+                Libro.isbn,
+                Libro.titulo,
+                Libro.autor,
+                Libro.editorial,
+                Libro.genero,
+                Libro.cantidad,
+            ).where(Libro.isbn.in_([libro["isbn"] for _, libro in validos]))
+        )
+    }
+    titulos = dict(
+        db.session.execute(
+            select(Libro.titulo, Libro.isbn).where(
+                Libro.titulo.in_([libro["titulo"] for _, libro in validos])
+            )
+        ).all()
+    )
+
+    altas = []
+    actualizaciones = []
+    for linea, libro in validos:
+        propietario = titulos.get(libro["titulo"])
+        if propietario is not None and propietario != libro["isbn"]:
+            _registrar_error(informe, linea, "El título ya existe en la base de datos.")
+            continue
+        anterior = existentes.get(libro["isbn"])
+        if anterior is None:
+            altas.append((linea, libro))
+        else:
+            libro["id"] = anterior.id
+            actualizaciones.append((linea, anterior, libro))
+    return altas, actualizaciones
+
+
+def _deltas_resumen(altas, actualizaciones):
+    """
+    Calcula los incrementos de los contadores del catálogo de un lote.
+    """
+    deltas = {}
+    for _, libro in altas:
+        sumar_contribucion(deltas, libro, 1, libro["cantidad"])
+
+    cambian = [
+        anterior.id
+        for _, anterior, libro in actualizaciones
+        if any(getattr(anterior, dimension) != libro[dimension] for dimension in DIMENSIONES)
+    ]
+    prestados = {}
+    if cambian:
+        prestados = dict(
+            db.session.execute(
+                select(Prestamo.libro_id, func.count())
+                .where(
+                    Prestamo.libro_id.in_(cambian), Prestamo.fecha_devolucion.is_(None)
+                )
+                .group_by(Prestamo.libro_id)
+            ).all()
+        )
+    for _, anterior, libro in actualizaciones:
+        sin_devolver = prestados.get(anterior.id, 0)
+        sumar_contribucion(
+            deltas, anterior._mapping, -1, -anterior.cantidad, -sin_devolver
+        )
+        sumar_contribucion(deltas, libro, 1, libro["cantidad"], sin_devolver)
+    return deltas
+
+
+def _escribir_lote(altas, actualizaciones):
+    """
+    Escribe las altas y actualizaciones de un lote en la transacción en curso.
+
+    Además de los libros, mantiene el índice de búsqueda y los contadores del
+    catálogo y declara los cambios para las cachés, ya que las sentencias
+    masivas no pasan por los eventos del ORM.
+    """
+    tabla = Libro.__table__
+    connection = db.session.connection()
+
+    if altas:
+        connection.execute(tabla.insert(), [libro for _, libro in altas])
+        ids = dict(
+            db.session.execute(
+                select(Libro.isbn, Libro.id).where(
+                    Libro.isbn.in_([libro["isbn"] for _, libro in altas])
+                )
+            ).all()
+        )
+        for _, libro in altas:
+            libro["id"] = ids[libro["isbn"]]
+
+    if actualizaciones:
+        connection.execute(
+            tabla.update().where(tabla.c.id == bindparam("libro_id")),
+            [
+                {
+                    "libro_id": libro["id"],
+                    **{columna: libro[columna] for columna in COLUMNAS_CSV},
+                }
+                for _, _, libro in actualizaciones
+            ],
+        )
+
+    indexar_libros(
+        connection,
+        [libro for _, libro in altas] + [libro for _, _, libro in actualizaciones],
+    )
+    aplicar_deltas(connection, _deltas_resumen(altas, actualizaciones))
+    notificar_cambios(
+        db.session,
+        Libro,
+        [("insert", None, libro) for _, libro in altas]
+        + [
+            ("update", dict(anterior._mapping), libro)
+            for _, anterior, libro in actualizaciones
+        ],
+    )
+
+
+def _procesar_lote(lote, informe, vistos):
+    """
+    Valida, clasifica y escribe un lote de filas en su propia transacción.
+
+    Si la escritura falla (por ejemplo, por un ISBN insertado a la vez desde
+    otra sesión), se deshace el lote y todas sus filas válidas se anotan como
+    error.
+    """
+    informe["procesadas"] += len(lote)
+    validos = _validar_lote(lote, informe, vistos)
+    if not validos:
+        return
+    altas, actualizaciones = _clasificar_lote(validos, informe)
+    try:
+        _escribir_lote(altas, actualizaciones)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logging.error(f"Error al guardar un lote de la importación: {e}")
+        for linea, *_ in altas + actualizaciones:
+            _registrar_error(informe, linea, "No se pudo guardar el lote de esta fila.")
+        return
+    informe["insertados"] += len(altas)
+    informe["actualizados"] += len(actualizaciones)
+
+
+def importar_libros_csv(flujo, tamano_lote=None, al_procesar_lote=None):
+    """
+    Importa libros desde un CSV leído como flujo, por lotes.
+
+    Args:
+        flujo (BinaryIO): Flujo binario del archivo (por ejemplo, `file.stream`).
+        tamano_lote (int, opcional): Filas por lote (por defecto
+            IMPORTACION_TAMANO_LOTE).
+        al_procesar_lote (callable, opcional): Función que recibe el informe
+            tras cada lote, para seguir el progreso.
+
+    Returns:
+        dict: Informe de la importación (ver `nuevo_informe`).
+
+    Raises:
+        ValueError: Si el archivo no tiene las columnas obligatorias.
+    """
+    tamano_lote = tamano_lote or current_app.config["IMPORTACION_TAMANO_LOTE"]
+    informe = nuevo_informe()
+    vistos = {"isbn": {}, "titulo": {}}
+
+    texto = io.TextIOWrapper(flujo, encoding="utf-8-sig", newline="")
+    lector = csv.DictReader(texto)
+    comprobar_columnas(lector.fieldnames)
+
+    lote = []
+    try:
+        for fila in lector:
+            lote.append((lector.line_num, fila))
+            if len(lote) >= tamano_lote:
+                _procesar_lote(lote, informe, vistos)
+                lote = []
+                if al_procesar_lote:
+                    al_procesar_lote(informe)
+    except (csv.Error, UnicodeDecodeError) as e:
+        # Un archivo mal formado detiene la lectura; los lotes ya guardados se conservan
+        _registrar_error(informe, lector.line_num, f"No se pudo leer el archivo: {e}")
+    if lote:
+        _procesar_lote(lote, informe, vistos)
+        if al_procesar_lote:
+            al_procesar_lote(informe)
+    return informe
@@ -0,0 +1,236 @@
+"""
+Módulo de multas por retraso para la aplicación de biblioteca.
+
+Calcula las multas en SQL en lugar de con `Prestamo.calcular_penalizacion`
+objeto a objeto: los días de retraso son la diferencia en días entre la fecha
+de préstamo y la de devolución (o el momento actual si el libro sigue
+prestado) menos PRESTAMOS_DIAS, y la multa es ese retraso por
+MULTAS_TARIFA_DIA. Así los totales por usuario, por libro o por mes se
+obtienen con una sola consulta agregada, sin cargar los préstamos.
+
+La diferencia de fechas se compila según el motor: TIMESTAMPDIFF en
+MySQL/MariaDB y julianday en SQLite.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import Integer, String, case, cast, func, literal, literal_column, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from extensions import db
+from src.models.models_libro import Libro
+from src.models.models_prestamo import Prestamo
+from src.models.models_usuario import Usuario
+from src.services.services_paginacion import paginar_por_clave
+
+
+class dias_entre(FunctionElement):
+    """
+    Días completos transcurridos entre dos fechas: dias_entre(inicio, fin).
+    """
+
+    type = Integer()
+    name = "dias_entre"
+    inherit_cache = True
+
+
+@compiles(dias_entre)
+def _dias_entre_mysql(elemento, compilador, **kw):
+    inicio, fin = list(elemento.clauses)
+    return (
+        f"TIMESTAMPDIFF(DAY, {compilador.process(inicio, **kw)}, "
+        f"{compilador.process(fin, **kw)})"
+    )
+
+
+@compiles(dias_entre, "sqlite")
+def _dias_entre_sqlite(elemento, compilador, **kw):
+    inicio, fin = list(elemento.clauses)
+    return (
+        f"CAST(julianday({compilador.process(fin, **kw)}) - "
+        f"julianday({compilador.process(inicio, **kw)}) AS INTEGER)"
+    )
+
+
+class mes_de(FunctionElement):
+    """
+    Mes de una fecha como texto 'AAAA-MM': mes_de(fecha).
+    """
+
+    type = String()
+    name = "mes_de"
+    inherit_cache = True
+
+
+# literal_column escapa los '%' según el estilo de parámetros del controlador
+_FORMATO_MES = literal_column("'%Y-%m'")
+
+
+@compiles(mes_de)
+def _mes_de_mysql(elemento, compilador, **kw):
+    return (
+        f"DATE_FORMAT({compilador.process(elemento.clauses, **kw)}, "
+        f"{compilador.process(_FORMATO_MES, **kw)})"
+    )
+
+
+@compiles(mes_de, "sqlite")
+def _mes_de_sqlite(elemento, compilador, **kw):
+    return (
+        f"strftime({compilador.process(_FORMATO_MES, **kw)}, "
+        f"{compilador.process(elemento.clauses, **kw)})"
+    )
+
+
+def dias_retraso(ahora):
+    """
+    Expresión SQL con los días de retraso de un préstamo (negativa si no hay retraso).
+
+    Args:
+        ahora (datetime): Fin de los préstamos sin devolver.
+
+    Returns:
+        ColumnElement: Días de retraso.
+    """
+    fin = func.coalesce(Prestamo.fecha_devolucion, literal(ahora, db.DateTime))
+    return (
+        dias_entre(Prestamo.fecha_prestamo, fin) - current_app.config["PRESTAMOS_DIAS"]
+    )
+
+
+def importe_multa(ahora, tarifa=None):
+    """
+    Expresión SQL con la multa de un préstamo (0 si no tiene retraso).
+
+    Args:
+        ahora (datetime): Fin de los préstamos sin devolver.
+        tarifa (int, opcional): Importe por día de retraso (por defecto
+            MULTAS_TARIFA_DIA).
+
+    Returns:
+        ColumnElement: Importe de la multa.
+    """
+    tarifa = current_app.config["MULTAS_TARIFA_DIA"] if tarifa is None else tarifa
+    retraso = dias_retraso(ahora)
+    return case((retraso > 0, retraso * tarifa), else_=0)
+
+
+def _condiciones(ahora, desde=None, hasta=None):
+    """
+    Condiciones de los préstamos con multa, con el rango de fechas de préstamo.
+
+    El primer filtro es la condición necesaria sobre `fecha_prestamo`, que se
+    resuelve con índice; el segundo descarta los devueltos a tiempo.
+    """
+    condiciones = [
+        Prestamo.fecha_prestamo
+        < ahora - timedelta(days=current_app.config["PRESTAMOS_DIAS"]),
+        dias_retraso(ahora) > 0,
+    ]
+    if desde:
+        condiciones.append(Prestamo.fecha_prestamo >= desde)
+    if hasta:
+        condiciones.append(Prestamo.fecha_prestamo < hasta)
+    return condiciones
+
+
+# Agrupaciones del informe: clave del grupo, nombre mostrado y tabla unida.
+# Los préstamos de libros eliminados (libro_id nulo) se agrupan con clave 0.
+AGRUPACIONES = {
+    "usuario": lambda: (
+        func.coalesce(Prestamo.usuario_id, 0),
+        func.coalesce(Usuario.nombre, "Usuario eliminado"),
+        (Usuario, Usuario.id == Prestamo.usuario_id),
+    ),
+    "libro": lambda: (
+        func.coalesce(Prestamo.libro_id, 0),
+        func.coalesce(Libro.titulo, "Libro eliminado"),
+        (Libro, Libro.id == Prestamo.libro_id),
+    ),
+    "mes": lambda: (mes_de(Prestamo.fecha_prestamo), mes_de(Prestamo.fecha_prestamo), None),
+}
+
+
+def consulta_totales(agrupacion="usuario", desde=None, hasta=None, ahora=None):
+    """
+    Construye la consulta agregada de multas por usuario, por libro o por mes.
+
+    Los meses son los de la fecha de préstamo, igual que el filtro de fechas.
+
+    Args:
+        agrupacion (str): 'usuario', 'libro' o 'mes'.
+        desde (datetime, opcional): Primera fecha de préstamo incluida.
+        hasta (datetime, opcional): Fecha de préstamo excluida.
+        ahora (datetime, opcional): Momento de referencia.
+
+    Returns:
+        Select: Consulta con las columnas 'clave', 'nombre', 'prestamos',
+        'dias_retraso' y 'total', sin ORDER BY.
+
+    Raises:
+        ValueError: Si la agrupación no es válida.
+    """
+    if agrupacion not in AGRUPACIONES:
+        raise ValueError(f"Agrupación no válida: {agrupacion}")
+    ahora = ahora or datetime.now(timezone.utc)
+    clave, nombre, union = AGRUPACIONES[agrupacion]()
+    consulta = select(
+        clave.label("clave"),
+        nombre.label("nombre"),
+        func.count(Prestamo.id).label("prestamos"),
+        cast(func.sum(dias_retraso(ahora)), Integer).label("dias_retraso"),
+        cast(func.sum(importe_multa(ahora)), Integer).label("total"),
+    ).select_from(Prestamo)
+    if union is not None:
+        consulta = consulta.outerjoin(*union)
+    return consulta.where(*_condiciones(ahora, desde, hasta)).group_by(clave, nombre)
+
+
+def total_multas(desde=None, hasta=None, ahora=None):
+    """
+    Calcula el número de préstamos con multa y el importe total.
+
+    Returns:
+        dict: 'prestamos' y 'total'.
+    """
+    ahora = ahora or datetime.now(timezone.utc)
+    fila = db.session.execute(
+        select(
+            func.count(Prestamo.id).label("prestamos"),
+            cast(func.coalesce(func.sum(importe_multa(ahora)), 0), Integer).label(
+                "total"
+            ),
+        ).where(*_condiciones(ahora, desde, hasta))
+    ).one()
+    return {"prestamos": fila.prestamos, "total": fila.total}
+
+
+def pagina_totales(
+    agrupacion="usuario", desde=None, hasta=None, despues=None, antes=None, limite=None
+):
+    """
+    Obtiene una página del informe de multas, de mayor a menor importe.
+
+    Args:
+        agrupacion (str): 'usuario', 'libro' o 'mes'.
+        desde, hasta (datetime, opcional): Rango de fechas de préstamo.
+        despues, antes (str, opcional): Cursores de paginación.
+        limite (int, opcional): Filas por página (por defecto MULTAS_POR_PAGINA).
+
+    Returns:
+        dict: Página con las claves 'elementos', 'siguiente' y 'anterior'.
+
+    Raises:
+        ValueError: Si la agrupación no es válida.
+    """
+    totales = consulta_totales(agrupacion, desde, hasta).subquery()
+    return paginar_por_clave(
+        select(totales),
+        orden=[(totales.c.total, True), (totales.c.clave, False)],
+        limite=limite or current_app.config["MULTAS_POR_PAGINA"],
+        despues=despues,
+        antes=antes,
+    )
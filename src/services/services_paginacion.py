@@ -0,0 +1,167 @@
+"""
+Módulo de paginación por clave (keyset) para la aplicación de gestión de biblioteca.
+
+En lugar de OFFSET, cada página se pide a partir de los valores de ordenación
+de la última fila mostrada (el cursor), de modo que la base de datos recorre el
+índice directamente desde ese punto y el coste no crece con el número de página.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+
+def codificar_cursor(valores):
+    """
+    Codifica los valores de ordenación de una fila como cursor opaco para URLs.
+
+    Args:
+        valores (list): Valores de las columnas de ordenación.
+
+    Returns:
+        str: Cursor en base64 apto para URLs.
+    """
+    serializables = [
+        {"dt": valor.isoformat()} if isinstance(valor, datetime) else valor
+        for valor in valores
+    ]
+    datos = json.dumps(serializables, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(datos).decode("ascii")
+
+
+def decodificar_cursor(cursor, longitud):
+    """
+    Decodifica un cursor generado por `codificar_cursor`.
+
+    Args:
+        cursor (str): Cursor recibido en la URL.
+        longitud (int): Número de valores esperados.
+
+    Returns:
+        list | None: Valores de ordenación, o None si el cursor no es válido.
+    """
+    if not cursor:
+        return None
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError):
+        return None
+    if not isinstance(valores, list) or len(valores) != longitud:
+        return None
+    return [
+        datetime.fromisoformat(valor["dt"]) if isinstance(valor, dict) else valor
+        for valor in valores
+    ]
+
+
+def _condicion_posterior(orden, valores, invertir=False):
+    """
+    Construye la condición "fila posterior al cursor" para una ordenación compuesta.
+
+    Para columnas (a, b) ascendentes genera `a > :a OR (a = :a AND b > :b)`,
+    forma que MySQL y SQLite resuelven como rango sobre el índice.
+    """
+    alternativas = []
+    for i, (columna, descendente) in enumerate(orden):
+        hacia_atras = descendente != invertir
+        comparacion = columna < valores[i] if hacia_atras else columna > valores[i]
+        iguales = [orden[j][0] == valores[j] for j in range(i)]
+        alternativas.append(and_(*iguales, comparacion))
+    return or_(*alternativas)
+
+
+def _preparar_pagina(consulta, orden, limite, despues, antes):
+    """
+    Añade a la consulta la condición del cursor, el orden y el límite.
+
+    Returns:
+        tuple: Sentencia a ejecutar (pide una fila de más para saber si hay
+        otra página), valores del cursor `despues` y si se pagina hacia atrás.
+    """
+    valores_despues = decodificar_cursor(despues, len(orden))
+    valores_antes = None if valores_despues else decodificar_cursor(antes, len(orden))
+    hacia_atras = valores_antes is not None
+
+    if valores_despues:
+        consulta = consulta.where(_condicion_posterior(orden, valores_despues))
+    elif hacia_atras:
+        consulta = consulta.where(
+            _condicion_posterior(orden, valores_antes, invertir=True)
+        )
+
+    clausulas = []
+    for columna, descendente in orden:
+        descendente = descendente != hacia_atras
+        clausulas.append(columna.desc() if descendente else columna.asc())
+    return consulta.order_by(*clausulas).limit(limite + 1), valores_despues, hacia_atras
+
+
+def consulta_pagina(consulta, orden, limite, despues=None, antes=None):
+    """
+    Construye la sentencia que ejecuta `paginar_por_clave` para una página.
+
+    Sirve para inspeccionar el plan de las consultas paginadas (ver
+    `services_planes`) sin ejecutarlas.
+
+    Args:
+        consulta (Select): Consulta de SQLAlchemy sin ORDER BY ni LIMIT.
+        orden (list): Tuplas (columna, descendente) que definen el orden.
+        limite (int): Número máximo de filas por página.
+        despues (str, opcional): Cursor de la última fila de la página anterior.
+        antes (str, opcional): Cursor de la primera fila de la página siguiente.
+
+    Returns:
+        Select: Consulta con la condición del cursor, ORDER BY y LIMIT.
+    """
+    return _preparar_pagina(consulta, orden, limite, despues, antes)[0]
+
+
+def paginar_por_clave(consulta, orden, limite, despues=None, antes=None):
+    """
+    Ejecuta una consulta paginada por clave y devuelve la página pedida.
+
+    La ordenación debe terminar en una columna única (normalmente el id) para
+    que el cursor identifique una posición exacta. Las filas devueltas deben
+    exponer cada columna de ordenación con su mismo nombre (`columna.key`).
+
+    Args:
+        consulta (Select): Consulta de SQLAlchemy sin ORDER BY ni LIMIT.
+        orden (list): Tuplas (columna, descendente) que definen el orden.
+        limite (int): Número máximo de filas por página.
+        despues (str, opcional): Cursor de la última fila de la página anterior.
+        antes (str, opcional): Cursor de la primera fila de la página siguiente.
+
+    Returns:
+        dict: Diccionario con las claves:
+            - elementos (list): Filas de la página.
+            - siguiente (str | None): Cursor para la página siguiente.
+            - anterior (str | None): Cursor para la página anterior.
+    """
+    # Importación local para evitar dependencias circulares con los modelos
+    from extensions import db
+
+    claves = [columna.key for columna, _ in orden]
+    sentencia, valores_despues, hacia_atras = _preparar_pagina(
+        consulta, orden, limite, despues, antes
+    )
+    filas = db.session.execute(sentencia).all()
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    if hacia_atras:
+        filas.reverse()
+
+    def cursor_de(fila):
+        return codificar_cursor([getattr(fila, clave) for clave in claves])
+
+    siguiente = anterior = None
+    if filas:
+        if hay_mas or hacia_atras:
+            siguiente = cursor_de(filas[-1])
+        if (hay_mas and hacia_atras) or valores_despues:
+            anterior = cursor_de(filas[0])
+
+    return {"elementos": filas, "siguiente": siguiente, "anterior": anterior}
@@ -0,0 +1,253 @@
+"""
+Módulo de verificación de planes de consulta para la aplicación de biblioteca.
+
+Ejecuta EXPLAIN sobre las consultas más frecuentes (devoluciones, límite de
+préstamos por usuario, préstamos vencidos, recordatorios, ranking de libros
+más prestados, historiales, gestión de préstamos, reservas pendientes, cola
+de reservas de cada libro, estadísticas de reservas por usuario y
+confirmación de correo) y detecta las que recorren la tabla completa en
+lugar de usar un índice. Las sentencias se construyen con las mismas
+funciones de consulta que usa la aplicación, de modo que un cambio en ellas
+se refleja aquí. Se usa desde `flask verificar-planes` y desde
+`tests/test_planes.py` para comprobar que ningún cambio de esquema o de
+consulta deja sin índice estas rutas.
+
+Admite SQLite (EXPLAIN QUERY PLAN) y MySQL/MariaDB (EXPLAIN). Con
+`base_temporal` se comprueba sobre una base SQLite en memoria con el esquema
+de los modelos y datos de ejemplo, sin tocar la base de datos configurada.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, text
+from extensions import db
+from src.models.models_libro import Libro
+from src.models.models_prestamo import Prestamo
+from src.models.models_reserva import Reserva
+from src.models.models_usuario import Usuario
+from src.services.services_paginacion import consulta_pagina
+from src.services.services_prestamos import consulta_prestamos_sin_devolver
+from src.services.services_ranking import consulta_ranking
+from src.services.services_recordatorios import consulta_recordatorios
+from src.services.services_reservas import consulta_cola, consulta_posicion
+from src.services.services_vencimientos import (
+    consulta_contar_vencidos,
+    consulta_por_vencer,
+)
+
+# Fecha de referencia de las consultas que dependen del momento actual
+_FECHA = datetime(2025, 1, 1)
+
+# Consultas frecuentes: nombre y sentencia, construida con las mismas
+# funciones que usa la aplicación para que no se desvíen de las reales
+CONSULTAS_FRECUENTES = {
+    "devolver: préstamo sin devolver de un libro": lambda: (
+        Prestamo.consulta_sin_devolver_de_libro(1)
+    ),
+    "validar_prestamo: préstamos activos de un usuario": lambda: (
+        Prestamo.consulta_prestamos_activos(1)
+    ),
+    "realizar_prestamo: préstamos sin devolver de un usuario": lambda: (
+        consulta_prestamos_sin_devolver(1)
+    ),
+    "marcar_vencidos: préstamos activos fuera de plazo": lambda: consulta_por_vencer(
+        _FECHA, 500
+    ),
+    "enviar_recordatorios: préstamos que vencen pronto": lambda: (
+        consulta_recordatorios(_FECHA, 500)
+    ),
+    "libros_mas_prestados: préstamos por libro de un periodo": lambda: (
+        consulta_ranking(30, 20, ahora=_FECHA)
+    ),
+    "contar_vencidos: préstamos vencidos": lambda: consulta_contar_vencidos(),
+    "historial: préstamos de un usuario por fecha": lambda: consulta_pagina(
+        *Prestamo.consulta_historial(1), limite=20
+    ),
+    "gestionar_prestamos: préstamos sin devolver por vencimiento": lambda: (
+        consulta_pagina(*Prestamo.consulta_sin_devolver(), limite=50)
+    ),
+    "reservas_pendientes: reservas por estado": lambda: consulta_pagina(
+        *Reserva.consulta_gestion("pendiente"), limite=50
+    ),
+    "reservas_pendientes: reservas de un usuario por estado": lambda: (
+        consulta_pagina(*Reserva.consulta_gestion("pendiente", usuario_id=1), limite=50)
+    ),
+    "estadisticas_reservas: reservas por usuario y estado": lambda: (
+        Usuario.consulta_estadisticas_reservas((1, 2, 3))
+    ),
+    "expirar_reservas: reservas retenidas fuera de plazo": lambda: (
+        Reserva.consulta_retenciones_caducadas(_FECHA, 1000)
+    ),
+    "siguiente_en_cola: primera reserva pendiente de un libro": lambda: (
+        consulta_cola(1, 1)
+    ),
+    "posicion_en_cola: posición de una reserva en la cola de su libro": lambda: (
+        consulta_posicion(1)
+    ),
+    "confirmar_email: usuario por token": lambda: Usuario.consulta_por_token("token"),
+}
+
+
+def _plan_sqlite(connection, sql):
+    """
+    Devuelve las líneas del plan de SQLite y si alguna recorre una tabla completa.
+
+    'SCAN tabla' indica un recorrido completo (también 'SCAN ... USING
+    COVERING INDEX', que lee el índice entero); 'SEARCH' usa un índice. Se
+    ignora el recorrido de las subconsultas materializadas ('MATERIALIZE x'),
+    que ya son el resultado reducido de su propio plan.
+    """
+    lineas = [fila[-1] for fila in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+    materializadas = {
+        linea.split()[1] for linea in lineas if linea.startswith("MATERIALIZE ")
+    }
+    escaneo = any(
+        linea.startswith("SCAN") and linea.split()[1] not in materializadas
+        for linea in lineas
+    )
+    return lineas, escaneo
+
+
+def _plan_mysql(connection, sql):
+    """
+    Devuelve las líneas del plan de MySQL y si alguna recorre una tabla completa.
+
+    El tipo de acceso 'ALL' es un recorrido completo de la tabla e 'index' un
+    recorrido completo de un índice. Se ignoran las tablas derivadas
+    ('<derivedN>'), que son el resultado ya reducido de una subconsulta.
+    """
+    filas = connection.execute(text(f"EXPLAIN {sql}")).mappings().all()
+    lineas = [
+        f"{fila['table']}: type={fila['type']} key={fila['key']} rows={fila['rows']}"
+        for fila in filas
+    ]
+    escaneo = any(
+        fila["type"] in ("ALL", "index")
+        and not str(fila["table"]).startswith("<derived")
+        for fila in filas
+    )
+    return lineas, escaneo
+
+
+def _sembrar(connection, registros):
+    """
+    Inserta datos de ejemplo para que el planificador tenga estadísticas realistas.
+    """
+    # Los datos cubren un año hasta la fecha de referencia de las consultas
+    ahora = _FECHA
+    connection.execute(
+        Libro.__table__.insert(),
+        [
+            {
+                "id": numero,
+                "isbn": f"978{numero:010d}",
+                "titulo": f"Libro {numero}",
+                "autor": f"Autor {numero % 50}",
+                "editorial": f"Editorial {numero % 10}",
+                "genero": f"Género {numero % 5}",
+                "cantidad": numero % 3,
+            }
+            for numero in range(1, 501)
+        ],
+    )
+    connection.execute(
+        Usuario.__table__.insert(),
+        [
+            {
+                "id": numero,
+                "nombre": f"Usuario {numero}",
+                "email": f"usuario{numero}@ejemplo.com",
+                "_Usuario__contrasena_hash": "x",
+                "rol": "usuario",
+                "token_confirmacion": f"token{numero}" if numero % 10 == 0 else None,
+            }
+            for numero in range(1, registros // 10 + 2)
+        ],
+    )
+    connection.execute(
+        Prestamo.__table__.insert(),
+        [
+            {
+                "libro_id": numero % 500 + 1,
+                "usuario_id": numero % (registros // 10 + 1) + 1,
+                "fecha_prestamo": ahora - timedelta(days=numero % 365),
+                "fecha_devolucion": None if numero % 5 == 0 else ahora,
+                "estado": (
+                    ("vencido" if numero % 365 > 14 else "activo")
+                    if numero % 5 == 0
+                    else "devuelto"
+                ),
+            }
+            for numero in range(registros)
+        ],
+    )
+    connection.execute(
+        Reserva.__table__.insert(),
+        [
+            {
+                "libro_id": numero % 500 + 1,
+                "usuario_id": numero % (registros // 10 + 1) + 1,
+                "fecha_reserva": ahora - timedelta(hours=numero),
+                "estado": (
+                    "pendiente"
+                    if numero % 20 == 0
+                    else "retenida" if numero % 97 == 0 else "aprobada"
+                ),
+                "fecha_retencion": ahora if numero % 20 and numero % 97 == 0 else None,
+            }
+            for numero in range(registros // 2)
+        ],
+    )
+    connection.execute(text("ANALYZE"))
+
+
+def verificar_planes(base_temporal=False, registros=5000):
+    """
+    Obtiene el plan de cada consulta frecuente y marca los recorridos completos.
+
+    Args:
+        base_temporal (bool): Si es True, usa una base SQLite en memoria con el
+            esquema de los modelos y `registros` préstamos de ejemplo; si es
+            False, la base de datos configurada.
+        registros (int): Préstamos de ejemplo de la base temporal.
+
+    Returns:
+        list: Un diccionario por consulta con 'nombre', 'plan' (lista de
+        líneas) y 'escaneo_completo' (bool).
+
+    Raises:
+        ValueError: Si el motor de base de datos no está soportado.
+    """
+    if base_temporal:
+        motor = create_engine("sqlite://")
+    else:
+        motor = db.engine
+
+    dialecto = motor.dialect.name
+    if dialecto == "sqlite":
+        obtener_plan = _plan_sqlite
+    elif dialecto in ("mysql", "mariadb"):
+        obtener_plan = _plan_mysql
+    else:
+        raise ValueError(f"Motor de base de datos no soportado: {dialecto}")
+
+    resultados = []
+    with motor.connect() as connection:
+        if base_temporal:
+            db.metadata.create_all(connection)
+            _sembrar(connection, registros)
+        for nombre, consulta in CONSULTAS_FRECUENTES.items():
+            sql = str(
+                consulta().compile(
+                    dialect=motor.dialect, compile_kwargs={"literal_binds": True}
+                )
+            )
+            plan, escaneo = obtener_plan(connection, sql)
+            resultados.append(
+                {"nombre": nombre, "plan": plan, "escaneo_completo": escaneo}
+            )
+    if base_temporal:
+        motor.dispose()
+    return resultados
@@ -0,0 +1,602 @@
+"""
+Módulo de préstamos para la aplicación de gestión de biblioteca.
+
+Realiza los préstamos en una única transacción corta: bloquea la fila del
+usuario para comprobar su límite de préstamos, descuenta el ejemplar con un
+UPDATE condicional (`cantidad = cantidad - 1 ... AND cantidad > 0`) que nunca
+deja el stock en negativo aunque varios mostradores presten a la vez, y
+registra el préstamo. No hay lectura previa del libro en Python, así que dos
+peticiones simultáneas no pueden prestar el mismo último ejemplar.
+
+El mostrador por lotes (`prestar_lote` y `devolver_lote`) procesa una lista
+de códigos escaneados (ID o ISBN) en una sola transacción, con una consulta
+por paso para todo el lote, y devuelve el resultado de cada código.
+
+Las devoluciones apartan el ejemplar para la primera reserva en espera del
+libro (ver `services_reservas`) en lugar de reponerlo.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+from collections import Counter
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import bindparam, func, select, update
+from extensions import db
+from src.models.models_libro import Libro
+from src.models.models_prestamo import Prestamo
+from src.models.models_reserva import Reserva
+from src.models.models_usuario import Usuario
+from src.services.services_eventos import notificar_cambios
+from src.services.services_reservas import retener_para_cola
+from src.services.services_resumen import aplicar_deltas, sumar_contribucion
+
+_USUARIO_INEXISTENTE = "El usuario seleccionado no existe."
+_LIMITE_ALCANZADO = "El usuario ha alcanzado el límite de préstamos permitidos."
+_SIN_EJEMPLARES = "No hay ejemplares disponibles para préstamo."
+
+
+def _bloquear_usuario(usuario_id):
+    """
+    Bloquea la fila del usuario hasta el final de la transacción.
+
+    Serializa los préstamos simultáneos a un mismo usuario para que el
+    límite no pueda superarse; los de usuarios distintos no se esperan.
+
+    Raises:
+        ValueError: Si el usuario no existe.
+    """
+    existe = db.session.execute(
+        select(Usuario.id).where(Usuario.id == usuario_id).with_for_update()
+    ).scalar()
+    if existe is None:
+        raise ValueError(_USUARIO_INEXISTENTE)
+
+
+def _id_usuario(usuario_id):
+    """
+    Convierte a entero el ID de usuario recibido del formulario o de la API.
+
+    Raises:
+        ValueError: Si el ID no es un número entero.
+    """
+    try:
+        return int(usuario_id)
+    except (TypeError, ValueError):
+        raise ValueError(_USUARIO_INEXISTENTE) from None
+
+
+def consulta_prestamos_sin_devolver(usuario_id):
+    """
+    Construye la consulta que cuenta los préstamos sin devolver de un usuario.
+
+    Args:
+        usuario_id (int): ID del usuario.
+
+    Returns:
+        Select: Consulta con el número de préstamos.
+    """
+    return (
+        select(func.count())
+        .select_from(Prestamo)
+        .where(Prestamo.usuario_id == usuario_id, Prestamo.fecha_devolucion.is_(None))
+    )
+
+
+def _prestamos_sin_devolver(usuario_id):
+    """
+    Cuenta los préstamos sin devolver de un usuario.
+    """
+    return db.session.execute(consulta_prestamos_sin_devolver(usuario_id)).scalar()
+
+
+def _comprobar_limite(usuario_id, limite):
+    """
+    Comprueba que el usuario no haya alcanzado su límite de préstamos sin devolver.
+
+    Raises:
+        ValueError: Si el usuario ha alcanzado el límite.
+    """
+    if _prestamos_sin_devolver(usuario_id) >= limite:
+        raise ValueError(_LIMITE_ALCANZADO)
+
+
+def _descontar_ejemplar(libro_id):
+    """
+    Descuenta un ejemplar del libro con un UPDATE condicional.
+
+    Returns:
+        dict: Columnas del libro tras el descuento.
+
+    Raises:
+        ValueError: Si no quedaba ningún ejemplar disponible.
+    """
+    resultado = db.session.execute(
+        update(Libro)
+        .where(Libro.id == libro_id, Libro.cantidad > 0)
+        .values(cantidad=Libro.cantidad - 1)
+        .execution_options(synchronize_session=False)
+    )
+    if resultado.rowcount != 1:
+        raise ValueError(_SIN_EJEMPLARES)
+    # La fila ya está bloqueada por el UPDATE: esta lectura no espera a nadie
+    return dict(
+        db.session.execute(select(*Libro.__table__.c).where(Libro.id == libro_id))
+        .mappings()
+        .one()
+    )
+
+
+def _consumir_retencion(reserva_id, libro_id, usuario_id):
+    """
+    Pasa a 'aprobada' la reserva retenida cuyo ejemplar apartado se presta.
+
+    Returns:
+        dict: Columnas del libro, bloqueado hasta el final de la transacción.
+
+    Raises:
+        ValueError: Si la reserva no está retenida para ese libro y usuario.
+    """
+    resultado = db.session.execute(
+        update(Reserva)
+        .where(
+            Reserva.id == reserva_id,
+            Reserva.libro_id == libro_id,
+            Reserva.usuario_id == usuario_id,
+            Reserva.estado == "retenida",
+        )
+        .values(estado="aprobada")
+        .execution_options(synchronize_session=False)
+    )
+    if resultado.rowcount != 1:
+        raise ValueError("La reserva no tiene ningún ejemplar apartado.")
+    return dict(
+        db.session.execute(
+            select(*Libro.__table__.c).where(Libro.id == libro_id).with_for_update()
+        )
+        .mappings()
+        .one()
+    )
+
+
+def realizar_prestamo(libro_id, usuario_id, limite=None, reserva_id=None):
+    """
+    Presta un ejemplar de un libro a un usuario de forma atómica.
+
+    Todo ocurre en una transacción: si el usuario ha alcanzado su límite o no
+    quedan ejemplares, no se modifica nada. Con `reserva_id` se presta el
+    ejemplar apartado para esa reserva retenida, que ya no contaba entre los
+    disponibles, y la reserva pasa a 'aprobada'.
+
+    Args:
+        libro_id (int): ID del libro.
+        usuario_id (int): ID del usuario que se lleva el libro.
+        limite (int, opcional): Préstamos sin devolver permitidos por usuario
+            (por defecto PRESTAMOS_LIMITE_USUARIO).
+        reserva_id (int, opcional): ID de la reserva retenida del usuario.
+
+    Returns:
+        int: ID del préstamo creado.
+
+    Raises:
+        ValueError: Si el usuario no existe, ha alcanzado su límite, no hay
+        ejemplares disponibles o la reserva no está retenida.
+    """
+    limite = limite or current_app.config["PRESTAMOS_LIMITE_USUARIO"]
+    usuario_id = _id_usuario(usuario_id)
+    try:
+        _bloquear_usuario(usuario_id)
+        _comprobar_limite(usuario_id, limite)
+        if reserva_id:
+            libro = _consumir_retencion(reserva_id, libro_id, usuario_id)
+        else:
+            libro = _descontar_ejemplar(libro_id)
+
+        prestamo = {
+            "libro_id": libro_id,
+            "usuario_id": usuario_id,
+            "fecha_prestamo": datetime.now(timezone.utc),
+            "fecha_devolucion": None,
+            "estado": "activo",
+        }
+        connection = db.session.connection()
+        prestamo["id"] = connection.execute(
+            Prestamo.__table__.insert(), prestamo
+        ).inserted_primary_key[0]
+
+        # Las sentencias directas no pasan por los eventos del ORM: se aplican
+        # aquí los contadores del catálogo y se declaran los cambios.
+        deltas = {}
+        sumar_contribucion(
+            deltas, libro, disponibles=0 if reserva_id else -1, prestados=1
+        )
+        aplicar_deltas(connection, deltas)
+        if not reserva_id:
+            notificar_cambios(
+                db.session,
+                Libro,
+                [("update", {**libro, "cantidad": libro["cantidad"] + 1}, libro)],
+            )
+        notificar_cambios(db.session, Prestamo, [("insert", None, prestamo)])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return prestamo["id"]
+
+
+def devolver_prestamo(prestamo_id):
+    """
+    Registra la devolución de un préstamo de forma atómica.
+
+    El préstamo se cierra con un UPDATE condicional (`... AND
+    fecha_devolucion IS NULL`), así que dos devoluciones simultáneas del
+    mismo préstamo no reponen el ejemplar dos veces. El ejemplar se aparta
+    para la primera reserva en espera del libro o, si no hay ninguna, se
+    suma a la cantidad con `cantidad = cantidad + 1`, sin pisar los
+    descuentos de los préstamos que se hagan a la vez.
+
+    Args:
+        prestamo_id (int): ID del préstamo.
+
+    Raises:
+        ValueError: Si el préstamo no existe o ya ha sido devuelto.
+    """
+    try:
+        prestamo = (
+            db.session.execute(
+                select(*Prestamo.__table__.c).where(Prestamo.id == prestamo_id)
+            )
+            .mappings()
+            .first()
+        )
+        if prestamo is None:
+            raise ValueError("El préstamo no existe.")
+        prestamo = dict(prestamo)
+        # El libro se bloquea antes que el préstamo, en el mismo orden que `devolver_lote`
+        libro = (
+            db.session.execute(
+                select(*Libro.__table__.c)
+                .where(Libro.id == prestamo["libro_id"])
+                .with_for_update()
+            )
+            .mappings()
+            .first()
+        )
+
+        ahora = datetime.now(timezone.utc)
+        resultado = db.session.execute(
+            update(Prestamo)
+            .where(Prestamo.id == prestamo_id, Prestamo.fecha_devolucion.is_(None))
+            .values(fecha_devolucion=ahora, estado="devuelto")
+            .execution_options(synchronize_session=False)
+        )
+        if resultado.rowcount != 1:
+            raise ValueError("El préstamo ya ha sido devuelto.")
+
+        # Las sentencias directas no pasan por los eventos del ORM: se aplican
+        # aquí los contadores del catálogo y se declaran los cambios.
+        connection = db.session.connection()
+        if libro is not None:
+            libro = dict(libro)
+            repuesto = 0 if retener_para_cola([libro["id"]], ahora) else 1
+            if repuesto:
+                connection.execute(
+                    update(Libro.__table__)
+                    .where(Libro.__table__.c.id == libro["id"])
+                    .values(cantidad=Libro.__table__.c.cantidad + 1)
+                )
+                notificar_cambios(
+                    db.session,
+                    Libro,
+                    [("update", libro, {**libro, "cantidad": libro["cantidad"] + 1})],
+                )
+            deltas = {}
+            sumar_contribucion(deltas, libro, disponibles=repuesto, prestados=-1)
+            aplicar_deltas(connection, deltas)
+        notificar_cambios(
+            db.session,
+            Prestamo,
+            [
+                (
+                    "update",
+                    prestamo,
+                    {**prestamo, "fecha_devolucion": ahora, "estado": "devuelto"},
+                )
+            ],
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def _resultado(codigo, libro=None, mensaje=None):
+    """
+    Crea el resultado de un código del lote: correcto si no hay mensaje de error.
+    """
+    return {
+        "codigo": codigo,
+        "libro_id": libro["id"] if libro else None,
+        "titulo": libro["titulo"] if libro else None,
+        "correcto": mensaje is None,
+        "mensaje": mensaje,
+    }
+
+
+def _resolver_libros(codigos, repetidos=False):
+    """
+    Localiza y bloquea los libros de una lista de códigos con una sola consulta.
+
+    Cada código se busca como ISBN (sin guiones) y, si es numérico, también
+    como ID; si coincide con ambos, prevalece el ISBN. Los libros se bloquean
+    en orden de ID para que dos lotes simultáneos no se bloqueen mutuamente.
+
+    Args:
+        codigos (list): IDs o ISBN de los libros, en el orden escaneado.
+        repetidos (bool): Si es True, un libro puede aparecer varias veces
+            (un escaneo por ejemplar); si no, se rechazan los repetidos.
+
+    Returns:
+        tuple: Lista de tuplas (posicion, codigo, libro) de los libros
+        encontrados, en el orden recibido, y lista de resultados (uno por
+        código) con los de los códigos inexistentes o repetidos ya rellenos
+        y None en el resto.
+    """
+    limpios = [Libro._limpiar_isbn(codigo) for codigo in codigos]
+    ids = {int(limpio) for limpio in limpios if limpio.isdigit() and len(limpio) < 19}
+    filas = (
+        db.session.execute(
+            select(*Libro.__table__.c)
+            .where(Libro.isbn.in_(set(limpios)) | Libro.id.in_(ids))
+            .order_by(Libro.id)
+            .with_for_update()
+        )
+        .mappings()
+        .all()
+    )
+    por_isbn = {fila["isbn"]: dict(fila) for fila in filas}
+    por_id = {libro["id"]: libro for libro in por_isbn.values()}
+
+    encontrados = []
+    resultados = [None] * len(codigos)
+    vistos = set()
+    for posicion, (codigo, limpio) in enumerate(zip(codigos, limpios)):
+        libro = por_isbn.get(limpio)
+        if libro is None and limpio.isdigit():
+            libro = por_id.get(int(limpio))
+        if libro is None:
+            resultados[posicion] = _resultado(codigo, mensaje="Libro no encontrado.")
+        elif libro["id"] in vistos and not repetidos:
+            resultados[posicion] = _resultado(codigo, libro, "Libro repetido en el lote.")
+        else:
+            vistos.add(libro["id"])
+            encontrados.append((posicion, codigo, libro))
+    return encontrados, resultados
+
+
+def _limpiar_codigos(codigos):
+    """
+    Quita espacios y códigos vacíos y comprueba el tamaño del lote.
+
+    Raises:
+        ValueError: Si no hay códigos o hay más de MOSTRADOR_MAX_CODIGOS.
+    """
+    codigos = [str(codigo).strip() for codigo in codigos if str(codigo).strip()]
+    if not codigos:
+        raise ValueError("No se indicó ningún libro.")
+    maximo = current_app.config["MOSTRADOR_MAX_CODIGOS"]
+    if len(codigos) > maximo:
+        raise ValueError(f"Se pueden procesar como máximo {maximo} libros a la vez.")
+    return codigos
+
+
+def prestar_lote(usuario_id, codigos, limite=None):
+    """
+    Presta a un usuario los libros de una lista de códigos en una transacción.
+
+    Cada libro se presta si le quedan ejemplares y el usuario no ha llegado a
+    su límite; los demás códigos se rechazan sin afectar al resto. Los
+    ejemplares se descuentan y los préstamos se insertan con una sentencia
+    para todo el lote.
+
+    Args:
+        usuario_id (int): ID del usuario.
+        codigos (list): IDs o ISBN de los libros, en el orden escaneado.
+        limite (int, opcional): Préstamos sin devolver permitidos por usuario
+            (por defecto PRESTAMOS_LIMITE_USUARIO).
+
+    Returns:
+        list: Un resultado por código, con las claves 'codigo', 'libro_id',
+        'titulo', 'correcto' y 'mensaje' (None si es correcto).
+
+    Raises:
+        ValueError: Si el usuario no existe o la lista de códigos no es válida.
+    """
+    codigos = _limpiar_codigos(codigos)
+    limite = limite or current_app.config["PRESTAMOS_LIMITE_USUARIO"]
+    usuario_id = _id_usuario(usuario_id)
+    try:
+        _bloquear_usuario(usuario_id)
+        cupo = limite - _prestamos_sin_devolver(usuario_id)
+        encontrados, resultados = _resolver_libros(codigos)
+
+        prestados = []
+        for posicion, codigo, libro in encontrados:
+            if libro["cantidad"] <= 0:
+                resultados[posicion] = _resultado(codigo, libro, _SIN_EJEMPLARES)
+            elif len(prestados) >= cupo:
+                resultados[posicion] = _resultado(codigo, libro, _LIMITE_ALCANZADO)
+            else:
+                prestados.append(libro)
+                resultados[posicion] = _resultado(codigo, libro)
+
+        if prestados:
+            connection = db.session.connection()
+            tabla = Libro.__table__
+            # Las filas están bloqueadas: la cantidad leída es la actual
+            connection.execute(
+                tabla.update()
+                .where(tabla.c.id == bindparam("libro_id"))
+                .values(cantidad=tabla.c.cantidad - 1),
+                [{"libro_id": libro["id"]} for libro in prestados],
+            )
+            ahora = datetime.now(timezone.utc)
+            prestamos = [
+                {
+                    "libro_id": libro["id"],
+                    "usuario_id": usuario_id,
+                    "fecha_prestamo": ahora,
+                    "fecha_devolucion": None,
+                    "estado": "activo",
+                }
+                for libro in prestados
+            ]
+            connection.execute(Prestamo.__table__.insert(), prestamos)
+
+            deltas = {}
+            cambios = []
+            for libro in prestados:
+                sumar_contribucion(deltas, libro, disponibles=-1, prestados=1)
+                cambios.append(
+                    ("update", libro, {**libro, "cantidad": libro["cantidad"] - 1})
+                )
+            aplicar_deltas(connection, deltas)
+            notificar_cambios(db.session, Libro, cambios)
+            notificar_cambios(
+                db.session,
+                Prestamo,
+                [("insert", None, prestamo) for prestamo in prestamos],
+            )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return resultados
+
+
+def devolver_lote(codigos, usuario_id=None):
+    """
+    Registra la devolución de los libros de una lista de códigos en una transacción.
+
+    Cada código cierra un préstamo sin devolver de su libro (del usuario
+    indicado, si lo hay), del más antiguo al más reciente: un libro puede
+    escanearse tantas veces como ejemplares tenga prestados, como ocurre al
+    vaciar un buzón de devoluciones. Los préstamos se cierran y los
+    ejemplares se reponen con una sentencia para todo el lote.
+
+    Args:
+        codigos (list): IDs o ISBN de los libros, en el orden escaneado.
+        usuario_id (int, opcional): Limita las devoluciones a los préstamos
+            de este usuario (por ejemplo, en el mostrador). Sin usuario, como
+            en un buzón de devoluciones, se cierra el préstamo más antiguo.
+
+    Returns:
+        list: Un resultado por código (ver `prestar_lote`).
+
+    Raises:
+        ValueError: Si el usuario no es válido o la lista de códigos no es válida.
+    """
+    codigos = _limpiar_codigos(codigos)
+    usuario_id = _id_usuario(usuario_id) if usuario_id else None
+    try:
+        encontrados, resultados = _resolver_libros(codigos, repetidos=True)
+        abiertos = {}
+        if encontrados:
+            consulta = (
+                select(*Prestamo.__table__.c)
+                .where(
+                    Prestamo.libro_id.in_([libro["id"] for _, _, libro in encontrados]),
+                    Prestamo.fecha_devolucion.is_(None),
+                )
+                .order_by(Prestamo.fecha_prestamo, Prestamo.id)
+                .with_for_update()
+            )
+            if usuario_id:
+                consulta = consulta.where(Prestamo.usuario_id == usuario_id)
+            # Préstamos sin devolver de cada libro, del más antiguo al más reciente
+            for prestamo in db.session.execute(consulta).mappings():
+                abiertos.setdefault(prestamo["libro_id"], []).append(dict(prestamo))
+
+        devueltos = []
+        for posicion, codigo, libro in encontrados:
+            pendientes = abiertos.get(libro["id"])
+            prestamo = pendientes.pop(0) if pendientes else None
+            if prestamo is None:
+                resultados[posicion] = _resultado(
+                    codigo, libro, "El libro no está prestado actualmente."
+                )
+            else:
+                devueltos.append((libro, prestamo))
+                resultados[posicion] = _resultado(codigo, libro)
+
+        if devueltos:
+            connection = db.session.connection()
+            ahora = datetime.now(timezone.utc)
+            tabla_prestamo = Prestamo.__table__
+            connection.execute(
+                update(tabla_prestamo)
+                .where(
+                    tabla_prestamo.c.id.in_([p["id"] for _, p in devueltos]),
+                    tabla_prestamo.c.fecha_devolucion.is_(None),
+                )
+                .values(fecha_devolucion=ahora, estado="devuelto")
+            )
+            # Los ejemplares de libros con reservas en espera quedan apartados
+            ejemplares = Counter(libro["id"] for libro, _ in devueltos)
+            libros = {libro["id"]: libro for libro, _ in devueltos}
+            repuestos = ejemplares - retener_para_cola(list(ejemplares.elements()), ahora)
+            if repuestos:
+                tabla_libro = Libro.__table__
+                connection.execute(
+                    tabla_libro.update()
+                    .where(tabla_libro.c.id == bindparam("libro_id"))
+                    .values(cantidad=tabla_libro.c.cantidad + bindparam("incremento")),
+                    [
+                        {"libro_id": libro_id, "incremento": incremento}
+                        for libro_id, incremento in repuestos.items()
+                    ],
+                )
+
+            deltas = {}
+            for libro_id, devueltos_libro in ejemplares.items():
+                sumar_contribucion(
+                    deltas,
+                    libros[libro_id],
+                    disponibles=repuestos[libro_id],
+                    prestados=-devueltos_libro,
+                )
+            aplicar_deltas(connection, deltas)
+            notificar_cambios(
+                db.session,
+                Libro,
+                [
+                    (
+                        "update",
+                        libros[libro_id],
+                        {
+                            **libros[libro_id],
+                            "cantidad": libros[libro_id]["cantidad"] + incremento,
+                        },
+                    )
+                    for libro_id, incremento in repuestos.items()
+                ],
+            )
+            notificar_cambios(
+                db.session,
+                Prestamo,
+                [
+                    (
+                        "update",
+                        prestamo,
+                        {**prestamo, "fecha_devolucion": ahora, "estado": "devuelto"},
+                    )
+                    for _, prestamo in devueltos
+                ],
+            )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return resultados
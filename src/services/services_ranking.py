@@ -0,0 +1,128 @@
+"""
+Módulo del ranking de libros más prestados para la aplicación de biblioteca.
+
+Calcula los N libros más prestados de un periodo (últimos 7, 30 o 365 días, o
+todo el historial) con una única consulta: los préstamos se agregan por
+`libro_id` (el índice (fecha_prestamo, libro_id) cubre los periodos), se
+limitan a los N primeros y solo esas filas se unen con `libro` para obtener
+título y autor.
+
+Cada ranking se guarda en caché durante RANKING_TTL segundos, de modo que la
+página de historial no recorre la tabla de préstamos en cada visita; la
+caché se vacía además cuando se confirma un cambio de título o autor, o el
+borrado de un libro.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import func, select
+from extensions import db
+from src.models.models_libro import Libro
+from src.models.models_prestamo import Prestamo
+from src.services.services_cache import CacheLocal
+from src.services.services_eventos import cambios_confirmados
+
+# Periodos del ranking: nombre y días hacia atrás (None = todo el historial)
+VENTANAS = {"7": 7, "30": 30, "365": 365, "total": None}
+
+_cache_ranking = CacheLocal()
+
+
+def consulta_ranking(dias, limite, ahora=None):
+    """
+    Construye la consulta de los `limite` libros más prestados de los últimos `dias` días.
+
+    Args:
+        dias (int): Días hacia atrás, o None para todo el historial.
+        limite (int): Número de libros.
+        ahora (datetime, opcional): Momento de referencia.
+
+    Returns:
+        Select: Filas (id, titulo, autor, total_prestamos), de mayor a menor
+        número de préstamos.
+    """
+    totales = select(
+        Prestamo.libro_id, func.count().label("total_prestamos")
+    ).where(Prestamo.libro_id.isnot(None))
+    if dias is not None:
+        totales = totales.where(
+            Prestamo.fecha_prestamo
+            >= (ahora or datetime.now(timezone.utc)) - timedelta(days=dias)
+        )
+    totales = (
+        totales.group_by(Prestamo.libro_id)
+        .order_by(func.count().desc(), Prestamo.libro_id)
+        .limit(limite)
+        .subquery()
+    )
+    return (
+        select(
+            Libro.id,
+            Libro.titulo,
+            Libro.autor,
+            totales.c.total_prestamos,
+        )
+        .join(totales, totales.c.libro_id == Libro.id)
+        .order_by(totales.c.total_prestamos.desc(), Libro.id)
+    )
+
+
+def _calcular_ranking(dias, limite):
+    """
+    Consulta los `limite` libros más prestados de los últimos `dias` días.
+    """
+    filas = db.session.execute(consulta_ranking(dias, limite)).all()
+    return [
+        {
+            "id": fila.id,
+            "titulo": fila.titulo,
+            "autor": fila.autor,
+            "total_prestamos": fila.total_prestamos,
+        }
+        for fila in filas
+    ]
+
+
+def libros_mas_prestados(ventana="total", limite=None):
+    """
+    Devuelve los libros más prestados de un periodo, con título y autor.
+
+    Args:
+        ventana (str): '7', '30' o '365' (últimos días) o 'total'.
+        limite (int, opcional): Número de libros (por defecto RANKING_LIMITE).
+
+    Returns:
+        list: Diccionarios con 'id', 'titulo', 'autor' y 'total_prestamos',
+        de mayor a menor número de préstamos.
+
+    Raises:
+        ValueError: Si la ventana no es válida.
+    """
+    if ventana not in VENTANAS:
+        raise ValueError(f"Periodo no válido: {ventana}")
+    limite = limite or current_app.config["RANKING_LIMITE"]
+    return _cache_ranking.obtener(
+        (ventana, limite),
+        lambda: _calcular_ranking(VENTANAS[ventana], limite),
+        ttl=current_app.config["RANKING_TTL"],
+    )
+
+
+@cambios_confirmados.connect_via(Libro)
+def _invalidar_ranking(modelo, cambios):
+    """
+    Vacía la caché si cambia el título o el autor de un libro, o si se borra.
+
+    Las altas no afectan al ranking hasta que el libro se presta, y los
+    préstamos nuevos se recogen al expirar la entrada (RANKING_TTL).
+    """
+    for operacion, antes, despues in cambios:
+        if operacion == "delete" or (
+            operacion == "update"
+            and (antes["titulo"], antes["autor"]) != (despues["titulo"], despues["autor"])
+        ):
+            _cache_ranking.invalidar()
+            return
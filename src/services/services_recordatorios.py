@@ -0,0 +1,287 @@
+"""
+Módulo de recordatorios de préstamos por correo para la aplicación de biblioteca.
+
+Envía en una campaña (`flask enviar-recordatorios`) el recordatorio de todos
+los préstamos activos que vencen en los próximos RECORDATORIOS_DIAS_ANTELACION
+días. Los préstamos se leen por bloques en una sola consulta con su usuario y
+su libro, los mensajes de cada bloque se generan con la plantilla ya
+compilada y se envían por una única conexión SMTP reutilizada
+(`mail.connect()`), con un límite de envíos por segundo y reintentos que
+reabren la conexión si el servidor la corta. La fecha de envío se guarda en
+`Prestamo.fecha_recordatorio`, de modo que cada préstamo recibe un solo
+recordatorio aunque la campaña se repita o se interrumpa.
+
+Para probarlo sin enviar correos reales basta con apuntar MAIL_SERVER y
+MAIL_PORT a un servidor SMTP local de pruebas (por ejemplo,
+`python -m aiosmtpd -n -l localhost:1025`) o activar MAIL_SUPPRESS_SEND.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import logging
+import smtplib
+import time
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import joinedload
+from extensions import db, mail
+from src.models.models_prestamo import Prestamo
+
+# Errores SMTP tras los que no tiene sentido reintentar el mismo mensaje
+_ERRORES_PERMANENTES = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+)
+
+
+def _condiciones_pendientes(ahora):
+    """
+    Devuelve las condiciones de los préstamos que deben recibir recordatorio.
+
+    Un préstamo activo vence PRESTAMOS_DIAS días después de prestarse; se
+    avisa cuando faltan RECORDATORIOS_DIAS_ANTELACION días o menos.
+    """
+    dias = (
+        current_app.config["PRESTAMOS_DIAS"]
+        - current_app.config["RECORDATORIOS_DIAS_ANTELACION"]
+    )
+    return (
+        Prestamo.estado == "activo",
+        Prestamo.fecha_prestamo <= ahora - timedelta(days=dias),
+        Prestamo.fecha_devolucion.is_(None),
+        Prestamo.fecha_recordatorio.is_(None),
+        Prestamo.usuario_id.isnot(None),
+        Prestamo.libro_id.isnot(None),
+    )
+
+
+def consulta_recordatorios(ahora, tamano_lote, ultimo=None):
+    """
+    Construye la consulta de un bloque de préstamos pendientes de recordatorio.
+
+    Args:
+        ahora (datetime): Momento de referencia.
+        tamano_lote (int): Préstamos por bloque.
+        ultimo (tuple, opcional): (fecha_prestamo, id) del último préstamo
+            del bloque anterior.
+
+    Returns:
+        Select: Consulta de Prestamo con su usuario y su libro.
+    """
+    consulta = (
+        select(Prestamo)
+        .options(joinedload(Prestamo.usuario), joinedload(Prestamo.libro))
+        .where(*_condiciones_pendientes(ahora))
+        .order_by(Prestamo.fecha_prestamo, Prestamo.id)
+        .limit(tamano_lote)
+    )
+    if ultimo is not None:
+        consulta = consulta.where(
+            or_(
+                Prestamo.fecha_prestamo > ultimo[0],
+                and_(Prestamo.fecha_prestamo == ultimo[0], Prestamo.id > ultimo[1]),
+            )
+        )
+    return consulta
+
+
+def _bloques_pendientes(ahora, tamano_lote):
+    """
+    Genera bloques de préstamos pendientes de recordatorio, con usuario y libro.
+
+    Se avanza por (fecha_prestamo, id) para no repetir los préstamos cuyo
+    envío haya fallado en este bloque.
+    """
+    ultimo = None
+    while True:
+        prestamos = (
+            db.session.execute(consulta_recordatorios(ahora, tamano_lote, ultimo))
+            .scalars()
+            .all()
+        )
+        if not prestamos:
+            return
+        yield prestamos
+        if len(prestamos) < tamano_lote:
+            return
+        ultimo = (prestamos[-1].fecha_prestamo, prestamos[-1].id)
+
+
+def _crear_mensajes(prestamos, plantilla):
+    """
+    Genera los mensajes de recordatorio de un bloque de préstamos.
+
+    Returns:
+        list: Tuplas (ID del préstamo, Message).
+    """
+    dias = current_app.config["PRESTAMOS_DIAS"]
+    remitente = current_app.config["MAIL_DEFAULT_SENDER"]
+    mensajes = []
+    for prestamo in prestamos:
+        datos = {
+            "nombre": prestamo.usuario.nombre,
+            "titulo": prestamo.libro.titulo,
+            "fecha_vencimiento": prestamo.calcular_fecha_vencimiento(dias).strftime(
+                "%Y-%m-%d"
+            ),
+        }
+        mensaje = Message(
+            subject="Recordatorio de Préstamo",
+            recipients=[prestamo.usuario.email],
+            sender=remitente,
+        )
+        mensaje.body = (
+            f"Hola {datos['nombre']}, recuerda que el préstamo del libro "
+            f"'{datos['titulo']}' vence el {datos['fecha_vencimiento']}."
+        )
+        mensaje.html = plantilla.render(**datos)
+        mensajes.append((prestamo.id, mensaje))
+    return mensajes
+
+
+def _abrir_conexion():
+    """
+    Abre una conexión SMTP reutilizable de Flask-Mail.
+    """
+    conexion = mail.connect()
+    conexion.__enter__()
+    return conexion
+
+
+def _cerrar_conexion(conexion):
+    """
+    Cierra la conexión SMTP sin propagar errores de un servidor ya desconectado.
+    """
+    try:
+        conexion.__exit__(None, None, None)
+    except (smtplib.SMTPException, OSError):
+        pass
+
+
+class _Envio:
+    """
+    Envía mensajes por una conexión SMTP compartida con límite de ritmo y reintentos.
+
+    Atributos:
+        conexion (Connection): Conexión abierta, o None hasta el primer envío.
+        intervalo (float): Segundos mínimos entre dos envíos (0 sin límite).
+        reintentos (int): Reintentos de cada mensaje tras un error temporal.
+        espera (float): Segundos de espera antes del primer reintento (se
+            duplica en cada uno).
+    """
+
+    def __init__(self, por_segundo, reintentos, espera):
+        self.conexion = None
+        self.intervalo = 1 / por_segundo if por_segundo else 0
+        self.reintentos = reintentos
+        self.espera = espera
+        self._siguiente = time.monotonic()
+
+    def _esperar_turno(self):
+        ahora = time.monotonic()
+        if self._siguiente > ahora:
+            time.sleep(self._siguiente - ahora)
+        self._siguiente = max(self._siguiente, ahora) + self.intervalo
+
+    def enviar(self, mensaje):
+        """
+        Envía un mensaje, reabriendo la conexión y reintentando si falla.
+
+        Returns:
+            bool: True si se envió, False si se agotaron los reintentos o el
+            servidor lo rechazó.
+        """
+        for intento in range(self.reintentos + 1):
+            self._esperar_turno()
+            try:
+                if self.conexion is None:
+                    self.conexion = _abrir_conexion()
+                self.conexion.send(mensaje)
+                return True
+            except _ERRORES_PERMANENTES as e:
+                logging.error(f"Recordatorio rechazado para {mensaje.recipients}: {e}")
+                return False
+            except (smtplib.SMTPException, OSError) as e:
+                logging.warning(
+                    f"Error SMTP al enviar a {mensaje.recipients} "
+                    f"(intento {intento + 1}): {e}"
+                )
+                self.cerrar()
+                if intento < self.reintentos:
+                    time.sleep(self.espera * 2**intento)
+        return False
+
+    def cerrar(self):
+        """
+        Cierra la conexión actual, si la hay.
+        """
+        if self.conexion is not None:
+            _cerrar_conexion(self.conexion)
+            self.conexion = None
+
+
+def _registrar_enviados(ids, fecha):
+    """
+    Guarda la fecha de envío de los recordatorios enviados y confirma el bloque.
+    """
+    if ids:
+        db.session.execute(
+            update(Prestamo)
+            .where(Prestamo.id.in_(ids))
+            .values(fecha_recordatorio=fecha)
+            .execution_options(synchronize_session=False)
+        )
+    db.session.commit()
+
+
+def enviar_recordatorios(tamano_lote=None, maximo=None, ahora=None):
+    """
+    Envía el recordatorio de los préstamos que vencen pronto y aún no lo recibieron.
+
+    Args:
+        tamano_lote (int, opcional): Préstamos leídos y registrados por bloque
+            (por defecto RECORDATORIOS_TAMANO_LOTE).
+        maximo (int, opcional): Número máximo de recordatorios de esta ejecución.
+        ahora (datetime, opcional): Momento de referencia.
+
+    Returns:
+        dict: Recordatorios 'enviados' y 'fallidos'.
+    """
+    configuracion = current_app.config
+    tamano_lote = tamano_lote or configuracion["RECORDATORIOS_TAMANO_LOTE"]
+    ahora = ahora or datetime.now(timezone.utc)
+    plantilla = current_app.jinja_env.get_template("emails/recordatorio_prestamo.html")
+    envio = _Envio(
+        configuracion["RECORDATORIOS_POR_SEGUNDO"],
+        configuracion["RECORDATORIOS_REINTENTOS"],
+        configuracion["RECORDATORIOS_ESPERA_REINTENTO"],
+    )
+    resumen = {"enviados": 0, "fallidos": 0}
+    try:
+        for prestamos in _bloques_pendientes(ahora, tamano_lote):
+            if maximo is not None:
+                prestamos = prestamos[: maximo - resumen["enviados"] - resumen["fallidos"]]
+            enviados = []
+            try:
+                for prestamo_id, mensaje in _crear_mensajes(prestamos, plantilla):
+                    if envio.enviar(mensaje):
+                        enviados.append(prestamo_id)
+                    else:
+                        resumen["fallidos"] += 1
+            finally:
+                # Lo enviado se registra aunque el bloque se interrumpa
+                _registrar_enviados(enviados, datetime.now(timezone.utc))
+                resumen["enviados"] += len(enviados)
+            logging.info(
+                f"Recordatorios: {resumen['enviados']} enviados, "
+                f"{resumen['fallidos']} fallidos."
+            )
+            if maximo is not None and resumen["enviados"] + resumen["fallidos"] >= maximo:
+                break
+    finally:
+        envio.cerrar()
+    return resumen
@@ -0,0 +1,570 @@
+"""
+Módulo de la cola de espera de reservas para la aplicación de biblioteca.
+
+Las reservas pendientes de cada libro forman una cola por orden de llegada
+(fecha_reserva, id), que se recorre con el índice (libro_id, estado,
+fecha_reserva): la primera de la cola y la posición de cada reserva se
+obtienen con búsquedas en ese índice, sin cargar la cola.
+
+Al devolverse un ejemplar, `retener_para_cola` pasa la primera reserva
+pendiente del libro a 'retenida' en la misma transacción que la devolución:
+el ejemplar queda apartado para ese usuario (no vuelve a `Libro.cantidad`)
+hasta que el bibliotecario se lo presta desde la reserva.
+
+Las reservas pendientes esperan en la cola sin plazo; las retenidas cuyo
+ejemplar no se recoge en RESERVAS_DIAS_EXPIRACION días se rechazan por
+bloques con `Reserva.expirar_reservas` (que `flask expirar-reservas
+--continuo` ejecuta periódicamente), y `liberar_ejemplares` pasa cada
+ejemplar a la siguiente reserva de la cola o lo devuelve a los disponibles.
+
+`procesar_reservas` aprueba (prestando el libro) o rechaza de una vez una
+lista de reservas en una transacción: reservas, libros y usuarios se leen y
+bloquean con una consulta cada uno, y los préstamos, ejemplares y estados se
+escriben con una sentencia por tabla para todo el lote.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import and_, bindparam, func, or_, select, update
+from sqlalchemy.orm import aliased
+from extensions import db
+from src.models.models_libro import Libro
+from src.models.models_prestamo import Prestamo
+from src.models.models_reserva import ESTADOS_GESTION, Reserva
+from src.models.models_usuario import Usuario
+from src.services.services_eventos import notificar_cambios
+from src.services.services_resumen import aplicar_deltas, sumar_contribucion
+
+# Acciones de la gestión de reservas por lotes
+ACCIONES_RESERVA = ("aprobar", "rechazar")
+
+
+def _cola(libro_id):
+    """
+    Condiciones de las reservas que esperan en la cola de un libro.
+    """
+    return (Reserva.libro_id == libro_id, Reserva.estado == "pendiente")
+
+
+def consulta_cola(libro_id, limite, *columnas):
+    """
+    Construye la consulta de las primeras reservas de la cola de un libro.
+
+    Args:
+        libro_id (int): ID del libro.
+        limite (int): Número de reservas.
+        *columnas: Columnas que se leen (por defecto, la reserva completa).
+
+    Returns:
+        Select: Consulta por orden de llegada.
+    """
+    return (
+        select(*(columnas or (Reserva,)))
+        .where(*_cola(libro_id))
+        .order_by(Reserva.fecha_reserva, Reserva.id)
+        .limit(limite)
+    )
+
+
+def siguiente_en_cola(libro_id):
+    """
+    Devuelve la primera reserva pendiente de un libro.
+
+    Args:
+        libro_id (int): ID del libro.
+
+    Returns:
+        Reserva: La reserva más antigua de la cola, o None si está vacía.
+    """
+    return db.session.execute(consulta_cola(libro_id, 1)).scalar()
+
+
+def retener_para_cola(libro_ids, ahora=None):
+    """
+    Aparta los ejemplares devueltos para las primeras reservas de sus colas.
+
+    Se ejecuta dentro de la transacción de la devolución, que la confirma:
+    cada libro retiene tantas reservas como ejemplares se devuelven, las
+    primeras de su cola, bloqueadas hasta el final de la transacción para que
+    dos devoluciones simultáneas no retengan la misma.
+
+    Args:
+        libro_ids (list): IDs de los libros devueltos (uno por ejemplar).
+        ahora (datetime, opcional): Fecha de la retención.
+
+    Returns:
+        Counter: Ejemplares retenidos por ID de libro; los demás ejemplares
+        devueltos vuelven a estar disponibles.
+    """
+    ahora = ahora or datetime.now(timezone.utc)
+    retenidos = Counter()
+    for libro_id, ejemplares in Counter(libro_ids).items():
+        ids = (
+            db.session.execute(
+                consulta_cola(libro_id, ejemplares, Reserva.id).with_for_update()
+            )
+            .scalars()
+            .all()
+        )
+        if ids:
+            resultado = db.session.execute(
+                update(Reserva)
+                .where(Reserva.id.in_(ids), Reserva.estado == "pendiente")
+                .values(estado="retenida", fecha_retencion=ahora)
+                .execution_options(synchronize_session=False)
+            )
+            if resultado.rowcount:
+                retenidos[libro_id] = resultado.rowcount
+    return retenidos
+
+
+def _posicion():
+    """
+    Subconsulta correlacionada con la posición de una reserva en su cola.
+
+    Returns:
+        tuple: Alias de Reserva de la fila exterior y expresión de la posición
+        (1 para la primera de la cola).
+    """
+    reserva = aliased(Reserva)
+    anteriores = (
+        select(func.count())
+        .select_from(Reserva)
+        .where(
+            *_cola(reserva.libro_id),
+            or_(
+                Reserva.fecha_reserva < reserva.fecha_reserva,
+                and_(
+                    Reserva.fecha_reserva == reserva.fecha_reserva,
+                    Reserva.id < reserva.id,
+                ),
+            ),
+        )
+        .scalar_subquery()
+    )
+    return reserva, anteriores + 1
+
+
+def consulta_posicion(reserva_id):
+    """
+    Construye la consulta de la posición de una reserva pendiente en su cola.
+
+    Args:
+        reserva_id (int): ID de la reserva.
+
+    Returns:
+        Select: Consulta con la posición, sin filas si la reserva no está pendiente.
+    """
+    reserva, posicion = _posicion()
+    return select(posicion).where(reserva.id == reserva_id, reserva.estado == "pendiente")
+
+
+def posicion_en_cola(reserva_id):
+    """
+    Devuelve la posición de una reserva pendiente en la cola de su libro.
+
+    Args:
+        reserva_id (int): ID de la reserva.
+
+    Returns:
+        int: Posición (1 para la primera), o None si la reserva no está pendiente.
+    """
+    return db.session.execute(consulta_posicion(reserva_id)).scalar()
+
+
+def _fechas_disponibles(libro_ids, ahora):
+    """
+    Fechas en que cada libro tendrá un ejemplar libre, de la más próxima a la última.
+
+    Los ejemplares disponibles están libres ya; los prestados, cuando vence
+    su préstamo (o ya, si está vencido).
+    """
+    dias = current_app.config["PRESTAMOS_DIAS"]
+    fechas = {
+        libro.id: [ahora] * libro.cantidad
+        for libro in db.session.execute(
+            select(Libro.id, Libro.cantidad).where(Libro.id.in_(libro_ids))
+        )
+    }
+    prestamos = db.session.execute(
+        select(Prestamo.libro_id, Prestamo.fecha_prestamo)
+        .where(Prestamo.libro_id.in_(libro_ids), Prestamo.fecha_devolucion.is_(None))
+        .order_by(Prestamo.fecha_prestamo)
+    )
+    for libro_id, fecha_prestamo in prestamos:
+        if fecha_prestamo.tzinfo is None:
+            fecha_prestamo = fecha_prestamo.replace(tzinfo=timezone.utc)
+        fechas[libro_id].append(max(ahora, fecha_prestamo + timedelta(days=dias)))
+    return fechas
+
+
+def estimar_disponibilidad(fechas, posicion):
+    """
+    Estima cuándo le llegará el turno a una posición de la cola.
+
+    Cada ejemplar atiende a la cola por turnos de PRESTAMOS_DIAS días: la
+    posición p recibe el ejemplar que se libera en p-ésimo lugar.
+
+    Args:
+        fechas (list): Fechas en que se libera cada ejemplar, ordenadas.
+        posicion (int): Posición en la cola (1 para la primera).
+
+    Returns:
+        datetime: Fecha estimada, o None si no hay ejemplares libres ni prestados.
+    """
+    if not fechas:
+        return None
+    vuelta, indice = divmod(posicion - 1, len(fechas))
+    return fechas[indice] + timedelta(days=vuelta * current_app.config["PRESTAMOS_DIAS"])
+
+
+def cola_usuario(usuario_id, ahora=None):
+    """
+    Devuelve las reservas en espera o retenidas de un usuario con su posición.
+
+    Lee las reservas y sus posiciones con una sola consulta, y las fechas de
+    devolución de los libros reservados con otra, sea cual sea la longitud
+    de las colas.
+
+    Args:
+        usuario_id (int): ID del usuario.
+        ahora (datetime, opcional): Momento de referencia.
+
+    Returns:
+        list: Diccionarios con 'id', 'libro_id', 'titulo', 'fecha_reserva',
+        'estado', 'posicion' (None si está retenida) y 'fecha_estimada'.
+    """
+    ahora = ahora or datetime.now(timezone.utc)
+    reserva, posicion = _posicion()
+    filas = db.session.execute(
+        select(
+            reserva.id,
+            reserva.libro_id,
+            Libro.titulo,
+            reserva.fecha_reserva,
+            reserva.estado,
+            posicion.label("posicion"),
+        )
+        .join(Libro, Libro.id == reserva.libro_id)
+        .where(
+            reserva.usuario_id == usuario_id,
+            reserva.estado.in_(("pendiente", "retenida")),
+        )
+        .order_by(reserva.fecha_reserva, reserva.id)
+    ).all()
+    fechas = _fechas_disponibles({fila.libro_id for fila in filas}, ahora)
+    return [
+        {
+            "id": fila.id,
+            "libro_id": fila.libro_id,
+            "titulo": fila.titulo,
+            "fecha_reserva": fila.fecha_reserva,
+            "estado": fila.estado,
+            "posicion": fila.posicion if fila.estado == "pendiente" else None,
+            "fecha_estimada": (
+                estimar_disponibilidad(fechas[fila.libro_id], fila.posicion)
+                if fila.estado == "pendiente"
+                else ahora
+            ),
+        }
+        for fila in filas
+    ]
+
+
+def ejecutar_expiracion_periodica(intervalo=None, tamano_lote=None):
+    """
+    Expira las reservas retenidas sin recoger cada `intervalo` segundos hasta que se detenga el proceso.
+
+    Args:
+        intervalo (int, opcional): Segundos entre pasadas (por defecto
+            RESERVAS_INTERVALO).
+        tamano_lote (int, opcional): Reservas por bloque.
+    """
+    intervalo = intervalo or current_app.config["RESERVAS_INTERVALO"]
+    while True:
+        try:
+            total = Reserva.expirar_reservas(tamano_lote=tamano_lote)
+            if total:
+                logging.info(f"Reservas expiradas: {total}.")
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error al expirar reservas: {e}")
+        time.sleep(intervalo)
+
+
+def _limpiar_ids(reserva_ids):
+    """
+    Convierte los IDs a enteros, quita los repetidos y comprueba el tamaño del lote.
+
+    Raises:
+        ValueError: Si algún ID no es un entero, no hay ninguno o hay más de
+            RESERVAS_MAX_LOTE.
+    """
+    try:
+        ids = list(dict.fromkeys(int(reserva_id) for reserva_id in reserva_ids))
+    except (TypeError, ValueError):
+        raise ValueError("Los IDs de las reservas deben ser números enteros.")
+    if not ids:
+        raise ValueError("No se indicó ninguna reserva.")
+    maximo = current_app.config["RESERVAS_MAX_LOTE"]
+    if len(ids) > maximo:
+        raise ValueError(f"Se pueden procesar como máximo {maximo} reservas a la vez.")
+    return ids
+
+
+def _resultado(reserva_id, reserva=None, mensaje=None):
+    """
+    Crea el resultado de una reserva del lote: correcto si no hay mensaje de error.
+    """
+    return {
+        "reserva_id": reserva_id,
+        "libro_id": reserva["libro_id"] if reserva else None,
+        "usuario_id": reserva["usuario_id"] if reserva else None,
+        "correcto": mensaje is None,
+        "mensaje": mensaje,
+    }
+
+
+def _bloquear_libros(libro_ids):
+    """
+    Lee y bloquea los libros indicados, en orden de ID para no interbloquearse.
+
+    Returns:
+        dict: Columnas de cada libro por ID.
+    """
+    if not libro_ids:
+        return {}
+    filas = db.session.execute(
+        select(*Libro.__table__.c)
+        .where(Libro.id.in_(libro_ids))
+        .order_by(Libro.id)
+        .with_for_update()
+    ).mappings()
+    return {fila["id"]: dict(fila) for fila in filas}
+
+
+def _sumar_ejemplares(connection, libros, incrementos):
+    """
+    Suma a la cantidad de cada libro su incremento y declara los cambios.
+
+    Args:
+        connection (Connection): Conexión de la transacción.
+        libros (dict): Columnas de los libros (bloqueados) por ID.
+        incrementos (dict): Ejemplares que se suman (o restan) por ID.
+    """
+    incrementos = {libro_id: n for libro_id, n in incrementos.items() if n}
+    if not incrementos:
+        return
+    tabla = Libro.__table__
+    connection.execute(
+        tabla.update()
+        .where(tabla.c.id == bindparam("libro_id"))
+        .values(cantidad=tabla.c.cantidad + bindparam("incremento")),
+        [
+            {"libro_id": libro_id, "incremento": incremento}
+            for libro_id, incremento in incrementos.items()
+        ],
+    )
+    deltas = {}
+    cambios = []
+    for libro_id, incremento in incrementos.items():
+        libro = libros[libro_id]
+        sumar_contribucion(deltas, libro, disponibles=incremento)
+        cambios.append(
+            ("update", libro, {**libro, "cantidad": libro["cantidad"] + incremento})
+        )
+    aplicar_deltas(connection, deltas)
+    notificar_cambios(db.session, Libro, cambios)
+
+
+def _aprobar(reservas, resultados, limite, ahora):
+    """
+    Presta el libro de cada reserva válida, por orden de llegada.
+
+    Una reserva pendiente necesita un ejemplar disponible; una retenida usa
+    el que tiene apartado. Se respeta el límite de préstamos de cada usuario.
+    """
+    libros = _bloquear_libros({reserva["libro_id"] for reserva in reservas})
+    usuario_ids = {reserva["usuario_id"] for reserva in reservas}
+    existentes = set(
+        db.session.execute(
+            select(Usuario.id)
+            .where(Usuario.id.in_(usuario_ids))
+            .order_by(Usuario.id)
+            .with_for_update()
+        ).scalars()
+    )
+    cupos = {usuario_id: limite for usuario_id in existentes}
+    for usuario_id, abiertos in db.session.execute(
+        select(Prestamo.usuario_id, func.count())
+        .where(Prestamo.usuario_id.in_(existentes), Prestamo.fecha_devolucion.is_(None))
+        .group_by(Prestamo.usuario_id)
+    ):
+        cupos[usuario_id] -= abiertos
+
+    disponibles = {libro_id: libro["cantidad"] for libro_id, libro in libros.items()}
+    aprobadas = []
+    for reserva in reservas:
+        if reserva["libro_id"] not in libros:
+            mensaje = "El libro no existe."
+        elif reserva["usuario_id"] not in existentes:
+            mensaje = "El usuario no existe."
+        elif cupos[reserva["usuario_id"]] <= 0:
+            mensaje = "El usuario ha alcanzado el límite de préstamos permitidos."
+        elif reserva["estado"] == "pendiente" and disponibles[reserva["libro_id"]] <= 0:
+            mensaje = "No hay ejemplares disponibles para préstamo."
+        else:
+            mensaje = None
+            cupos[reserva["usuario_id"]] -= 1
+            if reserva["estado"] == "pendiente":
+                disponibles[reserva["libro_id"]] -= 1
+            aprobadas.append(reserva)
+        resultados[reserva["id"]] = _resultado(reserva["id"], reserva, mensaje)
+    if not aprobadas:
+        return
+
+    connection = db.session.connection()
+    prestamos = [
+        {
+            "libro_id": reserva["libro_id"],
+            "usuario_id": reserva["usuario_id"],
+            "fecha_prestamo": ahora,
+            "fecha_devolucion": None,
+            "estado": "activo",
+        }
+        for reserva in aprobadas
+    ]
+    connection.execute(Prestamo.__table__.insert(), prestamos)
+    connection.execute(
+        update(Reserva.__table__)
+        .where(Reserva.__table__.c.id.in_([reserva["id"] for reserva in aprobadas]))
+        .values(estado="aprobada")
+    )
+    _sumar_ejemplares(
+        connection,
+        libros,
+        {
+            libro_id: disponibles[libro_id] - libro["cantidad"]
+            for libro_id, libro in libros.items()
+        },
+    )
+    deltas = {}
+    for reserva in aprobadas:
+        sumar_contribucion(deltas, libros[reserva["libro_id"]], prestados=1)
+    aplicar_deltas(connection, deltas)
+    notificar_cambios(
+        db.session, Prestamo, [("insert", None, prestamo) for prestamo in prestamos]
+    )
+
+
+def liberar_ejemplares(libro_ids, ahora=None):
+    """
+    Libera los ejemplares apartados para reservas retenidas que se rechazan.
+
+    Se ejecuta dentro de la transacción que rechaza las reservas, que la
+    confirma: cada ejemplar se retiene para la siguiente reserva pendiente de
+    su libro o, si la cola está vacía, vuelve a `Libro.cantidad`.
+
+    Args:
+        libro_ids (list): IDs de los libros (uno por ejemplar liberado).
+        ahora (datetime, opcional): Fecha de las nuevas retenciones.
+    """
+    if not libro_ids:
+        return
+    libros = _bloquear_libros(set(libro_ids))
+    repuestos = Counter(
+        libro_id for libro_id in libro_ids if libro_id in libros
+    ) - retener_para_cola(libro_ids, ahora)
+    _sumar_ejemplares(db.session.connection(), libros, repuestos)
+
+
+def _rechazar(reservas, resultados, ahora):
+    """
+    Rechaza las reservas y libera los ejemplares apartados para las retenidas.
+
+    Cada ejemplar liberado pasa a la siguiente reserva de la cola del libro
+    o, si no hay ninguna, vuelve a estar disponible.
+    """
+    connection = db.session.connection()
+    connection.execute(
+        update(Reserva.__table__)
+        .where(Reserva.__table__.c.id.in_([reserva["id"] for reserva in reservas]))
+        .values(estado="rechazada")
+    )
+    for reserva in reservas:
+        resultados[reserva["id"]] = _resultado(reserva["id"], reserva)
+
+    liberar_ejemplares(
+        [
+            reserva["libro_id"]
+            for reserva in reservas
+            if reserva["estado"] == "retenida" and reserva["libro_id"] is not None
+        ],
+        ahora,
+    )
+
+
+def procesar_reservas(reserva_ids, accion, limite=None):
+    """
+    Aprueba o rechaza una lista de reservas en una transacción.
+
+    Aprobar una reserva presta su libro al usuario, como el mostrador; las
+    reservas que no se pueden aprobar (sin ejemplares, usuario en su límite,
+    ya resueltas...) se rechazan en el resultado sin afectar al resto. Las
+    reservas se procesan por orden de llegada, de modo que, si no hay
+    ejemplares para todas, se atienden primero las más antiguas.
+
+    Args:
+        reserva_ids (list): IDs de las reservas.
+        accion (str): 'aprobar' o 'rechazar'.
+        limite (int, opcional): Préstamos sin devolver permitidos por usuario
+            (por defecto PRESTAMOS_LIMITE_USUARIO).
+
+    Returns:
+        list: Un resultado por reserva, en el orden recibido, con las claves
+        'reserva_id', 'libro_id', 'usuario_id', 'correcto' y 'mensaje' (None
+        si es correcto).
+
+    Raises:
+        ValueError: Si la acción o la lista de IDs no son válidas.
+    """
+    if accion not in ACCIONES_RESERVA:
+        raise ValueError(f"Acción no válida: {accion}")
+    ids = _limpiar_ids(reserva_ids)
+    limite = limite or current_app.config["PRESTAMOS_LIMITE_USUARIO"]
+    ahora = datetime.now(timezone.utc)
+    resultados = {
+        reserva_id: _resultado(reserva_id, mensaje="Reserva no encontrada.")
+        for reserva_id in ids
+    }
+    try:
+        filas = db.session.execute(
+            select(*Reserva.__table__.c)
+            .where(Reserva.id.in_(ids))
+            .order_by(Reserva.fecha_reserva, Reserva.id)
+            .with_for_update()
+        ).mappings()
+        validas = []
+        for reserva in filas:
+            if reserva["estado"] not in ESTADOS_GESTION:
+                resultados[reserva["id"]] = _resultado(
+                    reserva["id"], reserva, f"La reserva ya está {reserva['estado']}."
+                )
+            else:
+                validas.append(dict(reserva))
+        if validas:
+            if accion == "aprobar":
+                _aprobar(validas, resultados, limite, ahora)
+            else:
+                _rechazar(validas, resultados, ahora)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return [resultados[reserva_id] for reserva_id in ids]
@@ -0,0 +1,498 @@
+"""
+Módulo de contadores materializados del catálogo para la aplicación de biblioteca.
+
+Mantiene la tabla `resumen_catalogo` con el número de libros, ejemplares
+disponibles y préstamos sin devolver por autor, género y editorial, de modo
+que consultas como "libros por género" o "ejemplares disponibles de un
+autor" se resuelven leyendo una fila. No hay fila de totales: cada préstamo
+actualizaría esa única fila y serializaría todos los préstamos concurrentes,
+así que los totales se obtienen sumando las filas de los géneros.
+
+Los contadores se actualizan por incrementos en la misma transacción que las
+altas, modificaciones y bajas de libros y préstamos mediante eventos de
+SQLAlchemy. Las operaciones masivas que no pasan por el ORM deben llamar a
+`aplicar_deltas` con sus cambios. La tabla puede reconstruirse desde cero
+con `flask reconciliar-resumen`.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import math
+from sqlalchemy import delete, event, func, inspect, select, tuple_
+from extensions import db
+from src.models.models_libro import Libro
+from src.models.models_prestamo import Prestamo
+from src.models.models_resumen import ResumenCatalogo
+
+# Campos del libro por los que se agregan los contadores
+DIMENSIONES = ("autor", "genero", "editorial")
+
+# Dimensión cuyas filas se suman para obtener los totales del catálogo (la
+# de menos valores distintos; cada libro cuenta en exactamente una de ellas)
+DIMENSION_TOTALES = "genero"
+
+
+def _claves(valores):
+    """
+    Devuelve las claves (dimension, valor) a las que contribuye un libro.
+    """
+    return [(dimension, valores[dimension]) for dimension in DIMENSIONES]
+
+
+def sumar_contribucion(deltas, valores, libros=0, disponibles=0, prestados=0):
+    """
+    Acumula en `deltas` la contribución de un libro a sus contadores.
+
+    Args:
+        deltas (dict): Incrementos acumulados por clave (dimension, valor).
+        valores (Mapping): Autor, género y editorial del libro.
+        libros (int): Incremento del número de libros.
+        disponibles (int): Incremento de ejemplares disponibles.
+        prestados (int): Incremento de préstamos sin devolver.
+    """
+    for clave in _claves(valores):
+        acumulado = deltas.setdefault(clave, [0, 0, 0])
+        acumulado[0] += libros
+        acumulado[1] += disponibles
+        acumulado[2] += prestados
+
+
+def _sentencia_incremento(connection):
+    """
+    Construye el INSERT que suma los incrementos a las filas existentes.
+
+    Usa la sintaxis de inserción con actualización propia de cada motor
+    (ON DUPLICATE KEY UPDATE en MySQL, ON CONFLICT en SQLite y PostgreSQL).
+
+    Returns:
+        Insert | None: Sentencia preparada, o None si el motor no la admite.
+    """
+    tabla = ResumenCatalogo.__table__
+    dialecto = connection.dialect.name
+    if dialecto in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+
+        sentencia = insert(tabla)
+        return sentencia.on_duplicate_key_update(
+            libros=tabla.c.libros + sentencia.inserted.libros,
+            disponibles=tabla.c.disponibles + sentencia.inserted.disponibles,
+            prestados=tabla.c.prestados + sentencia.inserted.prestados,
+        )
+    if dialecto in ("sqlite", "postgresql"):
+        if dialecto == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+
+        sentencia = insert(tabla)
+        return sentencia.on_conflict_do_update(
+            index_elements=[tabla.c.dimension, tabla.c.valor],
+            set_={
+                "libros": tabla.c.libros + sentencia.excluded.libros,
+                "disponibles": tabla.c.disponibles + sentencia.excluded.disponibles,
+                "prestados": tabla.c.prestados + sentencia.excluded.prestados,
+            },
+        )
+    return None
+
+
+def aplicar_deltas(connection, deltas):
+    """
+    Suma los incrementos acumulados a la tabla de resumen en la transacción en curso.
+
+    Las filas se escriben ordenadas por clave para que transacciones
+    concurrentes bloqueen las filas en el mismo orden, y las que se quedan
+    sin libros se eliminan.
+
+    Args:
+        connection (Connection): Conexión de la transacción en curso.
+        deltas (dict): Incrementos [libros, disponibles, prestados] por
+            clave (dimension, valor), como los que acumula `sumar_contribucion`.
+    """
+    filas = [
+        {
+            "dimension": dimension,
+            "valor": valor,
+            "libros": libros,
+            "disponibles": disponibles,
+            "prestados": prestados,
+        }
+        for (dimension, valor), (libros, disponibles, prestados) in sorted(
+            deltas.items()
+        )
+        if libros or disponibles or prestados
+    ]
+    if not filas:
+        return
+
+    tabla = ResumenCatalogo.__table__
+    sentencia = _sentencia_incremento(connection)
+    if sentencia is not None:
+        connection.execute(sentencia, filas)
+    else:
+        for fila in filas:
+            resultado = connection.execute(
+                tabla.update()
+                .where(
+                    tabla.c.dimension == fila["dimension"],
+                    tabla.c.valor == fila["valor"],
+                )
+                .values(
+                    libros=tabla.c.libros + fila["libros"],
+                    disponibles=tabla.c.disponibles + fila["disponibles"],
+                    prestados=tabla.c.prestados + fila["prestados"],
+                )
+            )
+            if resultado.rowcount == 0:
+                connection.execute(tabla.insert(), fila)
+
+    if any(fila["libros"] < 0 for fila in filas):
+        connection.execute(
+            delete(tabla).where(
+                tabla.c.libros <= 0,
+                tuple_(tabla.c.dimension, tabla.c.valor).in_(
+                    [(fila["dimension"], fila["valor"]) for fila in filas]
+                ),
+            )
+        )
+
+
+def _valor_anterior(estado, campo):
+    """
+    Devuelve el valor que tenía un atributo antes de los cambios pendientes.
+    """
+    historial = estado.attrs[campo].history
+    return historial.deleted[0] if historial.deleted else getattr(estado.obj(), campo)
+
+
+def _valores_libro(connection, libro_id):
+    """
+    Lee el autor, género y editorial de un libro dentro de la transacción.
+    """
+    return (
+        connection.execute(
+            select(Libro.autor, Libro.genero, Libro.editorial).where(
+                Libro.id == libro_id
+            )
+        )
+        .mappings()
+        .first()
+    )
+
+
+def _prestamos_sin_devolver(connection, libro_id):
+    """
+    Cuenta los préstamos sin devolver de un libro dentro de la transacción.
+    """
+    return connection.execute(
+        select(func.count())
+        .select_from(Prestamo)
+        .where(Prestamo.libro_id == libro_id, Prestamo.fecha_devolucion.is_(None))
+    ).scalar()
+
+
+def _ajustar_prestados(connection, libro_id, incremento):
+    """
+    Suma `incremento` a los préstamos sin devolver de los contadores de un libro.
+    """
+    if libro_id is None:
+        return
+    valores = _valores_libro(connection, libro_id)
+    if valores is None:
+        return
+    deltas = {}
+    sumar_contribucion(deltas, valores, prestados=incremento)
+    aplicar_deltas(connection, deltas)
+
+
+def _esta_sin_devolver(libro_id, fecha_devolucion):
+    """
+    Indica si un préstamo cuenta como ejemplar prestado de un libro.
+    """
+    return libro_id is not None and fecha_devolucion is None
+
+
+# Los eventos "set" con historial activo garantizan que el valor anterior de
+# estos atributos esté disponible en el flush aunque no se hubiera cargado.
+for _atributo in (
+    Libro.autor,
+    Libro.genero,
+    Libro.editorial,
+    Libro.cantidad,
+    Prestamo.libro_id,
+    Prestamo.fecha_devolucion,
+):
+    event.listen(_atributo, "set", lambda *args: None, active_history=True)
+
+
+@event.listens_for(Libro, "after_insert")
+def _contar_libro_insertado(mapper, connection, target):
+    """
+    Suma un libro recién insertado a sus contadores.
+    """
+    deltas = {}
+    sumar_contribucion(
+        deltas,
+        {dimension: getattr(target, dimension) for dimension in DIMENSIONES},
+        libros=1,
+        disponibles=target.cantidad or 0,
+    )
+    aplicar_deltas(connection, deltas)
+
+
+@event.listens_for(Libro, "after_update")
+def _contar_libro_modificado(mapper, connection, target):
+    """
+    Ajusta los contadores si cambió la cantidad o algún campo agregado del libro.
+    """
+    estado = inspect(target)
+    campos = DIMENSIONES + ("cantidad",)
+    if not any(estado.attrs[campo].history.has_changes() for campo in campos):
+        return
+    antes = {campo: _valor_anterior(estado, campo) for campo in campos}
+    despues = {campo: getattr(target, campo) for campo in campos}
+
+    deltas = {}
+    if any(antes[dimension] != despues[dimension] for dimension in DIMENSIONES):
+        prestados = _prestamos_sin_devolver(connection, target.id)
+        sumar_contribucion(deltas, antes, -1, -antes["cantidad"], -prestados)
+        sumar_contribucion(deltas, despues, 1, despues["cantidad"], prestados)
+    else:
+        sumar_contribucion(
+            deltas, despues, disponibles=despues["cantidad"] - antes["cantidad"]
+        )
+    aplicar_deltas(connection, deltas)
+
+
+@event.listens_for(Libro, "before_delete")
+def _descontar_libro_eliminado(mapper, connection, target):
+    """
+    Resta un libro de sus contadores antes de eliminarlo.
+
+    Se hace antes del DELETE para contar los préstamos sin devolver que la
+    base de datos desvinculará del libro al borrarlo.
+    """
+    estado = inspect(target)
+    valores = {dimension: _valor_anterior(estado, dimension) for dimension in DIMENSIONES}
+    deltas = {}
+    sumar_contribucion(
+        deltas,
+        valores,
+        libros=-1,
+        disponibles=-(_valor_anterior(estado, "cantidad") or 0),
+        prestados=-_prestamos_sin_devolver(connection, target.id),
+    )
+    aplicar_deltas(connection, deltas)
+
+
+@event.listens_for(Prestamo, "after_insert")
+def _contar_prestamo_insertado(mapper, connection, target):
+    """
+    Suma un préstamo nuevo sin devolver a los contadores de su libro.
+    """
+    if _esta_sin_devolver(target.libro_id, target.fecha_devolucion):
+        _ajustar_prestados(connection, target.libro_id, 1)
+
+
+@event.listens_for(Prestamo, "after_update")
+def _contar_prestamo_modificado(mapper, connection, target):
+    """
+    Ajusta los contadores si el préstamo se devolvió o cambió de libro.
+    """
+    estado = inspect(target)
+    libro_anterior = _valor_anterior(estado, "libro_id")
+    antes = _esta_sin_devolver(libro_anterior, _valor_anterior(estado, "fecha_devolucion"))
+    despues = _esta_sin_devolver(target.libro_id, target.fecha_devolucion)
+    if antes and (not despues or libro_anterior != target.libro_id):
+        _ajustar_prestados(connection, libro_anterior, -1)
+    if despues and (not antes or libro_anterior != target.libro_id):
+        _ajustar_prestados(connection, target.libro_id, 1)
+
+
+@event.listens_for(Prestamo, "after_delete")
+def _descontar_prestamo_eliminado(mapper, connection, target):
+    """
+    Resta un préstamo eliminado sin devolver de los contadores de su libro.
+    """
+    if _esta_sin_devolver(target.libro_id, target.fecha_devolucion):
+        _ajustar_prestados(connection, target.libro_id, -1)
+
+
+def _validar_dimension(dimension):
+    """
+    Comprueba que la dimensión tenga contadores.
+
+    Raises:
+        ValueError: Si la dimensión no es válida.
+    """
+    if dimension not in DIMENSIONES:
+        raise ValueError(f"Dimensión no válida: {dimension}")
+
+
+def obtener_resumen(dimension=None, valor=""):
+    """
+    Obtiene los contadores de un valor de una dimensión o de todo el catálogo.
+
+    Los totales del catálogo se suman a partir de las filas de
+    DIMENSION_TOTALES, que se recorren con la clave primaria.
+
+    Args:
+        dimension (str, opcional): 'autor', 'genero' o 'editorial'; si se
+            omite se devuelven los totales del catálogo.
+        valor (str): Valor de la dimensión.
+
+    Returns:
+        dict: Diccionario con 'libros', 'disponibles' y 'prestados'.
+
+    Raises:
+        ValueError: Si la dimensión no es válida.
+    """
+    if dimension is None:
+        fila = db.session.execute(
+            select(
+                func.coalesce(func.sum(ResumenCatalogo.libros), 0).label("libros"),
+                func.coalesce(func.sum(ResumenCatalogo.disponibles), 0).label(
+                    "disponibles"
+                ),
+                func.coalesce(func.sum(ResumenCatalogo.prestados), 0).label(
+                    "prestados"
+                ),
+            ).where(ResumenCatalogo.dimension == DIMENSION_TOTALES)
+        ).one()
+        return {
+            "libros": int(fila.libros),
+            "disponibles": int(fila.disponibles),
+            "prestados": int(fila.prestados),
+        }
+    _validar_dimension(dimension)
+    fila = db.session.get(ResumenCatalogo, (dimension, valor))
+    if fila is None:
+        return {"libros": 0, "disponibles": 0, "prestados": 0}
+    return {
+        "libros": fila.libros,
+        "disponibles": fila.disponibles,
+        "prestados": fila.prestados,
+    }
+
+
+def pagina_resumen(dimension, pagina=1, por_pagina=25):
+    """
+    Obtiene una página de valores de una dimensión con sus contadores.
+
+    Los valores se recorren en el orden de la clave primaria de la tabla.
+
+    Args:
+        dimension (str): 'autor', 'genero' o 'editorial'.
+        pagina (int): Número de página (desde 1).
+        por_pagina (int): Valores por página.
+
+    Returns:
+        dict: Diccionario con 'elementos' (valor, total, disponibles y
+        prestados), 'total', 'pagina' y 'paginas'.
+
+    Raises:
+        ValueError: Si la dimensión no es válida.
+    """
+    _validar_dimension(dimension)
+    pagina = max(int(pagina), 1)
+    total = db.session.execute(
+        select(func.count())
+        .select_from(ResumenCatalogo)
+        .where(ResumenCatalogo.dimension == dimension)
+    ).scalar()
+    filas = db.session.execute(
+        select(
+            ResumenCatalogo.valor,
+            ResumenCatalogo.libros,
+            ResumenCatalogo.disponibles,
+            ResumenCatalogo.prestados,
+        )
+        .where(ResumenCatalogo.dimension == dimension)
+        .order_by(ResumenCatalogo.valor)
+        .limit(por_pagina)
+        .offset((pagina - 1) * por_pagina)
+    ).all()
+    return {
+        "elementos": [
+            {
+                "valor": fila.valor,
+                "total": fila.libros,
+                "disponibles": fila.disponibles,
+                "prestados": fila.prestados,
+            }
+            for fila in filas
+        ],
+        "total": total,
+        "pagina": pagina,
+        "paginas": math.ceil(total / por_pagina),
+    }
+
+
+def reconstruir_resumen(tamano_lote=1000):
+    """
+    Reconstruye desde cero la tabla de resumen a partir de libros y préstamos.
+
+    El catálogo se recorre por lotes de IDs acumulando los contadores en
+    memoria (una entrada por valor distinto), y la tabla se sustituye en una
+    única transacción al final, de modo que los lectores nunca ven una tabla
+    a medio construir. Los cambios que se confirmen durante el recorrido
+    pueden requerir una nueva ejecución.
+
+    Args:
+        tamano_lote (int): Número de libros leídos por lote.
+
+    Returns:
+        int: Número de libros contabilizados.
+    """
+    deltas = {}
+    ultimo_id = 0
+    total = 0
+    while True:
+        filas = db.session.execute(
+            select(Libro.id, Libro.autor, Libro.genero, Libro.editorial, Libro.cantidad)
+            .where(Libro.id > ultimo_id)
+            .order_by(Libro.id)
+            .limit(tamano_lote)
+        ).all()
+        if not filas:
+            break
+        ids = [fila.id for fila in filas]
+        prestados = dict(
+            db.session.execute(
+                select(Prestamo.libro_id, func.count())
+                .where(
+                    Prestamo.libro_id.in_(ids), Prestamo.fecha_devolucion.is_(None)
+                )
+                .group_by(Prestamo.libro_id)
+            ).all()
+        )
+        for fila in filas:
+            sumar_contribucion(
+                deltas, fila._mapping, 1, fila.cantidad, prestados.get(fila.id, 0)
+            )
+        ultimo_id = ids[-1]
+        total += len(filas)
+        # Se cierra la transacción de lectura de cada lote
+        db.session.rollback()
+
+    connection = db.session.connection()
+    connection.execute(delete(ResumenCatalogo))
+    filas = [
+        {
+            "dimension": dimension,
+            "valor": valor,
+            "libros": libros,
+            "disponibles": disponibles,
+            "prestados": prestados,
+        }
+        for (dimension, valor), (libros, disponibles, prestados) in sorted(
+            deltas.items()
+        )
+    ]
+    for inicio in range(0, len(filas), tamano_lote):
+        connection.execute(
+            ResumenCatalogo.__table__.insert(), filas[inicio : inicio + tamano_lote]
+        )
+    db.session.commit()
+    return total
@@ -0,0 +1,307 @@
+"""
+Módulo de análisis de texto para la aplicación de gestión de biblioteca.
+
+Proporciona la normalización (minúsculas y eliminación de tildes), la
+tokenización y la reducción a raíz (stemming) de palabras en español que usan
+el buscador del catálogo y el autocompletado de usuarios.
+
+El algoritmo de raíces sigue el stemmer Snowball para español, con las
+listas de sufijos sin tildes: la palabra se compara ya normalizada, de modo
+que "información", "informacion" e "informaciones" tienen la misma raíz.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+VOCALES = "aeiouáéíóúü"
+
+# Palabras vacías que no aportan al índice de búsqueda
+PALABRAS_VACIAS = frozenset(
+    """
+    a al algo algunas algunos ante antes como con contra cual cuando de del
+    desde donde durante e el ella ellas ellos en entre era es esa esas ese eso
+    esos esta estas este esto estos fue fueron ha hasta la las le les lo los
+    mas me mi mis mucho muy nada ni no nos o os otra otras otro otros para
+    pero poco por porque que quien se sera si sin sobre su sus tambien te tu
+    tus un una unas uno unos y ya yo
+    """.split()
+)
+
+_PATRON_PALABRA = re.compile(r"\w+", re.UNICODE)
+
+_SIN_TILDE = str.maketrans("áéíóúü", "aeiouu")
+
+
+def _sin_tildes(sufijos):
+    """
+    Devuelve los sufijos sin tildes (las reglas de un dict se conservan).
+    """
+    if isinstance(sufijos, dict):
+        return {sufijo.translate(_SIN_TILDE): regla for sufijo, regla in sufijos.items()}
+    return frozenset(sufijo.translate(_SIN_TILDE) for sufijo in sufijos)
+
+
+# Las listas siguen las del algoritmo Snowball y se comparan sin tildes
+_SUFIJOS_PRONOMBRE = _sin_tildes((
+    "selas", "selos", "sela", "selo", "las", "les", "los", "nos",
+    "me", "se", "la", "le", "lo",
+))
+# Sin tildes, "iéndo", "ándo", "ár", "ér" e "ír" coinciden con estos
+_PREVIOS_PRONOMBRE = frozenset(("iendo", "ando", "ar", "er", "ir"))
+
+_SUFIJOS_PASO1 = _sin_tildes({
+    "amientos": "r2", "imientos": "r2", "amiento": "r2", "imiento": "r2",
+    "anzas": "r2", "anza": "r2", "icos": "r2", "icas": "r2", "ico": "r2",
+    "ica": "r2", "ismos": "r2", "ismo": "r2", "ables": "r2", "able": "r2",
+    "ibles": "r2", "ible": "r2", "istas": "r2", "ista": "r2", "osos": "r2",
+    "osas": "r2", "oso": "r2", "osa": "r2",
+    "aciones": "ic", "adoras": "ic", "adores": "ic", "ancias": "ic",
+    "adora": "ic", "ación": "ic", "antes": "ic", "ancia": "ic",
+    "ador": "ic", "ante": "ic",
+    "logías": "log", "logía": "log",
+    "uciones": "u", "ución": "u",
+    "encias": "ente", "encia": "ente",
+    "amente": "amente",
+    "mente": "mente",
+    "idades": "idad", "idad": "idad",
+    "ivas": "iva", "ivos": "iva", "iva": "iva", "ivo": "iva",
+})
+
+_SUFIJOS_Y = _sin_tildes((
+    "yeron", "yendo", "yamos", "yais", "yan", "yen", "yas", "yes",
+    "ya", "ye", "yo", "yó",
+))
+
+_SUFIJOS_PASO2B_GU = _sin_tildes(("emos", "éis", "en", "es"))
+_SUFIJOS_PASO2B = _sin_tildes((
+    "aríamos", "eríamos", "iríamos", "iéramos", "iésemos", "aríais",
+    "aremos", "eríais", "eremos", "iríais", "iremos", "ierais", "ieseis",
+    "asteis", "isteis", "ábamos", "áramos", "ásemos", "arían", "arías",
+    "aréis", "erían", "erías", "eréis", "irían", "irías", "iréis", "ieran",
+    "iesen", "ieron", "iendo", "ieras", "ieses", "abais", "arais", "aseis",
+    "íamos", "arán", "arás", "aría", "erán", "erás", "ería", "irán", "irás",
+    "iría", "iera", "iese", "aste", "iste", "aban", "aran", "asen", "aron",
+    "ando", "abas", "adas", "idas", "aras", "ases", "íais", "ados", "idos",
+    "amos", "imos", "ará", "aré", "erá", "eré", "irá", "iré", "aba", "ada",
+    "ida", "ara", "ase", "ían", "ado", "ido", "ías", "áis", "ía", "ad",
+    "ed", "id", "an", "ió", "ar", "er", "ir", "as", "ís",
+))
+
+_SUFIJOS_PASO2B_TODOS = _SUFIJOS_PASO2B | _SUFIJOS_PASO2B_GU
+
+_SUFIJOS_RESIDUALES = _sin_tildes(("os", "a", "o", "á", "í", "ó"))
+
+# Longitud del sufijo más largo de todas las listas ("amientos")
+_LONGITUD_MAXIMA_SUFIJO = 8
+
+
+def normalizar(texto):
+    """
+    Convierte un texto a minúsculas y elimina tildes y diacríticos.
+
+    Args:
+        texto (str): Texto de entrada.
+
+    Returns:
+        str: Texto normalizado.
+    """
+    descompuesto = unicodedata.normalize("NFKD", (texto or "").lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def _region_despues_de_no_vocal(palabra, inicio=0):
+    """
+    Devuelve el índice de la región tras la primera no vocal precedida de vocal.
+    """
+    for i in range(inicio + 1, len(palabra)):
+        if palabra[i] not in VOCALES and palabra[i - 1] in VOCALES:
+            return i + 1
+    return len(palabra)
+
+
+def _region_rv(palabra):
+    """
+    Calcula el inicio de la región RV del algoritmo Snowball para español.
+    """
+    if len(palabra) < 2:
+        return len(palabra)
+    if palabra[1] not in VOCALES:
+        for i in range(2, len(palabra)):
+            if palabra[i] in VOCALES:
+                return i + 1
+    elif palabra[0] in VOCALES and palabra[1] in VOCALES:
+        for i in range(2, len(palabra)):
+            if palabra[i] not in VOCALES:
+                return i + 1
+    else:
+        return 3
+    return len(palabra)
+
+
+def _sufijo_mas_largo(palabra, sufijos, desde=0):
+    """
+    Devuelve el sufijo más largo de `sufijos` con el que termina la palabra.
+
+    Si se indica `desde`, solo se consideran sufijos que empiezan en esa
+    posición o después (es decir, contenidos en la región). Se prueban los
+    finales de la palabra de mayor a menor longitud contra el conjunto de
+    sufijos, en lugar de recorrer todos los sufijos.
+    """
+    for longitud in range(min(_LONGITUD_MAXIMA_SUFIJO, len(palabra) - desde), 0, -1):
+        sufijo = palabra[-longitud:]
+        if sufijo in sufijos:
+            return sufijo
+    return ""
+
+
+@lru_cache(maxsize=50000)
+def raiz(palabra):
+    """
+    Reduce una palabra en español a su raíz (algoritmo Snowball).
+
+    A la palabra se le quitan las tildes antes de buscar sus sufijos, así que
+    escrita con o sin ellas produce la misma raíz.
+
+    Los resultados se memorizan: el vocabulario del catálogo se repite mucho
+    (autores, géneros, editoriales) y así la reindexación y las importaciones
+    masivas calculan cada raíz una sola vez.
+
+    Args:
+        palabra (str): Palabra en minúsculas, con o sin tildes.
+
+    Returns:
+        str: Raíz de la palabra sin tildes.
+    """
+    palabra = palabra.translate(_SIN_TILDE)
+    if len(palabra) < 3:
+        return palabra
+
+    r1 = _region_despues_de_no_vocal(palabra)
+    r2 = _region_despues_de_no_vocal(palabra, r1)
+    rv = _region_rv(palabra)
+
+    # Paso 0: pronombres enclíticos
+    sufijo = _sufijo_mas_largo(palabra, _SUFIJOS_PRONOMBRE, desde=rv)
+    if sufijo:
+        base = palabra[: -len(sufijo)]
+        previo = _sufijo_mas_largo(base, _PREVIOS_PRONOMBRE)
+        if previo and len(base) - len(previo) >= rv:
+            palabra = base
+        elif base.endswith("uyendo") and len(base) - 5 >= rv:
+            palabra = base
+
+    # Paso 1: sufijos estándar
+    longitud_inicial = len(palabra)
+    sufijo = _sufijo_mas_largo(palabra, _SUFIJOS_PASO1)
+    if sufijo:
+        regla = _SUFIJOS_PASO1[sufijo]
+        inicio = len(palabra) - len(sufijo)
+        base = palabra[:inicio]
+        if regla == "r2" and inicio >= r2:
+            palabra = base
+        elif regla == "ic" and inicio >= r2:
+            palabra = base
+            if palabra.endswith("ic") and len(palabra) - 2 >= r2:
+                palabra = palabra[:-2]
+        elif regla == "log" and inicio >= r2:
+            palabra = base + "log"
+        elif regla == "u" and inicio >= r2:
+            palabra = base + "u"
+        elif regla == "ente" and inicio >= r2:
+            palabra = base + "ente"
+        elif regla == "amente" and inicio >= r1:
+            palabra = base
+            if palabra.endswith("iv") and len(palabra) - 2 >= r2:
+                palabra = palabra[:-2]
+                if palabra.endswith("at") and len(palabra) - 2 >= r2:
+                    palabra = palabra[:-2]
+            else:
+                for previo in ("os", "ic", "ad"):
+                    if palabra.endswith(previo) and len(palabra) - 2 >= r2:
+                        palabra = palabra[:-2]
+                        break
+        elif regla == "mente" and inicio >= r2:
+            palabra = base
+            for previo in ("ante", "able", "ible"):
+                if palabra.endswith(previo) and len(palabra) - 4 >= r2:
+                    palabra = palabra[:-4]
+                    break
+        elif regla == "idad" and inicio >= r2:
+            palabra = base
+            for previo in ("abil", "ic", "iv"):
+                if palabra.endswith(previo) and len(palabra) - len(previo) >= r2:
+                    palabra = palabra[: -len(previo)]
+                    break
+        elif regla == "iva" and inicio >= r2:
+            palabra = base
+            if palabra.endswith("at") and len(palabra) - 2 >= r2:
+                palabra = palabra[:-2]
+
+    if len(palabra) == longitud_inicial:
+        # Paso 2a: sufijos verbales que empiezan por "y"
+        sufijo = _sufijo_mas_largo(palabra, _SUFIJOS_Y, desde=rv)
+        inicio = len(palabra) - len(sufijo)
+        if sufijo and palabra[:inicio].endswith("u"):
+            palabra = palabra[:inicio]
+        else:
+            # Paso 2b: resto de sufijos verbales
+            sufijo = _sufijo_mas_largo(
+                palabra, _SUFIJOS_PASO2B_TODOS, desde=rv
+            )
+            inicio = len(palabra) - len(sufijo)
+            if sufijo:
+                palabra = palabra[:inicio]
+                if sufijo in _SUFIJOS_PASO2B_GU and palabra.endswith("gu"):
+                    palabra = palabra[:-1]
+
+    # Paso 3: sufijos residuales
+    sufijo = _sufijo_mas_largo(palabra, _SUFIJOS_RESIDUALES)
+    if sufijo and len(palabra) - len(sufijo) >= rv:
+        palabra = palabra[: -len(sufijo)]
+    elif palabra.endswith("e") and len(palabra) - 1 >= rv:
+        palabra = palabra[:-1]
+        if palabra.endswith("gu") and len(palabra) - 1 >= rv:
+            palabra = palabra[:-1]
+
+    return palabra
+
+
+def tokenizar(texto):
+    """
+    Divide un texto en palabras en minúsculas, conservando las tildes.
+
+    Args:
+        texto (str): Texto de entrada.
+
+    Returns:
+        list: Lista de palabras.
+    """
+    return _PATRON_PALABRA.findall((texto or "").lower())
+
+
+def analizar(texto):
+    """
+    Convierte un texto en la lista de términos que se indexan y se buscan.
+
+    Elimina las tildes, descarta las palabras vacías y reduce cada palabra a su
+    raíz. Como las listas de sufijos de `raiz` tampoco llevan tildes, una
+    consulta escrita sin ellas ("garcia", "informacion") produce el mismo
+    término que el texto original ("García", "información"), y el singular el
+    mismo que el plural ("informaciones").
+
+    Args:
+        texto (str): Texto de entrada.
+
+    Returns:
+        list: Lista de términos (con repeticiones).
+    """
+    terminos = []
+    for palabra in tokenizar(normalizar(texto)):
+        if palabra in PALABRAS_VACIAS:
+            continue
+        terminos.append(raiz(palabra))
+    return terminos
@@ -0,0 +1,301 @@
+"""
+Módulo de trabajos de importación en segundo plano para la aplicación de biblioteca.
+
+Las importaciones de CSV se encolan como filas de `trabajo_importacion` y se
+procesan fuera del ciclo de la petición, ya sea en un grupo de hilos del
+propio proceso web (IMPORTACION_EJECUTOR_LOCAL) o en procesos trabajadores
+independientes lanzados con `flask procesar-importaciones`. El trabajo se
+reclama con un UPDATE condicional sobre su estado, de modo que cada archivo
+lo procesa un único trabajador aunque haya varios.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import csv
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import select, update
+from werkzeug.utils import secure_filename
+from extensions import db
+from src.models.models_importacion import TrabajoImportacion
+from src.services.services_importacion import comprobar_columnas, importar_libros_csv
+
+_ejecutor = None
+_bloqueo_ejecutor = threading.Lock()
+
+
+def _obtener_ejecutor():
+    """
+    Devuelve el grupo de hilos local del proceso, creándolo la primera vez.
+
+    Se crea bajo demanda para que cada proceso de gunicorn tenga el suyo.
+    """
+    global _ejecutor
+    with _bloqueo_ejecutor:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(
+                max_workers=current_app.config["IMPORTACION_HILOS"],
+                thread_name_prefix="importacion",
+            )
+    return _ejecutor
+
+
+def encolar_importacion(archivo, usuario_id):
+    """
+    Guarda un CSV subido y crea su trabajo de importación pendiente.
+
+    Solo se comprueba la cabecera; las filas se validan al procesar el trabajo.
+
+    Args:
+        archivo (FileStorage): Archivo recibido en la petición.
+        usuario_id (int): ID del administrador que lo sube.
+
+    Returns:
+        TrabajoImportacion: Trabajo creado.
+
+    Raises:
+        ValueError: Si el archivo no es un CSV UTF-8 con las columnas obligatorias.
+    """
+    carpeta = os.path.abspath(current_app.config["IMPORTACION_CARPETA"])
+    os.makedirs(carpeta, exist_ok=True)
+    nombre = secure_filename(archivo.filename) or "importacion.csv"
+    ruta = os.path.join(carpeta, f"{uuid.uuid4().hex}_{nombre}")
+    archivo.save(ruta)
+
+    try:
+        with open(ruta, encoding="utf-8-sig", newline="") as csvfile:
+            comprobar_columnas(next(csv.reader(csvfile), []))
+    except (ValueError, csv.Error) as e:
+        os.remove(ruta)
+        if isinstance(e, UnicodeDecodeError):
+            raise ValueError("El archivo no está codificado en UTF-8.")
+        raise ValueError(str(e))
+
+    trabajo = TrabajoImportacion(
+        usuario_id=usuario_id,
+        nombre_archivo=nombre,
+        ruta=ruta,
+        tamano=os.path.getsize(ruta),
+    )
+    db.session.add(trabajo)
+    db.session.commit()
+
+    if current_app.config["IMPORTACION_EJECUTOR_LOCAL"]:
+        _obtener_ejecutor().submit(
+            _procesar_en_contexto, current_app._get_current_object(), trabajo.id
+        )
+    return trabajo
+
+
+def reclamar_trabajo(trabajo_id=None):
+    """
+    Pasa a 'en_proceso' un trabajo pendiente: el indicado o el más antiguo.
+
+    El cambio de estado se hace con un UPDATE condicionado a que siga
+    pendiente, así que solo uno de los trabajadores que lo intenten lo obtiene.
+
+    Args:
+        trabajo_id (int, opcional): ID del trabajo a reclamar.
+
+    Returns:
+        int | None: ID del trabajo reclamado, o None si no había ninguno
+        disponible.
+    """
+    if trabajo_id is None:
+        trabajo_id = db.session.execute(
+            select(TrabajoImportacion.id)
+            .where(TrabajoImportacion.estado == "pendiente")
+            .order_by(TrabajoImportacion.id)
+            .limit(1)
+        ).scalar()
+        if trabajo_id is None:
+            # Se cierra la transacción para ver los trabajos nuevos en la siguiente consulta
+            db.session.rollback()
+            return None
+    resultado = db.session.execute(
+        update(TrabajoImportacion)
+        .where(
+            TrabajoImportacion.id == trabajo_id,
+            TrabajoImportacion.estado == "pendiente",
+        )
+        .values(estado="en_proceso", fecha_inicio=datetime.now(timezone.utc))
+    )
+    db.session.commit()
+    return trabajo_id if resultado.rowcount == 1 else None
+
+
+def _guardar_estado(trabajo_id, **valores):
+    """
+    Actualiza las columnas de estado y progreso de un trabajo y confirma.
+    """
+    db.session.execute(
+        update(TrabajoImportacion)
+        .where(TrabajoImportacion.id == trabajo_id)
+        .values(**valores)
+    )
+    db.session.commit()
+
+
+def _contadores(informe):
+    """
+    Extrae del informe de importación los contadores que se guardan en el trabajo.
+    """
+    return {
+        "procesadas": informe["procesadas"],
+        "insertados": informe["insertados"],
+        "actualizados": informe["actualizados"],
+        "errores": informe["errores"],
+    }
+
+
+def procesar_trabajo(trabajo_id):
+    """
+    Procesa un trabajo ya reclamado y guarda su progreso tras cada lote.
+
+    El archivo se elimina al terminar, tanto si la importación se completa
+    como si falla.
+
+    Args:
+        trabajo_id (int): ID del trabajo en estado 'en_proceso'.
+    """
+    trabajo = db.session.get(TrabajoImportacion, trabajo_id)
+    ruta = trabajo.ruta
+    tamano = trabajo.tamano
+    try:
+        with open(ruta, "rb") as archivo:
+            informe = importar_libros_csv(
+                archivo,
+                al_procesar_lote=lambda informe: _guardar_estado(
+                    trabajo_id,
+                    bytes_procesados=archivo.tell(),
+                    **_contadores(informe),
+                ),
+            )
+        _guardar_estado(
+            trabajo_id,
+            estado="completado",
+            bytes_procesados=tamano,
+            detalle_errores=informe["detalle_errores"],
+            fecha_fin=datetime.now(timezone.utc),
+            **_contadores(informe),
+        )
+        logging.info(
+            f"Importación {trabajo_id} completada: {informe['insertados']} añadidos, "
+            f"{informe['actualizados']} actualizados, {informe['errores']} errores."
+        )
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error en la importación {trabajo_id}: {e}")
+        _guardar_estado(
+            trabajo_id,
+            estado="fallido",
+            mensaje=str(e)[:500],
+            fecha_fin=datetime.now(timezone.utc),
+        )
+    finally:
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+
+def _procesar_en_contexto(app, trabajo_id):
+    """
+    Reclama y procesa un trabajo desde un hilo del grupo local.
+    """
+    with app.app_context():
+        try:
+            if reclamar_trabajo(trabajo_id) is not None:
+                procesar_trabajo(trabajo_id)
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error al procesar la importación {trabajo_id}: {e}")
+
+
+def _bucle_trabajador(app, una_vez, espera):
+    """
+    Reclama y procesa trabajos pendientes hasta que se detenga el proceso.
+
+    Args:
+        app (Flask): Aplicación cuyo contexto se usa en el hilo.
+        una_vez (bool): Si es True, termina cuando no quedan trabajos pendientes.
+        espera (int): Segundos entre consultas cuando la cola está vacía.
+    """
+    with app.app_context():
+        while True:
+            try:
+                trabajo_id = reclamar_trabajo()
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"Error al consultar la cola de importaciones: {e}")
+                trabajo_id = None
+            if trabajo_id is None:
+                if una_vez:
+                    return
+                time.sleep(espera)
+                continue
+            procesar_trabajo(trabajo_id)
+
+
+def ejecutar_trabajadores(hilos=None, una_vez=False, espera=None):
+    """
+    Procesa la cola de importaciones con un grupo de hilos trabajadores.
+
+    Args:
+        hilos (int, opcional): Número de hilos (por defecto IMPORTACION_HILOS).
+        una_vez (bool): Si es True, termina al vaciarse la cola.
+        espera (int, opcional): Segundos entre consultas a la cola vacía
+            (por defecto IMPORTACION_ESPERA).
+    """
+    app = current_app._get_current_object()
+    hilos = hilos or app.config["IMPORTACION_HILOS"]
+    espera = espera or app.config["IMPORTACION_ESPERA"]
+    with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="importacion") as grupo:
+        for _ in range(hilos):
+            grupo.submit(_bucle_trabajador, app, una_vez, espera)
+
+
+def reencolar_interrumpidos():
+    """
+    Devuelve a 'pendiente' los trabajos que quedaron 'en_proceso' al caerse un trabajador.
+
+    Reprocesar un archivo es seguro: los lotes ya guardados se actualizan por ISBN.
+
+    Returns:
+        int: Número de trabajos reencolados.
+    """
+    resultado = db.session.execute(
+        update(TrabajoImportacion)
+        .where(TrabajoImportacion.estado == "en_proceso")
+        .values(estado="pendiente")
+    )
+    db.session.commit()
+    return resultado.rowcount
+
+
+def trabajos_recientes(limite=10):
+    """
+    Obtiene los últimos trabajos de importación.
+
+    Args:
+        limite (int): Número máximo de trabajos.
+
+    Returns:
+        list: Trabajos ordenados del más reciente al más antiguo.
+    """
+    return (
+        db.session.execute(
+            select(TrabajoImportacion)
+            .order_by(TrabajoImportacion.id.desc())
+            .limit(limite)
+        )
+        .scalars()
+        .all()
+    )
@@ -0,0 +1,255 @@
+"""
+Módulo de validación por lotes de libros para la aplicación de biblioteca.
+
+Valida miles de libros candidatos de una vez con las mismas reglas que los
+validadores del modelo Libro: los dígitos de control de ISBN-10 e ISBN-13 se
+calculan con NumPy sobre una matriz de dígitos de todo el lote, los campos de
+texto se comprueban con la expresión regular precompilada del modelo y la
+unicidad de ISBN y título se resuelve con una consulta `IN (...)` por campo
+para todo el lote.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import numpy as np
+from sqlalchemy import select
+from extensions import db
+from src.models.models_libro import Libro, PATRON_TEXTO
+
+# Campos que se validan de cada libro
+CAMPOS = ("isbn", "titulo", "autor", "editorial", "genero", "cantidad")
+
+# Mensajes de los campos de texto: (vacío, formato no válido)
+_MENSAJES_TEXTO = {
+    "titulo": (
+        "El título no puede estar vacío.",
+        "El título solo puede contener letras, espacios, puntos y guiones.",
+    ),
+    "autor": (
+        "El autor no puede estar vacío.",
+        "El autor solo puede contener letras, espacios, puntos y guiones.",
+    ),
+    "editorial": (
+        "La editorial no puede estar vacía.",
+        "La editorial solo puede contener letras, espacios, puntos y guiones.",
+    ),
+    "genero": (
+        "El género no puede estar vacía.",
+        "El género solo puede contener letras, espacios, puntos y guiones.",
+    ),
+}
+
+_ISBN_VACIO = "El ISBN no puede estar vacío."
+_ISBN_CARACTERES = "El ISBN contiene caracteres no válidos."
+_ISBN_NO_VALIDO = (
+    "El ISBN no es válido. Ejemplo de ISBN-10: '0-306-40615-2'. "
+    "Ejemplo de ISBN-13: '978-3-16-148410-0'."
+)
+
+# Ancho de la matriz de dígitos (longitud de un ISBN-13)
+_ANCHO_ISBN = 13
+_PESOS_ISBN10 = np.arange(10, 0, -1)
+_PESOS_ISBN13 = np.tile([1, 3], 7)[:_ANCHO_ISBN]
+_CERO = ord("0")
+_EQUIS = ord("X")
+
+
+def validar_isbns(isbns):
+    """
+    Valida el formato y el dígito de control de una lista de ISBN.
+
+    Los ISBN limpios se copian a una matriz de bytes (un ISBN por fila,
+    rellenada con ceros hasta 13 posiciones) y las comprobaciones de
+    caracteres y las sumas ponderadas se hacen para todas las filas a la vez.
+
+    Args:
+        isbns (list): ISBN tal como se recibieron (con o sin guiones).
+
+    Returns:
+        tuple: Lista de ISBN limpios y lista paralela con el mensaje de error
+        de cada uno (None si es válido).
+    """
+    originales = [(isbn or "").strip() for isbn in isbns]
+    limpios = [Libro._limpiar_isbn(isbn) for isbn in originales]
+    total = len(limpios)
+    if not total:
+        return [], []
+
+    longitudes = np.fromiter((len(isbn) for isbn in limpios), dtype=np.int64, count=total)
+    # Los caracteres no ASCII se sustituyen por '?' y los sobrantes se recortan
+    # (un ISBN de más de 13 caracteres ya es inválido por su longitud).
+    bytes_isbn = b"".join(
+        isbn.encode("ascii", "replace")[:_ANCHO_ISBN].ljust(_ANCHO_ISBN, b"0")
+        for isbn in limpios
+    )
+    matriz = np.frombuffer(bytes_isbn, dtype=np.uint8).reshape(total, _ANCHO_ISBN)
+    digitos = matriz.astype(np.int64) - _CERO
+    es_digito = (digitos >= 0) & (digitos <= 9)
+
+    # Posición del último carácter de cada ISBN dentro de la matriz
+    ultima = np.clip(longitudes - 1, 0, _ANCHO_ISBN - 1)
+    filas = np.arange(total)
+    ultimo_es_digito = es_digito[filas, ultima]
+    ultimo_es_x = matriz[filas, ultima] == _EQUIS
+    antes_del_ultimo = np.arange(_ANCHO_ISBN) < ultima[:, None]
+    prefijo_numerico = np.all(es_digito | ~antes_del_ultimo, axis=1)
+    # Todo dígitos, o dígitos seguidos de una 'X' final
+    caracteres_validos = (
+        (longitudes > 0)
+        & prefijo_numerico
+        & (ultimo_es_digito | (ultimo_es_x & (longitudes > 1)))
+    )
+
+    # ISBN-10: la 'X' final vale 10 y la suma ponderada debe ser múltiplo de 11
+    valores10 = np.where(es_digito[:, :10], digitos[:, :10], 0)
+    valores10[:, 9] = np.where(ultimo_es_x, 10, valores10[:, 9])
+    isbn10_valido = (longitudes == 10) & ((valores10 @ _PESOS_ISBN10) % 11 == 0)
+
+    # ISBN-13: todos dígitos y la suma ponderada (1, 3, 1, ...) múltiplo de 10
+    valores13 = np.where(es_digito, digitos, 0)
+    isbn13_valido = (
+        (longitudes == _ANCHO_ISBN)
+        & ultimo_es_digito
+        & ((valores13 @ _PESOS_ISBN13) % 10 == 0)
+    )
+    valido = caracteres_validos & (isbn10_valido | isbn13_valido)
+
+    errores = []
+    for indice, (original, isbn) in enumerate(zip(originales, limpios)):
+        if not original:
+            errores.append(_ISBN_VACIO)
+        elif len(isbn) > _ANCHO_ISBN:
+            # Fuera de la matriz: se aplica la misma regla de caracteres en Python
+            caracteres = isbn.isdigit() or (
+                isbn[:-1].isdigit() and isbn[-1] in "0123456789X"
+            )
+            errores.append(_ISBN_NO_VALIDO if caracteres else _ISBN_CARACTERES)
+        elif not caracteres_validos[indice]:
+            errores.append(_ISBN_CARACTERES)
+        elif not valido[indice]:
+            errores.append(_ISBN_NO_VALIDO)
+        else:
+            errores.append(None)
+    return limpios, errores
+
+
+def _validar_texto(campo, valor):
+    """
+    Valida un campo de texto con la expresión regular del modelo.
+
+    Returns:
+        str | None: Mensaje de error, o None si es válido.
+    """
+    vacio, formato = _MENSAJES_TEXTO[campo]
+    if not valor:
+        return vacio
+    if not PATRON_TEXTO.match(valor):
+        return formato
+    return None
+
+
+def _validar_cantidad(valor):
+    """
+    Valida y convierte la cantidad de ejemplares.
+
+    Returns:
+        tuple: Cantidad entera (o None) y mensaje de error (o None).
+    """
+    if not valor:
+        return None, "La cantidad no puede estar vacía."
+    if not valor.isdigit():
+        return None, "La cantidad debe ser un número entero."
+    cantidad = int(valor)
+    if cantidad <= 0:
+        return None, "La cantidad debe ser mayor que 0."
+    return cantidad, None
+
+
+def _comprobar_unicidad(resultados):
+    """
+    Marca los ISBN y títulos que ya existen en la base de datos o se repiten en el lote.
+
+    Hace una única consulta `IN (...)` por campo para todo el lote. Los libros
+    con 'id' (ediciones) no chocan consigo mismos.
+    """
+    for campo, mensaje in (
+        ("isbn", "El ISBN ya existe en la base de datos."),
+        ("titulo", "El título ya existe en la base de datos."),
+    ):
+        columna = getattr(Libro, campo)
+        valores = {
+            resultado["libro"][campo]
+            for resultado in resultados
+            if campo not in resultado["errores"]
+        }
+        existentes = {}
+        if valores:
+            for libro_id, valor in db.session.execute(
+                select(Libro.id, columna).where(columna.in_(valores))
+            ):
+                existentes.setdefault(valor, set()).add(libro_id)
+
+        vistos = {}
+        for indice, resultado in enumerate(resultados):
+            if campo in resultado["errores"]:
+                continue
+            valor = resultado["libro"][campo]
+            propietarios = existentes.get(valor, set()) - {resultado["libro"].get("id")}
+            if propietarios:
+                resultado["errores"][campo] = mensaje
+            elif valor in vistos:
+                resultado["errores"][campo] = (
+                    f"Repetido en el lote (registro {vistos[valor] + 1})."
+                )
+            else:
+                vistos[valor] = indice
+
+
+def validar_lote(libros, comprobar_unicidad=True):
+    """
+    Valida un lote de libros candidatos con las reglas del modelo Libro.
+
+    Args:
+        libros (list): Diccionarios con los campos isbn, titulo, autor,
+            editorial, genero y cantidad (y opcionalmente 'id' si se trata de
+            libros existentes que se editan).
+        comprobar_unicidad (bool): Si es True, comprueba que ISBN y título no
+            existan ya en la base de datos ni se repitan en el lote.
+
+    Returns:
+        list: Un resultado por libro, en el mismo orden, con las claves:
+            - valido (bool): True si no hay errores.
+            - errores (dict): Mensaje de error por campo.
+            - libro (dict): Valores normalizados (ISBN limpio, textos sin
+              espacios sobrantes y cantidad entera o None).
+    """
+    isbns, errores_isbn = validar_isbns([libro.get("isbn") for libro in libros])
+
+    resultados = []
+    for libro, isbn, error_isbn in zip(libros, isbns, errores_isbn):
+        normalizado = {"isbn": isbn}
+        errores = {}
+        if error_isbn:
+            errores["isbn"] = error_isbn
+        for campo in _MENSAJES_TEXTO:
+            valor = str(libro.get(campo) or "").strip()
+            normalizado[campo] = valor
+            error = _validar_texto(campo, valor)
+            if error:
+                errores[campo] = error
+        cantidad = libro.get("cantidad")
+        normalizado["cantidad"], error = _validar_cantidad(
+            "" if cantidad is None else str(cantidad).strip()
+        )
+        if error:
+            errores["cantidad"] = error
+        if libro.get("id") is not None:
+            normalizado["id"] = libro["id"]
+        resultados.append({"errores": errores, "libro": normalizado})
+
+    if comprobar_unicidad:
+        _comprobar_unicidad(resultados)
+    for resultado in resultados:
+        resultado["valido"] = not resultado["errores"]
+    return resultados
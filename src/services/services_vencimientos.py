@@ -0,0 +1,181 @@
+"""
+Módulo de vencimiento de préstamos para la aplicación de biblioteca.
+
+Mantiene el estado 'vencido' de los préstamos en la base de datos: un proceso
+periódico (`flask marcar-vencidos`) pasa a 'vencido' los préstamos activos
+cuyo plazo (PRESTAMOS_DIAS) ha terminado, con un UPDATE por bloque de IDs y
+una transacción corta por bloque para no bloquear la tabla durante mucho
+tiempo. Así los listados y conteos de préstamos vencidos son consultas
+indexadas por estado en lugar de calcular `esta_vencido()` en Python sobre
+todos los préstamos activos.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import func, select, update
+from extensions import db
+from src.models.models_prestamo import Prestamo
+
+
+def fecha_limite_vencimiento(ahora=None):
+    """
+    Calcula la fecha de préstamo a partir de la cual un préstamo no está vencido.
+
+    Args:
+        ahora (datetime, opcional): Momento de referencia (por defecto, ahora en UTC).
+
+    Returns:
+        datetime: Los préstamos anteriores a esta fecha están vencidos.
+    """
+    ahora = ahora or datetime.now(timezone.utc)
+    return ahora - timedelta(days=current_app.config["PRESTAMOS_DIAS"])
+
+
+def _condiciones_por_vencer(limite):
+    """
+    Condiciones de los préstamos activos prestados antes de `limite`.
+    """
+    return (
+        Prestamo.estado == "activo",
+        Prestamo.fecha_prestamo < limite,
+        Prestamo.fecha_devolucion.is_(None),
+    )
+
+
+def consulta_por_vencer(limite, tamano_lote):
+    """
+    Construye la consulta del siguiente bloque de préstamos que hay que marcar como vencidos.
+
+    Args:
+        limite (datetime): Fecha de préstamo a partir de la cual aún no vencen.
+        tamano_lote (int): Préstamos por bloque.
+
+    Returns:
+        Select: IDs de los préstamos, del más antiguo al más reciente.
+    """
+    return (
+        select(Prestamo.id)
+        .where(*_condiciones_por_vencer(limite))
+        .order_by(Prestamo.fecha_prestamo)
+        .limit(tamano_lote)
+    )
+
+
+def marcar_vencidos(tamano_lote=None, ahora=None):
+    """
+    Marca como 'vencido' los préstamos activos cuyo plazo ha terminado.
+
+    Procesa los préstamos por bloques de IDs: cada bloque se selecciona con el
+    índice (estado, fecha_prestamo), se actualiza con un único UPDATE y se
+    confirma en su propia transacción. Los préstamos marcados (o devueltos
+    mientras tanto) dejan de cumplir las condiciones, así que cada bloque
+    vuelve a pedir los primeros pendientes. El UPDATE repite las condiciones
+    para no marcar un préstamo devuelto entre la selección y la actualización.
+
+    El cambio de estado no altera el catálogo (ejemplares ni contadores), por
+    lo que no se declaran cambios para las cachés.
+
+    Args:
+        tamano_lote (int, opcional): Préstamos por bloque (por defecto
+            VENCIMIENTOS_TAMANO_LOTE).
+        ahora (datetime, opcional): Momento de referencia.
+
+    Returns:
+        int: Número de préstamos marcados como vencidos.
+    """
+    tamano_lote = tamano_lote or current_app.config["VENCIMIENTOS_TAMANO_LOTE"]
+    limite = fecha_limite_vencimiento(ahora)
+    condiciones = _condiciones_por_vencer(limite)
+    total = 0
+    while True:
+        ids = (
+            db.session.execute(consulta_por_vencer(limite, tamano_lote))
+            .scalars()
+            .all()
+        )
+        if not ids:
+            break
+        resultado = db.session.execute(
+            update(Prestamo)
+            .where(Prestamo.id.in_(ids), *condiciones)
+            .values(estado="vencido")
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        total += resultado.rowcount
+        if len(ids) < tamano_lote:
+            break
+    return total
+
+
+def consulta_vencidos():
+    """
+    Devuelve la consulta de los préstamos vencidos sin devolver.
+
+    Returns:
+        Select: Consulta de Prestamo filtrada por estado, más antiguos primero.
+    """
+    return (
+        select(Prestamo)
+        .where(Prestamo.estado == "vencido", Prestamo.fecha_devolucion.is_(None))
+        .order_by(Prestamo.fecha_prestamo, Prestamo.id)
+    )
+
+
+def consulta_contar_vencidos(usuario_id=None):
+    """
+    Construye la consulta que cuenta los préstamos vencidos sin devolver.
+
+    Args:
+        usuario_id (int, opcional): ID del usuario.
+
+    Returns:
+        Select: Consulta con el número de préstamos vencidos.
+    """
+    consulta = (
+        select(func.count())
+        .select_from(Prestamo)
+        .where(Prestamo.estado == "vencido", Prestamo.fecha_devolucion.is_(None))
+    )
+    if usuario_id is not None:
+        consulta = consulta.where(Prestamo.usuario_id == usuario_id)
+    return consulta
+
+
+def contar_vencidos(usuario_id=None):
+    """
+    Cuenta los préstamos vencidos sin devolver, de todos o de un usuario.
+
+    Args:
+        usuario_id (int, opcional): ID del usuario.
+
+    Returns:
+        int: Número de préstamos vencidos.
+    """
+    return db.session.execute(consulta_contar_vencidos(usuario_id)).scalar()
+
+
+def ejecutar_marcado_periodico(intervalo=None, tamano_lote=None):
+    """
+    Marca los préstamos vencidos cada `intervalo` segundos hasta que se detenga el proceso.
+
+    Args:
+        intervalo (int, opcional): Segundos entre pasadas (por defecto
+            VENCIMIENTOS_INTERVALO).
+        tamano_lote (int, opcional): Préstamos por bloque.
+    """
+    intervalo = intervalo or current_app.config["VENCIMIENTOS_INTERVALO"]
+    while True:
+        try:
+            total = marcar_vencidos(tamano_lote=tamano_lote)
+            if total:
+                logging.info(f"Préstamos marcados como vencidos: {total}.")
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error al marcar préstamos vencidos: {e}")
+        time.sleep(intervalo)
@@ -0,0 +1,181 @@
+"""
+Módulo de versión del catálogo y peticiones condicionales para la aplicación de biblioteca.
+
+Cada transacción que modifica libros o préstamos incrementa, justo después
+de confirmarse y en una transacción propia, el contador de la tabla
+`version_catalogo`: los préstamos y devoluciones no bloquean esa fila común
+mientras duran, solo el instante del incremento. Las páginas del
+catálogo derivan de ese contador un ETag fuerte y la cabecera Last-Modified:
+si el navegador envía un `If-None-Match` que coincide, se responde 304 sin
+consultar el catálogo ni renderizar la plantilla.
+
+La versión se guarda en una caché por proceso que se invalida al confirmar
+cambios en el propio proceso; los cambios hechos por otros procesos se ven
+como mucho VERSION_CATALOGO_TTL segundos después.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import hashlib
+import logging
+from datetime import datetime, timezone
+from functools import wraps
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import event, exc, select
+from sqlalchemy.orm import Session
+from extensions import db
+from src.models.models_libro import Libro
+from src.models.models_prestamo import Prestamo
+from src.models.models_version import VersionCatalogo
+from src.services.services_cache import CacheLocal
+from src.services.services_eventos import (
+    cambios_confirmados,
+    cambios_pendientes,
+    seguir_cambios,
+)
+
+# Modelos cuyos cambios cambian la versión del catálogo
+MODELOS_VERSIONADOS = (Libro, Prestamo)
+
+# ID de la única fila de `version_catalogo`
+_FILA_VERSION = 1
+
+_cache_version = CacheLocal()
+
+
+# Se registra delante de los demás oyentes de after_commit para leer los
+# cambios antes de que `services_eventos` los emita y los descarte.
+@event.listens_for(Session, "after_commit", insert=True)
+def _incrementar_version(session):
+    """
+    Incrementa la versión del catálogo si la transacción confirmada modificó libros o préstamos.
+
+    El incremento se hace en una transacción propia y corta, fuera de la que
+    registró el préstamo o la devolución, así que la fila de la versión solo
+    se bloquea lo que dura el UPDATE. Al ser un `version + 1` en la base de
+    datos, dos incrementos concurrentes nunca obtienen la misma versión. Si
+    falla, los datos ya están confirmados: se registra el error y las páginas
+    se revalidan al caducar la caché de la versión.
+    """
+    pendientes = cambios_pendientes(session)
+    if not any(modelo in pendientes for modelo in MODELOS_VERSIONADOS):
+        return
+    tabla = VersionCatalogo.__table__
+    ahora = datetime.now(timezone.utc)
+    try:
+        with session.get_bind(mapper=VersionCatalogo).begin() as connection:
+            resultado = connection.execute(
+                tabla.update()
+                .where(tabla.c.id == _FILA_VERSION)
+                .values(version=tabla.c.version + 1, fecha_modificacion=ahora)
+            )
+            if resultado.rowcount == 0:
+                connection.execute(
+                    tabla.insert().values(
+                        id=_FILA_VERSION, version=1, fecha_modificacion=ahora
+                    )
+                )
+    except exc.SQLAlchemyError as e:
+        logging.error(f"Error al incrementar la versión del catálogo: {e}")
+
+
+def _leer_version():
+    """
+    Lee la versión del catálogo y la fecha de su último cambio.
+    """
+    fila = db.session.execute(
+        select(VersionCatalogo.version, VersionCatalogo.fecha_modificacion).where(
+            VersionCatalogo.id == _FILA_VERSION
+        )
+    ).first()
+    return (fila.version, fila.fecha_modificacion) if fila else (0, None)
+
+
+def version_catalogo():
+    """
+    Obtiene la versión actual del catálogo.
+
+    Returns:
+        tuple: Versión (int) y fecha de la última modificación (datetime en
+        UTC o None si el catálogo no ha cambiado nunca).
+    """
+    return _cache_version.obtener(
+        "version",
+        _leer_version,
+        ttl=current_app.config["VERSION_CATALOGO_TTL"],
+    )
+
+
+def _etag(version):
+    """
+    Calcula el ETag de la petición actual para una versión del catálogo.
+
+    Incluye la ruta con sus parámetros y el usuario, porque la página muestra
+    su nombre y opciones distintas según su rol.
+    """
+    if current_user.is_authenticated:
+        usuario = f"{current_user.id}:{current_user.rol}:{current_user.nombre}"
+    else:
+        usuario = "anonimo"
+    clave = f"{version}|{request.full_path}|{usuario}"
+    return hashlib.sha1(clave.encode("utf-8")).hexdigest()
+
+
+def _preparar(respuesta, etag, fecha):
+    """
+    Añade a la respuesta el ETag, Last-Modified y la política de caché.
+    """
+    respuesta.set_etag(etag)
+    if fecha is not None:
+        respuesta.last_modified = fecha
+    # El navegador puede guardar la página, pero debe revalidarla siempre
+    respuesta.cache_control.private = True
+    respuesta.cache_control.no_cache = True
+    return respuesta
+
+
+def respuesta_condicional(vista):
+    """
+    Decorador que responde 304 a las peticiones GET cuyo ETag sigue vigente.
+
+    Debe aplicarse después de los decoradores de autenticación y permisos.
+    Las páginas con mensajes flash pendientes se renderizan siempre y no
+    llevan ETag, porque el mensaje solo se muestra una vez.
+
+    Args:
+        vista (function): Vista que renderiza una página del catálogo.
+
+    Returns:
+        function: Vista decorada.
+    """
+
+    @wraps(vista)
+    def decorada(*args, **kwargs):
+        if request.method not in ("GET", "HEAD") or session.get("_flashes"):
+            return vista(*args, **kwargs)
+
+        version, fecha = version_catalogo()
+        etag = _etag(version)
+        if request.if_none_match.contains(etag):
+            return _preparar(make_response("", 304), etag, fecha)
+
+        respuesta = make_response(vista(*args, **kwargs))
+        if respuesta.status_code == 200:
+            _preparar(respuesta, etag, fecha)
+        return respuesta
+
+    return decorada
+
+
+seguir_cambios(Prestamo)
+
+
+@cambios_confirmados.connect_via(Libro)
+@cambios_confirmados.connect_via(Prestamo)
+def _invalidar_version(modelo, cambios):
+    """
+    Descarta la versión cacheada tras confirmar cambios en libros o préstamos.
+    """
+    _cache_version.invalidar()
@@ -2,15 +2,17 @@
 document.addEventListener('DOMContentLoaded', () => {
     // Función genérica para mostrar confirmaciones
     function agregarConfirmacion(selector, mensajeCallback) {
-        const buttons = document.querySelectorAll(selector);
-        buttons.forEach((button) => {
-            button.addEventListener('click', function (e) {
-                const mensaje = mensajeCallback(button);
-                const confirmacion = confirm(mensaje);
-                if (!confirmacion) {
-                    e.preventDefault(); // Cancelar la acción si el usuario no confirma
-                }
-            });
+        // Delegado en el documento para cubrir también los botones cargados después
+        document.addEventListener('click', function (e) {
+            const button = e.target.closest(selector);
+            if (!button) {
+                return;
+            }
+            const mensaje = mensajeCallback(button);
+            const confirmacion = confirm(mensaje);
+            if (!confirmacion) {
+                e.preventDefault(); // Cancelar la acción si el usuario no confirma
+            }
         });
     }
 
@@ -31,6 +33,61 @@ document.addEventListener('DOMContentLoaded', () => {
         return `¿Estás seguro de que deseas ${accion} el libro "${libroTitulo}"?`;
     });
 
+    // Carga diferida de los libros de cada autor, género o título
+    function cargarMiembros(lista, url) {
+        fetch(url)
+            .then((response) => response.text())
+            .then((html) => {
+                lista.insertAdjacentHTML('beforeend', html);
+            })
+            .catch((error) => console.error('Error al cargar los libros:', error));
+    }
+
+    document.querySelectorAll('.faceta-miembros').forEach((lista) => {
+        const panel = lista.closest('.accordion-collapse');
+        panel.addEventListener('show.bs.collapse', () => {
+            if (!lista.dataset.cargado) {
+                lista.dataset.cargado = 'true';
+                lista.innerHTML = '';
+                cargarMiembros(lista, lista.dataset.miembrosUrl);
+            }
+        });
+    });
+
+    // Botón "Ver más" para la siguiente página de libros de una faceta
+    document.addEventListener('click', (e) => {
+        const boton = e.target.closest('.btn-ver-mas');
+        if (boton) {
+            const lista = boton.closest('.faceta-miembros');
+            boton.closest('li').remove();
+            cargarMiembros(lista, boton.dataset.url);
+        }
+    });
+
+    // Seguimiento del progreso de una importación en segundo plano
+    const trabajoImportacion = document.querySelector('#trabajo-importacion');
+    if (trabajoImportacion && trabajoImportacion.dataset.terminado !== 'true') {
+        const barra = trabajoImportacion.querySelector('.progress-bar');
+        const consultarEstado = () => {
+            fetch(trabajoImportacion.dataset.estadoUrl)
+                .then((response) => response.json())
+                .then((estado) => {
+                    trabajoImportacion.querySelectorAll('[data-campo]').forEach((elemento) => {
+                        elemento.textContent = estado[elemento.dataset.campo];
+                    });
+                    barra.style.width = `${estado.porcentaje}%`;
+                    barra.setAttribute('aria-valuenow', estado.porcentaje);
+                    if (estado.terminado) {
+                        window.location.reload(); // Mostrar el informe de errores final
+                    } else {
+                        setTimeout(consultarEstado, 2000);
+                    }
+                })
+                .catch(() => setTimeout(consultarEstado, 5000));
+        };
+        setTimeout(consultarEstado, 2000);
+    }
+
     // Funciones de validación
     function campoNoVacio(valor) {
         return valor.trim() !== '';
@@ -0,0 +1,37 @@
+"""
+Configuración de pruebas para la aplicación de biblioteca.
+
+La carga `create_app(testing=True)`: hereda la configuración general y usa una
+base SQLite en memoria, sin protección CSRF ni cookies seguras y sin enviar
+correos, para que las pruebas no necesiten un servidor MySQL ni SMTP.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+from config import Config
+
+
+class TestConfig(Config):
+    """
+    Configuración de la aplicación durante las pruebas.
+
+    Attributes:
+        TESTING (bool): Activa el modo de pruebas de Flask.
+        SQLALCHEMY_DATABASE_URI (str): Base de datos SQLite en memoria.
+        WTF_CSRF_ENABLED (bool): Desactiva la protección CSRF de los formularios.
+        SERVER_NAME (str): Sin nombre de servidor fijo, para el cliente de pruebas.
+        SESSION_COOKIE_SECURE (bool): Permite la cookie de sesión sin HTTPS.
+        MAIL_SUPPRESS_SEND (bool): Registra los correos sin conectar con un servidor SMTP.
+        MAIL_DEFAULT_SENDER (str): Remitente de los correos de prueba.
+        RECORDATORIOS_POR_SEGUNDO (float): Sin límite de ritmo en los envíos.
+    """
+
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    WTF_CSRF_ENABLED = False
+    SERVER_NAME = None
+    SESSION_COOKIE_SECURE = False
+    MAIL_SUPPRESS_SEND = True
+    MAIL_DEFAULT_SENDER = "biblioteca@ejemplo.com"
+    RECORDATORIOS_POR_SEGUNDO = 0
@@ -0,0 +1,157 @@
+"""
+Fixtures compartidas de las pruebas de la aplicación de biblioteca.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import itertools
+import pytest
+from sqlalchemy import select
+from extensions import db
+from main import create_app
+from src.models.models_libro import Libro
+from src.models.models_reserva import Reserva
+from src.models.models_resumen import ResumenCatalogo
+from src.models.models_usuario import Usuario
+from src.services.services_resumen import reconstruir_resumen
+
+
+@pytest.fixture
+def app():
+    """
+    Crea la aplicación con la configuración de pruebas.
+
+    pytest-flask la usa para su fixture `client` y para abrir el contexto de
+    la aplicación en cada prueba.
+
+    Returns:
+        Flask: Instancia de la aplicación configurada para pruebas.
+    """
+    return create_app(testing=True)
+
+
+@pytest.fixture
+def base(app):
+    """
+    Crea el esquema en la base de datos en memoria y lo elimina al terminar.
+
+    Returns:
+        SQLAlchemy: Extensión de base de datos, con el contexto de la aplicación abierto.
+    """
+    with app.app_context():
+        db.create_all()
+        yield db
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def crear_libro(base):
+    """
+    Devuelve una función que crea un libro con los ejemplares indicados.
+
+    Returns:
+        function: Recibe `cantidad` y, opcionalmente, otras columnas del
+        libro, y devuelve su ID.
+    """
+    numeros = itertools.count(1)
+
+    def crear(cantidad=1, **columnas):
+        numero = next(numeros)
+        libro = Libro(
+            isbn=f"978{numero:010d}",
+            titulo=f"Libro {numero}",
+            autor="Autor de prueba",
+            editorial="Editorial de prueba",
+            genero="Novela",
+            cantidad=cantidad,
+        )
+        for nombre, valor in columnas.items():
+            setattr(libro, nombre, valor)
+        db.session.add(libro)
+        db.session.commit()
+        return libro.id
+
+    return crear
+
+
+@pytest.fixture
+def crear_usuario(base):
+    """
+    Devuelve una función que crea un usuario con el correo confirmado.
+
+    Returns:
+        function: Recibe opcionalmente el `rol` y devuelve el ID del usuario.
+    """
+    numeros = itertools.count(1)
+
+    def crear(rol="usuario"):
+        numero = next(numeros)
+        usuario = Usuario(
+            nombre="Usuario de prueba",
+            email=f"usuario{numero}@ejemplo.com",
+            rol=rol,
+            email_confirmado=True,
+        )
+        usuario.set_password("Contrasena1!")
+        db.session.add(usuario)
+        db.session.commit()
+        return usuario.id
+
+    return crear
+
+
+@pytest.fixture
+def crear_reserva(base):
+    """
+    Devuelve una función que añade una reserva pendiente a la cola de un libro.
+
+    Returns:
+        function: Recibe el ID del libro y el del usuario y devuelve el ID de
+        la reserva.
+    """
+
+    def crear(libro_id, usuario_id):
+        reserva = Reserva(libro_id=libro_id, usuario_id=usuario_id)
+        db.session.add(reserva)
+        db.session.commit()
+        return reserva.id
+
+    return crear
+
+
+def _filas_resumen():
+    """
+    Lee los contadores del catálogo sin las filas que han quedado a cero.
+    """
+    filas = db.session.execute(
+        select(
+            ResumenCatalogo.dimension,
+            ResumenCatalogo.valor,
+            ResumenCatalogo.libros,
+            ResumenCatalogo.disponibles,
+            ResumenCatalogo.prestados,
+        ).order_by(ResumenCatalogo.dimension, ResumenCatalogo.valor)
+    ).all()
+    return [tuple(fila) for fila in filas if any(fila[2:])]
+
+
+@pytest.fixture
+def comprobar_resumen(base):
+    """
+    Devuelve una función que comprueba que los contadores del catálogo están al día.
+
+    Compara la tabla de resumen, mantenida con deltas en cada escritura, con
+    la que calcula `reconstruir_resumen()` desde libros y préstamos.
+
+    Returns:
+        function: Función sin argumentos que falla si no coinciden.
+    """
+
+    def comprobar():
+        mantenido = _filas_resumen()
+        reconstruir_resumen()
+        assert mantenido == _filas_resumen()
+
+    return comprobar
@@ -0,0 +1,37 @@
+"""
+Pruebas de los planes de las consultas frecuentes.
+
+Comprueban con `verificar_planes(base_temporal=True)` que ninguna de las
+consultas que construye la aplicación recorre una tabla completa.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import pytest
+from main import create_app
+from src.services.services_planes import CONSULTAS_FRECUENTES, verificar_planes
+
+
+@pytest.fixture(scope="module")
+def planes():
+    """
+    Obtiene una sola vez los planes de las consultas frecuentes sobre una base temporal.
+
+    Returns:
+        dict: Resultado de `verificar_planes` por nombre de consulta.
+    """
+    with create_app(testing=True).app_context():
+        return {
+            resultado["nombre"]: resultado
+            for resultado in verificar_planes(base_temporal=True)
+        }
+
+
+@pytest.mark.parametrize("nombre", list(CONSULTAS_FRECUENTES))
+def test_consulta_usa_indices(planes, nombre):
+    """
+    La consulta no recorre ninguna tabla completa.
+    """
+    resultado = planes[nombre]
+    assert not resultado["escaneo_completo"], "\n".join(resultado["plan"])
@@ -0,0 +1,134 @@
+"""
+Pruebas de los préstamos y devoluciones del mostrador.
+
+Comprueban que los ejemplares se descuentan y reponen con sentencias
+relativas que no pisan otros préstamos, que una devolución no se registra
+dos veces y que los contadores del catálogo siguen al día.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import pytest
+from sqlalchemy import select
+from extensions import db
+from src.models.models_libro import Libro
+from src.models.models_prestamo import Prestamo
+from src.services.services_prestamos import (
+    devolver_lote,
+    devolver_prestamo,
+    prestar_lote,
+    realizar_prestamo,
+)
+
+
+def _cantidad(libro_id):
+    """
+    Lee los ejemplares disponibles de un libro.
+    """
+    return db.session.execute(
+        select(Libro.cantidad).where(Libro.id == libro_id)
+    ).scalar()
+
+
+def test_devolucion_no_pisa_un_prestamo_simultaneo(
+    crear_libro, crear_usuario, comprobar_resumen
+):
+    """
+    Devolver un préstamo cargado antes de otro préstamo del mismo libro suma un ejemplar.
+    """
+    libro_id = crear_libro(cantidad=2)
+    prestamo = db.session.get(Prestamo, realizar_prestamo(libro_id, crear_usuario()))
+    assert prestamo.libro.cantidad == 1
+
+    # Como en otra petición, el préstamo y su libro conservan los valores ya leídos
+    db.session().expire_on_commit = False
+    realizar_prestamo(libro_id, crear_usuario())
+    assert prestamo.libro.cantidad == 1
+    prestamo.marcar_como_devuelto()
+
+    assert _cantidad(libro_id) == 1
+    comprobar_resumen()
+
+
+def test_devolucion_repetida_falla(crear_libro, crear_usuario, comprobar_resumen):
+    """
+    Un préstamo ya devuelto no repone otra vez el ejemplar.
+    """
+    libro_id = crear_libro(cantidad=1)
+    prestamo_id = realizar_prestamo(libro_id, crear_usuario())
+    devolver_prestamo(prestamo_id)
+
+    with pytest.raises(ValueError, match="ya ha sido devuelto"):
+        devolver_prestamo(prestamo_id)
+    assert _cantidad(libro_id) == 1
+    comprobar_resumen()
+
+
+def test_prestamo_sin_ejemplares_falla(crear_libro, crear_usuario, comprobar_resumen):
+    """
+    No se presta un libro sin ejemplares disponibles.
+    """
+    libro_id = crear_libro(cantidad=1)
+    realizar_prestamo(libro_id, crear_usuario())
+
+    with pytest.raises(ValueError, match="No hay ejemplares"):
+        realizar_prestamo(libro_id, crear_usuario())
+    assert _cantidad(libro_id) == 0
+    comprobar_resumen()
+
+
+def test_lote_devuelve_un_prestamo_por_escaneo(
+    crear_libro, crear_usuario, comprobar_resumen
+):
+    """
+    Cada escaneo de un libro cierra su préstamo sin devolver más antiguo.
+    """
+    libro_id = crear_libro(cantidad=3)
+    prestamo_ids = [
+        realizar_prestamo(libro_id, crear_usuario(), limite=5) for _ in range(3)
+    ]
+
+    resultados = devolver_lote([str(libro_id)] * 4)
+
+    assert [resultado["correcto"] for resultado in resultados] == [
+        True,
+        True,
+        True,
+        False,
+    ]
+    devueltos = db.session.execute(
+        select(Prestamo.id)
+        .where(Prestamo.id.in_(prestamo_ids), Prestamo.estado == "devuelto")
+        .order_by(Prestamo.id)
+    ).scalars().all()
+    assert devueltos == prestamo_ids
+    assert _cantidad(libro_id) == 3
+    comprobar_resumen()
+
+
+def test_lote_respeta_el_limite_del_usuario(
+    crear_libro, crear_usuario, comprobar_resumen
+):
+    """
+    Los códigos que superan el límite del usuario se rechazan sin afectar al resto.
+    """
+    libro_ids = [crear_libro(cantidad=1) for _ in range(3)]
+
+    resultados = prestar_lote(crear_usuario(), [str(i) for i in libro_ids], limite=2)
+
+    assert [resultado["correcto"] for resultado in resultados] == [True, True, False]
+    assert [_cantidad(libro_id) for libro_id in libro_ids] == [0, 0, 1]
+    comprobar_resumen()
+
+
+@pytest.mark.parametrize("usuario_id", ["abc", None])
+def test_lote_con_usuario_no_valido_falla(crear_libro, usuario_id):
+    """
+    Un ID de usuario que no es un número se rechaza con un mensaje en español.
+    """
+    libro_id = crear_libro(cantidad=1)
+
+    with pytest.raises(ValueError, match="El usuario seleccionado no existe."):
+        prestar_lote(usuario_id, [str(libro_id)])
+    assert _cantidad(libro_id) == 1
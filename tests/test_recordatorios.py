@@ -0,0 +1,102 @@
+"""
+Pruebas de la campaña de recordatorios de préstamos.
+
+Se ejecutan con MAIL_SUPPRESS_SEND, de modo que los mensajes se registran
+con `mail.record_messages()` en lugar de enviarse a un servidor SMTP.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+import smtplib
+from datetime import datetime, timedelta, timezone
+import flask_mail
+from sqlalchemy import select, update
+from extensions import db, mail
+from src.models.models_prestamo import Prestamo
+from src.models.models_usuario import Usuario
+from src.services.services_prestamos import realizar_prestamo
+from src.services.services_recordatorios import enviar_recordatorios
+
+
+def _prestamo(libro_id, usuario_id, dias):
+    """
+    Crea un préstamo hecho hace `dias` días.
+    """
+    prestamo_id = realizar_prestamo(libro_id, usuario_id)
+    db.session.execute(
+        update(Prestamo)
+        .where(Prestamo.id == prestamo_id)
+        .values(fecha_prestamo=datetime.now(timezone.utc) - timedelta(days=dias))
+    )
+    db.session.commit()
+    return prestamo_id
+
+
+def _con_recordatorio():
+    """
+    Devuelve los IDs de los préstamos con fecha de recordatorio.
+    """
+    return set(
+        db.session.execute(
+            select(Prestamo.id).where(Prestamo.fecha_recordatorio.isnot(None))
+        ).scalars()
+    )
+
+
+def test_recordatorio_solo_de_los_enviados(app, crear_libro, crear_usuario, monkeypatch):
+    """
+    Solo se registra el recordatorio de los préstamos cuyo correo se ha enviado.
+    """
+    libro_id = crear_libro(cantidad=5)
+    plazo = app.config["PRESTAMOS_DIAS"]
+    enviado = _prestamo(libro_id, crear_usuario(), plazo - 1)
+    rechazado = _prestamo(libro_id, crear_usuario(), plazo - 1)
+    # Un préstamo de hoy todavía no necesita recordatorio
+    _prestamo(libro_id, crear_usuario(), 0)
+    correo_rechazado = db.session.get(
+        Usuario, db.session.get(Prestamo, rechazado).usuario_id
+    ).email
+
+    enviar_original = flask_mail.Connection.send
+
+    def enviar(conexion, mensaje, *args, **kwargs):
+        if correo_rechazado in mensaje.recipients:
+            raise smtplib.SMTPRecipientsRefused({correo_rechazado: (550, b"No existe")})
+        return enviar_original(conexion, mensaje, *args, **kwargs)
+
+    monkeypatch.setattr(flask_mail.Connection, "send", enviar)
+
+    with mail.record_messages() as enviados:
+        resumen = enviar_recordatorios()
+
+    assert resumen == {"enviados": 1, "fallidos": 1}
+    assert [mensaje.recipients for mensaje in enviados] == [
+        [db.session.get(Usuario, db.session.get(Prestamo, enviado).usuario_id).email]
+    ]
+    assert _con_recordatorio() == {enviado}
+
+    # Una segunda campaña no repite el recordatorio ya enviado
+    with mail.record_messages() as enviados:
+        resumen = enviar_recordatorios()
+    assert resumen == {"enviados": 0, "fallidos": 1}
+    assert enviados == []
+
+
+def test_recordatorio_respeta_el_maximo(app, crear_libro, crear_usuario):
+    """
+    Con `maximo`, los préstamos que no se llegan a avisar quedan pendientes.
+    """
+    libro_id = crear_libro(cantidad=5)
+    plazo = app.config["PRESTAMOS_DIAS"]
+    prestamo_ids = [
+        _prestamo(libro_id, crear_usuario(), plazo - 1 - numero) for numero in range(3)
+    ]
+
+    with mail.record_messages() as enviados:
+        resumen = enviar_recordatorios(maximo=2)
+
+    assert resumen == {"enviados": 2, "fallidos": 0}
+    assert len(enviados) == 2
+    # Se avisa primero de los préstamos más antiguos
+    assert _con_recordatorio() == set(prestamo_ids[:2])
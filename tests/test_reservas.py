@@ -0,0 +1,156 @@
+"""
+Pruebas de la cola de espera de reservas.
+
+Comprueban que un ejemplar devuelto se aparta para la primera reserva de la
+cola, que aprobarla presta ese ejemplar sin volver a descontarlo y que, al
+rechazarla o caducar, pasa a la siguiente reserva o vuelve a los
+disponibles, con los contadores del catálogo al día en cada paso.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import select
+from extensions import db
+from src.models.models_libro import Libro
+from src.models.models_prestamo import Prestamo
+from src.models.models_reserva import Reserva
+from src.services.services_prestamos import devolver_prestamo, realizar_prestamo
+from src.services.services_reservas import procesar_reservas
+
+
+def _cantidad(libro_id):
+    """
+    Lee los ejemplares disponibles de un libro.
+    """
+    return db.session.execute(
+        select(Libro.cantidad).where(Libro.id == libro_id)
+    ).scalar()
+
+
+def _estado(reserva_id):
+    """
+    Lee el estado de una reserva.
+    """
+    return db.session.execute(
+        select(Reserva.estado).where(Reserva.id == reserva_id)
+    ).scalar()
+
+
+@pytest.fixture
+def libro_con_cola(crear_libro, crear_usuario, crear_reserva, comprobar_resumen):
+    """
+    Crea un libro de un ejemplar prestado y una cola de dos reservas.
+
+    Returns:
+        dict: IDs del 'libro', del 'prestamo' y de las reservas 'primera' y
+        'segunda' de la cola.
+    """
+    libro_id = crear_libro(cantidad=1)
+    prestamo_id = realizar_prestamo(libro_id, crear_usuario())
+    primera = crear_reserva(libro_id, crear_usuario())
+    segunda = crear_reserva(libro_id, crear_usuario())
+    assert _cantidad(libro_id) == 0
+    comprobar_resumen()
+    return {
+        "libro": libro_id,
+        "prestamo": prestamo_id,
+        "primera": primera,
+        "segunda": segunda,
+    }
+
+
+def test_devolucion_aparta_ejemplar_para_la_cola(libro_con_cola, comprobar_resumen):
+    """
+    Al devolver un libro con reservas en espera, el ejemplar se aparta para la primera.
+    """
+    devolver_prestamo(libro_con_cola["prestamo"])
+
+    assert _estado(libro_con_cola["primera"]) == "retenida"
+    assert _estado(libro_con_cola["segunda"]) == "pendiente"
+    assert _cantidad(libro_con_cola["libro"]) == 0
+    comprobar_resumen()
+
+
+def test_aprobar_retenida_presta_sin_descontar(libro_con_cola, comprobar_resumen):
+    """
+    Aprobar una reserva retenida crea el préstamo con el ejemplar apartado.
+    """
+    devolver_prestamo(libro_con_cola["prestamo"])
+
+    (resultado,) = procesar_reservas([libro_con_cola["primera"]], "aprobar")
+
+    assert resultado["correcto"], resultado["mensaje"]
+    assert _estado(libro_con_cola["primera"]) == "aprobada"
+    assert _cantidad(libro_con_cola["libro"]) == 0
+    prestamos = db.session.execute(
+        select(Prestamo.usuario_id).where(
+            Prestamo.libro_id == libro_con_cola["libro"],
+            Prestamo.fecha_devolucion.is_(None),
+        )
+    ).scalars().all()
+    assert prestamos == [resultado["usuario_id"]]
+    comprobar_resumen()
+
+
+def test_aprobar_pendiente_sin_ejemplares_falla(libro_con_cola, comprobar_resumen):
+    """
+    Una reserva pendiente no se aprueba con el ejemplar apartado para otra.
+    """
+    devolver_prestamo(libro_con_cola["prestamo"])
+
+    (resultado,) = procesar_reservas([libro_con_cola["segunda"]], "aprobar")
+
+    assert not resultado["correcto"]
+    assert _estado(libro_con_cola["segunda"]) == "pendiente"
+    assert _cantidad(libro_con_cola["libro"]) == 0
+    comprobar_resumen()
+
+
+def test_rechazar_retenida_pasa_ejemplar_a_la_cola(libro_con_cola, comprobar_resumen):
+    """
+    Rechazar una reserva retenida aparta su ejemplar para la siguiente y, sin cola, lo repone.
+    """
+    devolver_prestamo(libro_con_cola["prestamo"])
+
+    procesar_reservas([libro_con_cola["primera"]], "rechazar")
+    assert _estado(libro_con_cola["primera"]) == "rechazada"
+    assert _estado(libro_con_cola["segunda"]) == "retenida"
+    assert _cantidad(libro_con_cola["libro"]) == 0
+    comprobar_resumen()
+
+    procesar_reservas([libro_con_cola["segunda"]], "rechazar")
+    assert _estado(libro_con_cola["segunda"]) == "rechazada"
+    assert _cantidad(libro_con_cola["libro"]) == 1
+    comprobar_resumen()
+
+
+def test_expirar_retenida_pasa_ejemplar_a_la_cola(
+    app, libro_con_cola, comprobar_resumen
+):
+    """
+    Las retenciones caducadas pasan el ejemplar a la cola; las pendientes no caducan.
+    """
+    dias = app.config["RESERVAS_DIAS_EXPIRACION"]
+    ahora = datetime.now(timezone.utc)
+
+    # Sin ejemplares apartados no expira nada, por antigua que sea la cola
+    assert Reserva.expirar_reservas(ahora=ahora + timedelta(days=dias * 10)) == 0
+    assert _estado(libro_con_cola["primera"]) == "pendiente"
+
+    devolver_prestamo(libro_con_cola["prestamo"])
+    assert Reserva.expirar_reservas(ahora=ahora) == 0
+
+    vencimiento = ahora + timedelta(days=dias + 1)
+    assert Reserva.expirar_reservas(ahora=vencimiento) == 1
+    assert _estado(libro_con_cola["primera"]) == "rechazada"
+    assert _estado(libro_con_cola["segunda"]) == "retenida"
+    assert _cantidad(libro_con_cola["libro"]) == 0
+    comprobar_resumen()
+
+    assert Reserva.expirar_reservas(ahora=vencimiento + timedelta(days=dias + 1)) == 1
+    assert _estado(libro_con_cola["segunda"]) == "rechazada"
+    assert _cantidad(libro_con_cola["libro"]) == 1
+    comprobar_resumen()
@@ -0,0 +1,36 @@
+"""
+Pruebas de la versión del catálogo con la que se generan los ETag.
+
+Autor: Francisco Javier
+Fecha: 2025-05-17
+"""
+
+from src.services.services_prestamos import devolver_prestamo, realizar_prestamo
+from src.services.services_version import version_catalogo
+
+
+def test_version_cambia_con_libros_y_prestamos(crear_libro, crear_usuario):
+    """
+    Cada transacción confirmada con libros o préstamos incrementa la versión una vez.
+    """
+    libro_id = crear_libro(cantidad=1)
+    version, fecha = version_catalogo()
+    assert version >= 1 and fecha is not None
+
+    prestamo_id = realizar_prestamo(libro_id, crear_usuario())
+    assert version_catalogo()[0] == version + 1
+
+    devolver_prestamo(prestamo_id)
+    assert version_catalogo()[0] == version + 2
+
+
+def test_version_no_cambia_con_otras_tablas(crear_libro, crear_usuario, crear_reserva):
+    """
+    Las transacciones que no tocan libros ni préstamos no cambian la versión.
+    """
+    libro_id = crear_libro(cantidad=0)
+    version = version_catalogo()[0]
+
+    crear_reserva(libro_id, crear_usuario())
+
+    assert version_catalogo()[0] == version